@@ -4,27 +4,49 @@ from threading import Thread
 from backend.application.api import api
 from backend.storage import start_scheduler
 from databases.models import create_tables
+from helpers.logger import logger
+from helpers.process_lock import try_acquire_lock
 
-from config import DATABASE_URI
+from config import DATABASE_URI, INGEST_MODE, INGEST_LOCK_FILE
 
 def create_app():
     """
     Create and configure the Flask application.
     """
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI 
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
     app.register_blueprint(api, url_prefix='/api')
     return app
 
-app = create_app()
+def start_ingest():
+    """
+    Start the scheduler of the ingest in a parallel thread, only in one process.
+    With several workers (gunicorn) each worker imports this file, the file lock
+    elects the only worker that runs the scheduler, the others only serve the API.
+    The lock is the same of the ingest process (backend/ingest.py --daemon).
+    The elected process also creates the tables and applies the migrations, with INGEST_MODE=off
+    the ingest process does it (or: python -m databases.migrations upgrade).
 
-with app.app_context():
-    # Create the database tables if they do not exist
+    Returns:
+        Thread: The thread of the scheduler, or None if this process doesn't run the ingest.
+    """
+    if INGEST_MODE != 'embedded':
+        logger.info(f"Ingest mode is '{INGEST_MODE}', the scheduler is not started in the API")
+        return None
+    if not try_acquire_lock(INGEST_LOCK_FILE):
+        logger.info("Other process runs the ingest, the scheduler is not started in this process")
+        return None
+    # Only the process of the ingest migrates the schema (not every worker of the API)
     create_tables()
-    
-    # Start the scheduler within the context of the application, this to run in a parallel thread
-    scheduler_thread = Thread(target=start_scheduler, args=(app,))
+    scheduler_thread = Thread(target=start_scheduler)
     scheduler_thread.start()
+    return scheduler_thread
+
+app = create_app()
+
+with app.app_context():
+    # Start the scheduler in a parallel thread (the ingest doesn't need the context of the application)
+    scheduler_thread = start_ingest()
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    app.run(debug=True, port=5001)
@@ -1,80 +1,155 @@
 # Dependencies
-from flask import Flask, jsonify, Blueprint, make_response, request, render_template_string
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from flask import Flask, jsonify, Blueprint, make_response, request, render_template_string, send_file
 
 # Other classes
 from helpers.logger import logger
 from helpers.statistics import get_rocket_statistics, get_launch_statistics, get_starlink_statistics
-from config import DATABASE_URI
+from databases.models import Session, Rockets, Launches, Starlink
+from helpers.singleflight import singleflight
+from helpers.query_expand import EXPANSIONS, INCLUDES, parse_fields, to_records
+from helpers.query_sort_filter import parse_altitude_range
 
+from backend.spaceX.spaceX_data import get_data
+from backend.data_version import get_data_version
+from backend.history import parse_as_of
+from backend.snapshots import current_snapshot, gzip_path
+from backend.read_model import filter_sort_records
+from config import READ_ENGINE, RAW_SOURCE, DASHBOARD_MODE, DASHBOARD_WORKERS, DASHBOARD_TIMEOUT_SECONDS
 from backend.starlink_resources.starlink_filter_sort import get_filter_sort_starlink
 from backend.rocket_resources.rocket_filter_sort import get_filter_sort_rocket
 from backend.launches_resources.launches_filter_sort import get_filter_sort_launches
-
-# Create the database engine and session
-engine = create_engine(DATABASE_URI)
-Session = sessionmaker(bind=engine)
+from backend.launches_resources.launches_timeseries import get_launches_timeseries
+from backend.starlink_resources.starlink_orbits import get_starlink_orbits
 
 api = Blueprint('api', __name__)
 
-# The API Requets URL for "SpaceX API"
-API_requests = "https://api.spacexdata.com/v4/" 
+# Statistics of each group of the dashboard
+DASHBOARD_GROUPS = {
+    "rockets": get_rocket_statistics,
+    "launches": get_launch_statistics,
+    "starlink": get_starlink_statistics
+}
+
+# Threads shared by all the requests (bounded: DASHBOARD_WORKERS queries of the dashboard at the same time)
+_dashboard_pool = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+# Statistics of a group still running in the pool, by (group, as_of): a new dashboard waits for the
+# same query instead of queueing another one behind it
+_running_groups = {}
+_running_lock = threading.Lock()
+
+def _submit_group(group, as_of):
+    """
+    Get the future of the statistics of a group, the one still running or a new one.
+    """
+    key = (group, as_of)
+    with _running_lock:
+        future = _running_groups.get(key)
+        if future is not None and not future.done():
+            return future
+        future = _dashboard_pool.submit(DASHBOARD_GROUPS[group], as_of)
+        _running_groups[key] = future
+
+    def forget(done_future):
+        with _running_lock:
+            if _running_groups.get(key) is done_future:
+                del _running_groups[key]
+    future.add_done_callback(forget)
+    return future
 
-def get_data(endpoint: str):
+@singleflight
+def build_dashboard(as_of=None):
     """
-    Function to get data from the API SpaceX (here is raw data)
+    Compute the statistics of the dashboard. The requests that arrive while they are computed
+    wait and share the same result (singleflight), the statistics are not computed once per request.
+    With DASHBOARD_MODE='parallel' the three groups run at the same time (each one with its own
+    connection of the pool), a group that is not ready in DASHBOARD_TIMEOUT_SECONDS is left out
+    and its name is added to 'missing'. It is cancelled if it didn't start, and if it is running
+    the next dashboards wait for it (the slow queries don't pile up in the pool).
+
+    Args:
+        as_of (datetime, optional): Time of the history, None for the current data.
+
+    Returns:
+        dict: The statistics of the rockets, launches and starlink (None if the group timed out).
     """
-    url = f"{API_requests}{endpoint}"
+    if DASHBOARD_MODE != 'parallel':
+        return {group: statistics(as_of) for group, statistics in DASHBOARD_GROUPS.items()}
+
+    futures = {group: _submit_group(group, as_of) for group in DASHBOARD_GROUPS}
+    # One deadline for the three groups, the latency is the one of the slowest group
+    wait(futures.values(), timeout=DASHBOARD_TIMEOUT_SECONDS)
+
+    dashboard_data = {}
+    missing = []
+    for group, future in futures.items():
+        if future.done():
+            # An error of a group is raised as before (500)
+            dashboard_data[group] = future.result()
+        else:
+            # A group still in the queue is cancelled, a running one is reused by the next dashboard
+            future.cancel()
+            logger.error(f"The {group} statistics were not ready in {DASHBOARD_TIMEOUT_SECONDS} seconds")
+            dashboard_data[group] = None
+            missing.append(group)
+    if missing:
+        dashboard_data["missing"] = missing
+    return dashboard_data
+
+@singleflight
+def load_filter_sort(get_filter_sort, sort_param, sort_order, filter_field, filter_value, as_of, expand=(), include=(), **ranges):
+    """
+    Run a get_filter_sort_* function with its own session. The identical requests that arrive while
+    the query runs share its records (singleflight). The records are converted to dictionaries
+    before the session is closed, with the expanded relationships already loaded.
+
+    Returns:
+        list: The dictionaries of the records.
+    """
+    session = Session()
     try:
-        response = requests.get(url)
-        # To catch an HTTPError for bad responses
-        response.raise_for_status()
-        # To get the JSON data from the response
-        data = response.json()
-        logger.info(f"Successfully fetched data from {url}")
-        return data, response.status_code
-    
-    # Handling specific HTTP errors
-    except requests.exceptions.HTTPError as http_err:
-        error_message = f"HTTP error occurred: {http_err}"
-        logger.critical(error_message)
-        return {"error": error_message}, response.status_code
-    
-    # Handling general request exceptions
-    except requests.exceptions.RequestException as request_err:
-        error_message = f"Request error occurred: {request_err}"
-        logger.critical(error_message)
-        return {"error": error_message}, 500
-    
-    # Handling any other exceptions
-    except Exception as e:
-        error_message = f"An error occurred: {e}"
-        logger.critical(error_message)  # Registrar el error en el archivo log
-        return {"error": error_message}, 500
-    
+        records = get_filter_sort(session, sort_param, sort_order, filter_field, filter_value, as_of, expand, include, **ranges)
+        return to_records(records, expand, include)
+    finally:
+        session.close()
+
+def read_filter_sort(model, get_filter_sort, sort_param, sort_order, filter_field, filter_value, as_of, expand=(), include=(), **ranges):
+    """
+    Get the records of a list endpoint. With READ_ENGINE='memory' the current data is filtered and sorted
+    in the read model (backend/read_model.py), the history, the related data and the filters that
+    it doesn't support run in the database (load_filter_sort).
+
+    Args:
+        ranges (dict, optional): alt_min and alt_max of the Starlink endpoint.
+
+    Returns:
+        list: The dictionaries of the records.
+    """
+    if READ_ENGINE == 'memory' and as_of is None and not expand and not include:
+        records = filter_sort_records(model, sort_param, sort_order, filter_field, filter_value, **ranges)
+        if records is not None:
+            return records
+    return load_filter_sort(get_filter_sort, sort_param, sort_order, filter_field, filter_value, as_of, expand, include, **ranges)
+
 
 @api.route('/dashboard', methods=["GET"])
 @api.route('/dashboard/<response_type>', methods=['GET'])
 def get_dashboard(response_type=None):
     """
     Endpoint to get the dashboard with statistics.
+    With as_of (Ex: api/dashboard?as_of=2022-01-01) the statistics are of the data saved at that time.
     """
     logger.info("Accessed /dashboard endpoint")
     
     try: 
-        rocket_stats = get_rocket_statistics()
-        launch_stats = get_launch_statistics()
-        starlink_stats = get_starlink_statistics()
-        
-        # Combine all stats into a single dictionary.
-        dashboard_data = {
-            "rockets": rocket_stats,
-            "launches": launch_stats,
-            "starlink": starlink_stats
-        }
+        as_of = parse_as_of(request.args.get('as_of'))
+        dashboard_data = build_dashboard(as_of)
+        rocket_stats = dashboard_data["rockets"]
+        launch_stats = dashboard_data["launches"]
+        starlink_stats = dashboard_data["starlink"]
         if response_type == 'html':
             logger.info("Returning data dashboard in HTML format")
             return render_template_string("""
@@ -149,10 +224,65 @@ def get_dashboard(response_type=None):
         elif response_type is None or response_type == 'json':
             logger.info("Returning data dashboard in JSON format.")
             return jsonify(dashboard_data)
+    except ValueError as v:
+        logger.error(f"ValueError in /dashboard endpoint: {v}")
+        return jsonify({"error": str(v)}), 400
     except Exception as e:
         logger.error(f"Error in /dashboard endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
+@api.route('/data-version', methods=["GET"])
+def get_version():
+    """
+    Endpoint to get the version of the data, it changes each time the ingest saves new data.
+    It is cheap (it doesn't query the database), clients can poll it to know when to refresh.
+
+    Returns:
+        JSON: {"version": "...", "updated_at": "..."}
+    """
+    return jsonify(get_data_version())
+
+# Times the manifest is read again when the ingest moves the snapshot to the backup while it is sent
+RAW_SNAPSHOT_ATTEMPTS = 2
+
+def _send_snapshot(entry):
+    """
+    Send the JSON of a snapshot (the gzip copy if the client accepts it), the ETag is the hash of the snapshot.
+    The file is opened before the response is returned, a later rotation doesn't affect the response.
+    """
+    if 'gzip' in request.accept_encodings:
+        response = send_file(gzip_path(entry), mimetype='application/json', etag=f"{entry['sha256']}-gzip", conditional=True)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_file(entry['path'], mimetype='application/json', etag=entry['sha256'], conditional=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['X-Snapshot-Created-At'] = entry['created_at']
+    return response
+
+def raw_data_response(key):
+    """
+    Response of a *-raw endpoint. With RAW_SOURCE='snapshot' the newest JSON saved by the ingest is sent
+    from the disk (sendfile, the gzip copy if the client accepts it), the ETag is the hash of the snapshot.
+    If the ingest rotates the snapshot after the manifest was read, the manifest is read again.
+    The SpaceX API is only called if there is no snapshot (or with RAW_SOURCE='upstream').
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+    """
+    if RAW_SOURCE == 'snapshot':
+        for _ in range(RAW_SNAPSHOT_ATTEMPTS):
+            entry = current_snapshot(key)
+            if entry is None:
+                break
+            try:
+                return _send_snapshot(entry)
+            except FileNotFoundError:
+                logger.warning(f"The snapshot {entry['path']} was moved while it was read, reading the manifest again")
+
+    data, status_code = get_data(key)
+    logger.info(make_response(jsonify(data),status_code))
+    return data, status_code
+
 @api.route('rockets-raw', methods=["GET"])
 def get_rockets():
     """
@@ -163,9 +293,7 @@ def get_rockets():
     """
     logger.info("Accessed /rockets endpoint")
     try:
-        data, status_code = get_data("rockets")
-        logger.info(make_response(jsonify(data),status_code))
-        return data, status_code
+        return raw_data_response("rockets")
     except Exception as e:
         logger.error(f"Error in /rockets endpoint: {e}")
         return jsonify({"error": str(e)}), 500
@@ -177,9 +305,7 @@ def get_launches():
     """
     logger.info("Accessed /launches endpoint")
     try:
-        data, status_code = get_data("launches")
-        logger.info(make_response(jsonify(data),status_code))
-        return data, status_code
+        return raw_data_response("launches")
     except Exception as e:
         logger.error(f"Error in /launches endpoint: {e}")
         return jsonify({"error": str(e)}), 500
@@ -191,9 +317,7 @@ def get_starlink():
     """
     logger.info("Accessed /starlink endpoint")
     try: 
-        data, status_code = get_data("starlink")
-        logger.info(make_response(jsonify(data),status_code))
-        return data, status_code
+        return raw_data_response("starlink")
     except Exception as e:
         logger.error(f"Error in /starlink endpoint: {e}")
         return jsonify({"error": str(e)}), 500
@@ -217,6 +341,10 @@ def get_clear_rockets(response_type=None):
     api/rockets?filter_field=id&filter_value=5eb87cdcffd86e000604b32a
     
     api/rockets/html?filter_field=first_flight&filter_value=2010&sort_high=height_meters
+    
+    api/rockets?as_of=2022-01-01
+
+    api/rockets?expand=launches&include=launch_count
 
     Query format:
     
@@ -228,7 +356,6 @@ def get_clear_rockets(response_type=None):
     
     The format is json or html.
     """
-    session = Session()
     logger.info("Accessed /rockets-clear endpoint")
 
     try:
@@ -237,6 +364,11 @@ def get_clear_rockets(response_type=None):
         sort_order = 'desc' if request.args.get('sort_high') else 'asc'
         filter_field = request.args.get('filter_field')
         filter_value = request.args.get('filter_value')
+        # Data saved at a time of the history (Ex: as_of=2022-01-01), the current data by default
+        as_of = parse_as_of(request.args.get('as_of'))
+        # Related data (Ex: expand=launches) and aggregated values (Ex: include=launch_count), only for the current data
+        expand = parse_fields(request.args.get('expand'), EXPANSIONS[Rockets], 'expand')
+        include = parse_fields(request.args.get('include'), tuple(INCLUDES[Rockets]), 'include')
         
         # Validate that both filtering parameters are present
         if (filter_field and not filter_value) or (not filter_field and filter_value):
@@ -244,7 +376,7 @@ def get_clear_rockets(response_type=None):
             return jsonify({"error": "Both filter_field and filter_value must be provided for filtering."}), 400
         
         # Get rocket data by applying filtering and sorting if specified
-        rockets = get_filter_sort_rocket(session, sort_param, sort_order, filter_field, filter_value)
+        rockets = read_filter_sort(Rockets, get_filter_sort_rocket, sort_param, sort_order, filter_field, filter_value, as_of, expand, include)
         
         # In case rockets with the filtering specifications are not found
         if not rockets:
@@ -311,15 +443,13 @@ def get_clear_rockets(response_type=None):
         # Give the data in JSON format
         elif response_type is None or response_type == 'json':
             logger.info("Returning data of rockets in JSON format.")
-            return jsonify([rocket.to_dict() for rocket in rockets])
+            return jsonify(rockets)
     except ValueError as v:
         logger.error(f"ValueError in /rockets endpoint: {v}")
         return jsonify({"error": str(v)}), 400
     except Exception as e:
         logger.error(f"Error in /rockets endpoint: {e}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        session.close()
 
 @api.route('/launches', methods=['GET'])
 @api.route('/launches/<response_type>', methods=['GET'])
@@ -340,6 +470,10 @@ def get_clear_launches(response_type=None):
     api/launches/json?filter_field=date_utc&filter_value=2020-05-24&sort_high=success
     
     api/launches/hmtl?sort_high=date_utc
+    
+    api/launches?filter_field=success&filter_value=false&as_of=2022-01-01T12:00:00
+
+    api/launches?expand=rocket&include=starlink_count
 
     Query format:
     
@@ -351,7 +485,6 @@ def get_clear_launches(response_type=None):
     
     The format is json or html.
     """
-    session = Session()
     logger.info("Accessed /launches-clear endpoint")
     try:
         # Get sorting and filtering parameters from the request
@@ -359,6 +492,11 @@ def get_clear_launches(response_type=None):
         sort_order = 'desc' if request.args.get('sort_high') else 'asc'
         filter_field = request.args.get('filter_field')
         filter_value = request.args.get('filter_value')
+        # Data saved at a time of the history (Ex: as_of=2022-01-01), the current data by default
+        as_of = parse_as_of(request.args.get('as_of'))
+        # Related data (Ex: expand=rocket) and aggregated values (Ex: include=starlink_count), only for the current data
+        expand = parse_fields(request.args.get('expand'), EXPANSIONS[Launches], 'expand')
+        include = parse_fields(request.args.get('include'), tuple(INCLUDES[Launches]), 'include')
         
         # Validate that both filtering parameters are present
         if (filter_field and not filter_value) or (not filter_field and filter_value):
@@ -366,7 +504,7 @@ def get_clear_launches(response_type=None):
             return jsonify({"error": "Both filter_field and filter_value must be provided for filtering."}), 400
         
         # Get launches data by applying filtering and sorting if specified
-        launches = get_filter_sort_launches(session, sort_param, sort_order, filter_field, filter_value)
+        launches = read_filter_sort(Launches, get_filter_sort_launches, sort_param, sort_order, filter_field, filter_value, as_of, expand, include)
         
         # In case launches with the filtering specifications are not found
         if not launches:
@@ -425,13 +563,48 @@ def get_clear_launches(response_type=None):
         # Give the data in JSON format
         elif response_type is None or response_type == 'json':
             logger.info("Returning data of launches in JSON format")
-            return jsonify([launch.to_dict() for launch in launches])
+            return jsonify(launches)
     except ValueError as v:
         logger.error(f"ValueError in /launches endpoint: {v}")
         return jsonify({"error": str(v)}), 400
     except Exception as e:
         logger.error(f"Error in /launches endpoint: {e}")
         return jsonify({"error": str(e)}), 500
+
+@api.route('/launches/timeseries', methods=['GET'])
+def get_launches_time_series():
+    """
+    Endpoint to get the launches aggregated by year or month, computed in the database.
+
+    Returns:
+    JSON: List of buckets with the value of the metric and the number of launches.
+
+    Examples of querys:
+
+    api/launches/timeseries?bucket=year&metric=success_rate
+
+    api/launches/timeseries?bucket=month&metric=count&group_by=rocket_id
+
+    Query format:
+
+    api/launches/timeseries?bucket={year / month}&metric={success_rate / count}&group_by={rocket_id}
+    """
+    session = Session()
+    logger.info("Accessed /launches/timeseries endpoint")
+    try:
+        bucket = request.args.get('bucket', 'year')
+        metric = request.args.get('metric', 'success_rate')
+        group_by = request.args.get('group_by')
+
+        data = get_launches_timeseries(session, bucket, metric, group_by)
+        logger.info("Returning the launches time series in JSON format")
+        return jsonify({"bucket": bucket, "metric": metric, "group_by": group_by, "data": data})
+    except ValueError as v:
+        logger.error(f"ValueError in /launches/timeseries endpoint: {v}")
+        return jsonify({"error": str(v)}), 400
+    except Exception as e:
+        logger.error(f"Error in /launches/timeseries endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
     finally:
         session.close()
 
@@ -454,6 +627,12 @@ def get_clear_starlink(response_type=None):
     api/starlink/json?filter_field=launch_date&filter_value=2020-02-17&sort_high=periapsis
     
     api/starlink/html?sort_low=mass_kg
+    
+    api/starlink?as_of=2022-01-01
+
+    api/starlink?expand=launch
+
+    api/starlink?alt_min=540&alt_max=560&sort_low=periapsis
 
     Query format:
     
@@ -465,7 +644,6 @@ def get_clear_starlink(response_type=None):
     
     The format is json or html.
     """
-    session = Session()
     logger.info("Accessed /starlink-clear endpoint")
     try:
         # Get sorting and filtering parameters from the request
@@ -473,6 +651,13 @@ def get_clear_starlink(response_type=None):
         sort_order = 'desc' if request.args.get('sort_high') else 'asc'
         filter_field = request.args.get('filter_field')
         filter_value = request.args.get('filter_value')
+        # Data saved at a time of the history (Ex: as_of=2022-01-01), the current data by default
+        as_of = parse_as_of(request.args.get('as_of'))
+        # Related data (Ex: expand=launch), only for the current data
+        expand = parse_fields(request.args.get('expand'), EXPANSIONS[Starlink], 'expand')
+        include = parse_fields(request.args.get('include'), tuple(INCLUDES[Starlink]), 'include')
+        # Orbits that cross the altitude range in km (Ex: alt_min=540&alt_max=560)
+        alt_min, alt_max = parse_altitude_range(request.args.get('alt_min'), request.args.get('alt_max'))
         
         # Validate that both filtering parameters are present
         if (filter_field and not filter_value) or (not filter_field and filter_value):
@@ -480,7 +665,7 @@ def get_clear_starlink(response_type=None):
             return jsonify({"error": "Both filter_field and filter_value must be provided for filtering."}), 400
         
         # Get rocket data by applying filtering and sorting if specified
-        starlinks = get_filter_sort_starlink(session, sort_param, sort_order, filter_field, filter_value)
+        starlinks = read_filter_sort(Starlink, get_filter_sort_starlink, sort_param, sort_order, filter_field, filter_value, as_of, expand, include, alt_min=alt_min, alt_max=alt_max)
         
         # In case rockets with the filtering specifications are not found
         if not starlinks:
@@ -543,15 +728,56 @@ def get_clear_starlink(response_type=None):
         # Give the data in JSON format
         elif response_type is None or response_type == 'json':
             logger.info("Returning data of starlink in JSON format")
-            return jsonify([s.to_dict() for s in starlinks])
+            return jsonify(starlinks)
     except ValueError as ve:
         logger.error(f"ValueError in /starlink endpoint: {ve}")
         return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.error(f"Error in /starlink endpoint: {e}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        session.close()
+
+@api.route('/starlink/orbits', methods=['GET'])
+def get_starlink_orbits_analytics():
+    """
+    Endpoint to get the orbital analytics of the Starlink satellites: histograms of altitude and inclination,
+    shells (altitude and inclination), mean altitude and decays per month. Computed once for each data version.
+
+    Returns:
+    JSON: The analytics of the orbits.
+
+    Examples of querys:
+
+    api/starlink/orbits
+
+    api/starlink/orbits?bin_km=25&inclination_bin=0.5
+
+    Query format:
+
+    api/starlink/orbits?bin_km={size of the altitude bins in km}&inclination_bin={size of the inclination bins in degrees}
+    bin_km from 0.1 to 1000 and inclination_bin from 0.01 to 180, other values return 400.
+    """
+    logger.info("Accessed /starlink/orbits endpoint")
+    try:
+        data = get_starlink_orbits(request.args.get('bin_km'), request.args.get('inclination_bin'))
+        logger.info("Returning the Starlink orbits in JSON format")
+        return jsonify(data)
+    except ValueError as v:
+        logger.error(f"ValueError in /starlink/orbits endpoint: {v}")
+        return jsonify({"error": str(v)}), 400
+    except Exception as e:
+        logger.error(f"Error in /starlink/orbits endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@api.after_request
+def add_etag(response):
+    """
+    Add the ETag to the GET responses, a client that sends the same ETag (If-None-Match)
+    gets 304 without the body.
+    """
+    if request.method == 'GET' and response.status_code == 200 and not response.direct_passthrough:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
 
 @api.app_errorhandler(404)
 def page_not_found(e):
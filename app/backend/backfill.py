@@ -0,0 +1,212 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from databases.bulk import upsert_rows, DEFAULT_BATCH_SIZE
+from databases.models import HISTORY_MODELS, Session, create_tables, engine
+from backend.data_version import bump_data_version
+from backend.history import record_history, close_missing
+from backend.storage import DB_RESOURCES
+from backend.decoding import decode_records
+from helpers.logger import logger
+from helpers.process_lock import try_acquire_lock
+from config import DATA_DIR, BACKUP_DIR, INGEST_LOCK_FILE
+
+"""
+Rebuild the database from the JSON snapshots saved by the ingest (data/ and backup/), without the SpaceX API.
+The snapshots of each resource are read in parallel processes, the records are deduplicated by id
+(the record of the newest snapshot wins) and saved with bulk upserts in parallel batches.
+Run it from the app folder:
+python -m backend.backfill
+python -m backend.backfill --with-history   -> Also replay the snapshots in the history tables (empty history only)
+"""
+
+# Timestamp in the name of the snapshots (raw-starlink-24-05-2024_13-45.json)
+SNAPSHOT_NAME = re.compile(r'raw-(?P<key>\w+)-(?P<time_stamp>\d{2}-\d{2}-\d{4}_\d{2}-\d{2})\.json$')
+
+def snapshot_time(path):
+    """
+    Get the time of a snapshot, from its name or the modification time of the file.
+
+    Args:
+        path (path): The JSON file of the snapshot.
+
+    Returns:
+        datetime: The time of the snapshot.
+    """
+    match = SNAPSHOT_NAME.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group('time_stamp'), '%d-%m-%Y_%H-%M')
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+def find_snapshots(key, directories):
+    """
+    Find the snapshots of a resource in the data and backup folders.
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        directories (list): Folders with a subfolder for each resource.
+
+    Returns:
+        list: (time, path) of the snapshots, from the oldest to the newest.
+    """
+    snapshots = []
+    for directory in directories:
+        resource_dir = os.path.join(directory, key)
+        if not os.path.isdir(resource_dir):
+            continue
+        for file in os.listdir(resource_dir):
+            if file.endswith('.json'):
+                path = os.path.join(resource_dir, file)
+                snapshots.append((snapshot_time(path), path))
+    # Same time: the name is the tiebreaker, the order is always the same
+    snapshots.sort()
+    return snapshots
+
+def read_snapshot(key, path):
+    """
+    Read a snapshot and decode its items into rows (it runs in a worker process).
+    The invalid items are skipped, the ingest already saved them in the dead letters.
+
+    Returns:
+        list: The rows of the snapshot.
+    """
+    with open(path, 'rb') as json_file:
+        rows, rejected = decode_records(key, json_file.read())
+    if rejected:
+        logger.warning(f"{len(rejected)} invalid {key} items skipped in {path}")
+    return rows
+
+def read_resource(key, snapshots, pool, on_snapshot=None):
+    """
+    Read all the snapshots of a resource and keep the newest row of each id.
+    The rows of each snapshot are dropped after it is read, only the newest row of each id stays in memory.
+
+    Args:
+        key (str): The resource.
+        snapshots (list): (time, path) from the oldest to the newest.
+        pool (Executor): Pool of processes to read the files.
+        on_snapshot (callable, optional): Called with (time, rows) of each snapshot, in order (Ex: replay of the history).
+
+    Returns:
+        dict: The rows by id.
+    """
+    latest = {}
+    paths = [path for _, path in snapshots]
+    # map keeps the order of the snapshots, a newer snapshot overwrites the rows of the older ones
+    for (taken_at, path), rows in zip(snapshots, pool.map(read_snapshot, [key] * len(paths), paths)):
+        for row in rows:
+            latest[row['id']] = row
+        if on_snapshot is not None:
+            on_snapshot(taken_at, rows)
+    return latest
+
+def load_rows(model, rows, workers, batch_size):
+    """
+    Save the rows with bulk upserts, each batch in its own transaction on a thread of the pool.
+    SQLite only has one writer, there the batches are saved one after the other.
+
+    Returns:
+        int: Number of rows saved.
+    """
+    rows = list(rows)
+    batches = [rows[start:start + batch_size] for start in range(0, len(rows), batch_size)]
+
+    def load_batch(batch):
+        with engine.begin() as connection:
+            return upsert_rows(connection, model, batch, batch_size)
+
+    if engine.dialect.name == 'sqlite' or workers <= 1:
+        return sum(load_batch(batch) for batch in batches)
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        return sum(threads.map(load_batch, batches))
+
+def history_replay(model):
+    """
+    Session to save each snapshot in the history table, from the oldest to the newest (only if the history is empty).
+
+    Returns:
+        Session: The session of the replay, None if the history is not empty.
+    """
+    session = Session()
+    if session.query(HISTORY_MODELS[model]).first() is not None:
+        logger.warning(f"The history of {model.__tablename__} is not empty, the snapshots are not replayed")
+        session.close()
+        return None
+    return session
+
+def backfill(directories=(DATA_DIR, BACKUP_DIR), workers=None, batch_size=DEFAULT_BATCH_SIZE, with_history=False):
+    """
+    Rebuild the tables from the snapshots of the folders.
+
+    Args:
+        directories (list, optional): Folders with the snapshots (by default data/ and backup/).
+        workers (int, optional): Processes to read the files and threads to save the batches (by default the CPUs).
+        batch_size (int, optional): Rows of each bulk upsert.
+        with_history (bool, optional): Replay the snapshots in the history tables.
+
+    Returns:
+        dict: Snapshots read, rows saved and seconds of each resource.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = {}
+    # 'spawn' to start clean worker processes (no threads or connections copied from this process)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        # Rockets first and starlink last (foreign keys)
+        for key, (model, _, label) in DB_RESOURCES.items():
+            start = time.perf_counter()
+            snapshots = find_snapshots(key, directories)
+            if not snapshots:
+                logger.error(f"No snapshots of {key} in {', '.join(directories)}")
+                continue
+            # The history is saved while the snapshots are read (the rows of all of them are never in memory)
+            session = history_replay(model) if with_history else None
+
+            def replay(taken_at, rows):
+                record_history(session, model, rows, taken_at)
+                # The records that are not in this snapshot were deleted before it
+                if rows:
+                    close_missing(session, model, {row['id'] for row in rows}, taken_at)
+            try:
+                latest = read_resource(key, snapshots, pool, replay if session else None)
+                if session:
+                    # Before the bulk upserts (SQLite has only one writer)
+                    session.commit()
+            finally:
+                if session:
+                    session.close()
+            saved = load_rows(model, latest.values(), workers, batch_size)
+            seconds = time.perf_counter() - start
+            summary[key] = {'snapshots': len(snapshots), 'rows': saved, 'seconds': round(seconds, 3)}
+            logger.info(f"{label} data backfilled: {saved} rows from {len(snapshots)} snapshots in {seconds:.2f} s")
+    bump_data_version()
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the database from the snapshots of data/ and backup/.")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--backup-dir', default=BACKUP_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Processes and threads (default: CPUs).")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--with-history', action='store_true', help="Replay the snapshots in the history tables.")
+    args = parser.parse_args(argv)
+
+    # The ingest must not write the same tables at the same time
+    if not try_acquire_lock(INGEST_LOCK_FILE):
+        logger.error(f"Other process runs the ingest (lock {INGEST_LOCK_FILE})")
+        return 1
+
+    # This process has the lock of the ingest, it waits if other process is migrating
+    create_tables(wait=True)
+    summary = backfill((args.data_dir, args.backup_dir), args.workers, args.batch_size, args.with_history)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import json
+import os
+import time
+
+from helpers.logger import logger
+from config import DATA_DIR
+
+"""
+Version of the data of the database.
+Each time the ingest saves new data in the database the version changes (bump_data_version),
+the API and the frontend compare the version to know if they have to update caches or charts.
+The version is saved in a file so the ingest process and the API workers see the same version.
+"""
+
+VERSION_FILE = os.path.join(DATA_DIR, 'version.json')
+
+def get_data_version():
+    """
+    Get the current version of the data.
+
+    Returns:
+        dict: The version and the time (ISO format) it was created, version is None if the data was never saved.
+    """
+    try:
+        with open(VERSION_FILE, 'r') as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {"version": None, "updated_at": None}
+
+def bump_data_version():
+    """
+    Create a new version of the data, it is called after the data is saved in the database.
+
+    Returns:
+        dict: The new version.
+    """
+    now = time.time()
+    data_version = {
+        # Milliseconds since epoch, always increases between ingest cycles
+        "version": str(int(now * 1000)),
+        "updated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now))
+    }
+    os.makedirs(os.path.dirname(VERSION_FILE), exist_ok=True)
+    # Write then rename, a reader never gets a half written file
+    tmp_path = f"{VERSION_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as json_file:
+        json.dump(data_version, json_file)
+    os.replace(tmp_path, VERSION_FILE)
+    logger.info(f"Data version updated to {data_version['version']}")
+    return data_version
@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from helpers.logger import logger
+from config import DEAD_LETTER_DIR
+
+"""
+Dead letters of the ingest: the records that could not be transformed or saved in the database.
+They are appended to a JSON Lines file of each resource (data/dead_letter/starlink.jsonl), the rest of
+the snapshot is saved anyway. Each line has the time, the snapshot, the error and the record.
+Ex:
+{"failed_at": "2024-05-24T13:45:12Z", "resource": "starlink", "snapshot": "raw-starlink-24-05-2024_13-45.json",
+ "record_id": "5eed7714096e590006985634", "error": "KeyError: 'spaceTrack'", "record": {...}}
+"""
+
+_lock = threading.Lock()
+
+def dead_letter_path(key, dead_letter_dir=DEAD_LETTER_DIR):
+    return os.path.join(dead_letter_dir, f"{key}.jsonl")
+
+def add_dead_letter(key, snapshot, record, error, dead_letter_dir=DEAD_LETTER_DIR):
+    """
+    Save a record that failed in the dead letters of the resource.
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        snapshot (str): Name of the snapshot of the record.
+        record (dict): The raw item or the transformed row.
+        error (Exception): The error of the record.
+    """
+    line = {
+        'failed_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'resource': key,
+        'snapshot': snapshot,
+        'record_id': record.get('id') if isinstance(record, dict) else None,
+        'error': f"{type(error).__name__}: {error}",
+        'record': record
+    }
+    os.makedirs(dead_letter_dir, exist_ok=True)
+    with _lock:
+        with open(dead_letter_path(key, dead_letter_dir), 'a') as dead_letter_file:
+            # default=str for the dates of the transformed rows
+            dead_letter_file.write(json.dumps(line, default=str) + '\n')
+    logger.warning(f"Record {line['record_id']} of {key} sent to the dead letters: {line['error']}")
+
+def read_dead_letters(key, dead_letter_dir=DEAD_LETTER_DIR):
+    """
+    Read the dead letters of a resource.
+
+    Returns:
+        list: The dead letters, from the oldest to the newest.
+    """
+    try:
+        with open(dead_letter_path(key, dead_letter_dir), 'r') as dead_letter_file:
+            return [json.loads(line) for line in dead_letter_file if line.strip()]
+    except FileNotFoundError:
+        return []
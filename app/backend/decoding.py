@@ -0,0 +1,227 @@
+import json
+from datetime import date, datetime
+from typing import Any, Optional
+
+from backend.transforms import rocket_record, launch_record, starlink_record
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+"""
+Typed decoding of the snapshots of the SpaceX API: the JSON bytes are decoded with msgspec directly into
+structs with only the fields saved in the database (the other fields of the items are skipped without
+building dictionaries), the dates are parsed and the types are checked while decoding.
+Ex:
+rows, rejected = decode_records('starlink', content)
+rows -> [{'id': ..., 'object_name': ..., 'launch_date': date(2020, 2, 17), ...}, ...] (the rows of backend/transforms.py)
+rejected -> [(item, error), ...] (the items with missing fields or wrong types, for the dead letters)
+The whole list is decoded at once, only if an item is invalid the items are decoded one by one to find it.
+Without msgspec installed it uses json and the functions of backend/transforms.py (the same rows).
+"""
+
+if msgspec is not None:
+    class Meters(msgspec.Struct):
+        meters: Optional[float]
+
+    class Kilograms(msgspec.Struct):
+        kg: Optional[int]
+
+    class Thrust(msgspec.Struct):
+        kN: Optional[float]
+
+    class FirstStage(msgspec.Struct):
+        thrust_sea_level: Thrust
+        thrust_vacuum: Thrust
+
+    class RawRocket(msgspec.Struct):
+        id: str
+        name: Optional[str]
+        success_rate_pct: Optional[float]
+        cost_per_launch: Optional[int]
+        height: Meters
+        diameter: Meters
+        mass: Kilograms
+        first_stage: FirstStage
+        first_flight: Optional[date]
+
+    class RawLaunch(msgspec.Struct):
+        id: str
+        name: Optional[str]
+        date_utc: Optional[datetime]
+        success: Optional[bool]
+        rocket: Optional[str]
+        flight_number: Optional[int]
+
+    class SpaceTrack(msgspec.Struct):
+        OBJECT_NAME: Optional[str]
+        LAUNCH_DATE: Optional[date]
+        DECAY_DATE: Optional[date]
+        INCLINATION: Optional[float]
+        APOAPSIS: Optional[float]
+        PERIAPSIS: Optional[float]
+
+    class RawStarlink(msgspec.Struct):
+        id: str
+        launch: Optional[str]
+        spaceTrack: SpaceTrack
+
+    def _rocket_row(rocket):
+        return {
+            'id': rocket.id,
+            'name': rocket.name,
+            'success_rate_pct': rocket.success_rate_pct,
+            'cost_per_launch': rocket.cost_per_launch,
+            'height_meters': rocket.height.meters,
+            'diameter_meters': rocket.diameter.meters,
+            'mass_kg': rocket.mass.kg,
+            'thrust_sea_level_kN': rocket.first_stage.thrust_sea_level.kN,
+            'thrust_vacuum_kN': rocket.first_stage.thrust_vacuum.kN,
+            'first_flight': rocket.first_flight
+        }
+
+    def _launch_row(launch):
+        return {
+            'id': launch.id,
+            'name': launch.name,
+            # Only the date (UTC) of the launch is saved
+            'date_utc': launch.date_utc.date() if launch.date_utc is not None else None,
+            'success': launch.success,
+            'rocket_id': launch.rocket,
+            'flight_number': launch.flight_number
+        }
+
+    def _starlink_row(satellite):
+        space_track = satellite.spaceTrack
+        return {
+            'id': satellite.id,
+            'object_name': space_track.OBJECT_NAME,
+            'launch_date': space_track.LAUNCH_DATE,
+            'decay_date': space_track.DECAY_DATE,
+            'inclination': space_track.INCLINATION,
+            'apoapsis': space_track.APOAPSIS,
+            'periapsis': space_track.PERIAPSIS,
+            'launch_id': satellite.launch
+        }
+
+    # Struct and row of each resource, the decoders are created once
+    STRUCTS = {
+        'rockets': (RawRocket, _rocket_row),
+        'launches': (RawLaunch, _launch_row),
+        'starlink': (RawStarlink, _starlink_row)
+    }
+    _list_decoders = {key: msgspec.json.Decoder(list[struct]) for key, (struct, _) in STRUCTS.items()}
+    _item_decoders = {key: msgspec.json.Decoder(struct) for key, (struct, _) in STRUCTS.items()}
+    _raw_decoder = msgspec.json.Decoder(list[msgspec.Raw])
+
+    class ItemId(msgspec.Struct):
+        id: Any = None
+
+    _ids_decoder = msgspec.json.Decoder(list[ItemId])
+
+# Transformation of the decoded items without msgspec
+TRANSFORMS = {
+    'rockets': rocket_record,
+    'launches': launch_record,
+    'starlink': starlink_record
+}
+
+def _decode_with_json(key, content):
+    """
+    Decode the items with json and transform them with backend/transforms.py.
+    """
+    rows = []
+    rejected = []
+    for item in json.loads(content):
+        try:
+            rows.append(TRANSFORMS[key](item))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            rejected.append((item, e))
+    return rows, rejected
+
+def decode_records(key, content):
+    """
+    Decode the JSON of a snapshot into the rows of the database.
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        content (bytes): The JSON of the snapshot (a list of items).
+
+    Returns:
+        tuple: (rows, rejected), the rows are dictionaries with the fields of the model and
+               rejected is a list of (item, error) of the invalid items.
+    """
+    if msgspec is None:
+        return _decode_with_json(key, content)
+
+    row_function = STRUCTS[key][1]
+    try:
+        return [row_function(item) for item in _list_decoders[key].decode(content)], []
+    except msgspec.ValidationError:
+        pass
+
+    # At least one invalid item: each item is decoded on its own, the invalid ones are rejected
+    rows = []
+    rejected = []
+    for raw in _raw_decoder.decode(content):
+        try:
+            rows.append(row_function(_item_decoders[key].decode(raw)))
+        except msgspec.ValidationError as e:
+            rejected.append((msgspec.json.decode(raw), e))
+    return rows, rejected
+
+def decode_ids(content):
+    """
+    Get the ids of the items of a snapshot, without decoding the other fields.
+    The invalid items are included if they have an id (they are in the snapshot, only in the dead letters).
+
+    Args:
+        content (bytes): The JSON of the snapshot (a list of items).
+
+    Returns:
+        set: The ids of the items.
+    """
+    if msgspec is not None:
+        try:
+            return {item.id for item in _ids_decoder.decode(content) if item.id is not None}
+        except msgspec.ValidationError:
+            pass
+    return {item['id'] for item in json.loads(content) if isinstance(item, dict) and item.get('id') is not None}
+
+def split_batches(content, batch_size):
+    """
+    Split the JSON list of a snapshot in JSON lists of batch_size items, the items are not decoded
+    (msgspec.Raw keeps the bytes of each item). Without msgspec the items are decoded and encoded again.
+
+    Args:
+        content (bytes): The JSON of the snapshot (a list of items).
+        batch_size (int): Items of each batch.
+
+    Yields:
+        bytes: The JSON of each batch, in the order of the snapshot.
+    """
+    if msgspec is None:
+        items = json.loads(content)
+        for start in range(0, len(items), batch_size):
+            yield json.dumps(items[start:start + batch_size]).encode()
+        return
+    items = _raw_decoder.decode(content)
+    for start in range(0, len(items), batch_size):
+        yield b'[' + b','.join(items[start:start + batch_size]) + b']'
+
+def decode_batch(key, content):
+    """
+    Decode a batch in a worker process of the ingest. The rows go back to the writer as tuples with the
+    names of the fields only once (less to pickle than a dictionary for each row).
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        content (bytes): The JSON of the batch.
+
+    Returns:
+        tuple: (fields, rows, rejected), the names of the fields, the tuples of the rows and the (item, error) of the invalid items.
+    """
+    rows, rejected = decode_records(key, content)
+    fields = tuple(rows[0]) if rows else ()
+    return fields, [tuple(row.values()) for row in rows], rejected
@@ -0,0 +1,143 @@
+from datetime import date, datetime, time, timezone
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from databases.models import HISTORY_MODELS, OPEN_VALID_TO
+from helpers.logger import logger
+
+"""
+History of the records of the database (SCD type 2): each change of a rocket, launch or satellite
+is a new version in the *_history table with the time range where it was valid.
+Ex: how many Starlink satellites were active on 2022-01-01
+query_as_of(session, Starlink, parse_as_of('2022-01-01')).filter(StarlinkHistory.decay_date.is_(None)).count()
+"""
+
+# Number of ids in each SELECT and UPDATE of the versions (limit of parameters of the databases)
+ID_BATCH_SIZE = 500
+
+def utc_now():
+    """
+    Current time in UTC without time zone (as it is saved in the history tables).
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def parse_as_of(value):
+    """
+    Convert the as_of parameter of the API to the time of the history.
+
+    Args:
+        value (str | None): Date ('2022-01-01', the end of the day) or date and time in ISO format ('2022-01-01T12:00:00').
+
+    Returns:
+        datetime: The time in UTC without time zone, None if there is no value.
+    """
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            return datetime.combine(date.fromisoformat(value), time.max)
+        as_of = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid as_of '{value}', it must be a date (YYYY-MM-DD) or a date and time in ISO format.")
+    if as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    return as_of
+
+def query_as_of(session: Session, model, as_of=None):
+    """
+    Build the query of the records of a table as they were at a time.
+
+    Args:
+        session (Session): SQLAlchemy session object.
+        model (Base): Model of the current table (Rockets, Launches or Starlink).
+        as_of (datetime, optional): Time of the history, None for the current data.
+
+    Returns:
+        Query: Query of the current table, or of the versions of the history table valid at as_of.
+    """
+    if as_of is None:
+        return session.query(model)
+    history_model = HISTORY_MODELS[model]
+    return session.query(history_model).filter(
+        history_model.valid_from <= as_of,
+        history_model.valid_to > as_of
+    )
+
+def record_history(session: Session, model, records, changed_at):
+    """
+    Save in the history the records that are new or changed since the current version.
+    The current version of a changed record is closed (valid_to) and the new one starts at changed_at.
+    It runs in the transaction of the session, the history is saved with the data of the table.
+
+    Args:
+        session (Session): SQLAlchemy session object.
+        model (Base): Model of the current table (Rockets, Launches or Starlink).
+        records (list): Rows of the ingest (dictionaries of backend/transforms.py).
+        changed_at (datetime): Time (UTC) of the ingest.
+
+    Returns:
+        int: Number of new versions.
+    """
+    history_model = HISTORY_MODELS[model]
+    fields = [column.name for column in model.__table__.columns]
+
+    records = list(records)
+    ids = [record['id'] for record in records]
+
+    # Current versions of the records, by id (the index of id and valid_to)
+    current = {}
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        current.update({
+            row.id: row for row in session.query(history_model.history_id, *[getattr(history_model, field) for field in fields])
+            .filter(history_model.valid_to == OPEN_VALID_TO, history_model.id.in_(ids[start:start + ID_BATCH_SIZE]))
+        })
+
+    to_close = []
+    new_versions = []
+    for record in records:
+        version = current.get(record['id'])
+        if version is not None:
+            if all(getattr(version, field) == record.get(field) for field in fields):
+                continue
+            to_close.append(version.history_id)
+        new_versions.append({**record, 'valid_from': changed_at, 'valid_to': OPEN_VALID_TO})
+
+    for start in range(0, len(to_close), ID_BATCH_SIZE):
+        session.execute(
+            update(history_model)
+            .where(history_model.history_id.in_(to_close[start:start + ID_BATCH_SIZE]))
+            .values(valid_to=changed_at)
+        )
+    if new_versions:
+        session.execute(insert(history_model), new_versions)
+    logger.debug(f"History of {model.__tablename__}: {len(new_versions)} new versions, {len(to_close)} replaced")
+    return len(new_versions)
+
+def close_missing(session: Session, model, ids, changed_at):
+    """
+    Close (valid_to) the current versions of the records that are not in a complete snapshot, the records
+    deleted in the SpaceX API are not counted by the as_of queries after changed_at.
+    If a record comes back, record_history saves it as a new version.
+
+    Args:
+        session (Session): SQLAlchemy session object.
+        model (Base): Model of the current table (Rockets, Launches or Starlink).
+        ids (set): Ids of all the items of the snapshot.
+        changed_at (datetime): Time (UTC) of the ingest.
+
+    Returns:
+        int: Number of versions closed.
+    """
+    history_model = HISTORY_MODELS[model]
+    open_ids = [row.id for row in session.query(history_model.id).filter(history_model.valid_to == OPEN_VALID_TO)]
+    missing = [id for id in open_ids if id not in ids]
+    for start in range(0, len(missing), ID_BATCH_SIZE):
+        session.execute(
+            update(history_model)
+            .where(history_model.valid_to == OPEN_VALID_TO, history_model.id.in_(missing[start:start + ID_BATCH_SIZE]))
+            .values(valid_to=changed_at)
+        )
+    if missing:
+        logger.info(f"History of {model.__tablename__}: {len(missing)} records not in the snapshot closed")
+    return len(missing)
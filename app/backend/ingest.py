@@ -0,0 +1,58 @@
+import argparse
+import sys
+from datetime import datetime
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from backend.storage import run_ingest
+from databases.models import create_tables
+from helpers.logger import logger
+from helpers.process_lock import try_acquire_lock
+from config import SCHEDULER_INTERVAL_SECONDS, INGEST_LOCK_FILE, INGEST_WORKERS
+
+"""
+Ingest process, separated from the API (it doesn't import Flask).
+It gets the data of the SpaceX API, saves the JSON files (data/ and backup/) and saves the data in the database.
+Run it from the app folder:
+python -m backend.ingest --once      -> Run one cycle and exit
+python -m backend.ingest --daemon    -> Run a cycle every SCHEDULER_INTERVAL_SECONDS
+Use INGEST_MODE=off in the API so the API workers don't run the ingest too.
+Only this process decodes the snapshots with INGEST_WORKERS processes (the API decodes them in its own process).
+"""
+
+def run_daemon():
+    """
+    Run the ingest now and then every SCHEDULER_INTERVAL_SECONDS until the process is stopped.
+    """
+    scheduler = BlockingScheduler()
+    # The first cycle runs immediately, the scheduler doesn't run two cycles at the same time
+    scheduler.add_job(run_ingest, 'interval', seconds=SCHEDULER_INTERVAL_SECONDS, kwargs={'workers': INGEST_WORKERS},
+                      next_run_time=datetime.now(), max_instances=1, coalesce=True)
+    logger.info(f"Ingest process started to every {SCHEDULER_INTERVAL_SECONDS} seconds")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Ingest process stopped")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest of the SpaceX API without the web process.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--once', action='store_true', help="Run one ingest cycle and exit.")
+    mode.add_argument('--daemon', action='store_true', help="Run the ingest every SCHEDULER_INTERVAL_SECONDS.")
+    args = parser.parse_args(argv)
+
+    # Only one process runs the ingest (the same lock of the API with INGEST_MODE=embedded)
+    if not try_acquire_lock(INGEST_LOCK_FILE):
+        logger.error(f"Other process runs the ingest (lock {INGEST_LOCK_FILE})")
+        return 1
+
+    # This process has the lock of the ingest, it waits if other process is migrating
+    create_tables(wait=True)
+    if args.once:
+        run_ingest(workers=INGEST_WORKERS)
+    else:
+        run_daemon()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+from helpers.logger import logger
+from sqlalchemy import func, case, literal_column
+from sqlalchemy.orm import Session
+from databases.models import Launches
+
+"""
+Time series of the launches computed in the database (GROUP BY), the client only gets the aggregated rows.
+Ex:
+api/launches/timeseries?bucket=year&metric=success_rate
+[{"bucket": "2020", "value": 96.2, "launches": 26}, ...]
+api/launches/timeseries?bucket=month&metric=count&group_by=rocket_id
+[{"bucket": "2020-01", "rocket_id": "5e9d0d95eda69973a809d1ec", "value": 2, "launches": 2}, ...]
+"""
+
+BUCKETS = ('year', 'month')
+METRICS = ('success_rate', 'count')
+GROUP_BY = ('rocket_id',)
+
+def _bucket_column(session, bucket):
+    """
+    Expression of the bucket of the date of the launch as text ('2020' or '2020-05').
+    PostgreSQL uses date_trunc, SQLite doesn't have it and uses strftime.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        date_format = 'YYYY' if bucket == 'year' else 'YYYY-MM'
+        return func.to_char(func.date_trunc(bucket, Launches.date_utc), date_format)
+    date_format = '%Y' if bucket == 'year' else '%Y-%m'
+    return func.strftime(date_format, Launches.date_utc)
+
+def _metric_column(metric):
+    """
+    Expression of the metric of each bucket.
+    The success rate is the percentage of successful launches of the launches with known result
+    (launches without result are not counted, AVG ignores NULL).
+    """
+    if metric == 'count':
+        return func.count(Launches.id)
+    return func.avg(case(
+        (Launches.success.is_(True), 100.0),
+        (Launches.success.is_(None), None),
+        else_=0.0
+    ))
+
+def get_launches_timeseries(session: Session, bucket='year', metric='success_rate', group_by=None):
+    """
+    Retrieve the launches aggregated by period of time.
+
+    Args:
+        session (Session): SQLAlchemy session object.
+        bucket (str, optional): Period of time ('year' or 'month'). Default is 'year'.
+        metric (str, optional): Value of each period ('success_rate' or 'count'). Default is 'success_rate'.
+        group_by (str, optional): Field to split each period ('rocket_id').
+
+    Returns:
+        list: List of dictionaries with the bucket, the group (if any), the value and the number of launches.
+    """
+    if bucket not in BUCKETS:
+        logger.error(f"Invalid bucket for the launches time series: {bucket}")
+        raise ValueError(f"Invalid bucket '{bucket}', it must be one of {', '.join(BUCKETS)}.")
+    if metric not in METRICS:
+        logger.error(f"Invalid metric for the launches time series: {metric}")
+        raise ValueError(f"Invalid metric '{metric}', it must be one of {', '.join(METRICS)}.")
+    if group_by is not None and group_by not in GROUP_BY:
+        logger.error(f"Invalid group_by for the launches time series: {group_by}")
+        raise ValueError(f"Invalid group_by '{group_by}', it must be one of {', '.join(GROUP_BY)}.")
+
+    bucket_column = _bucket_column(session, bucket).label('bucket')
+    columns = [bucket_column]
+    if group_by:
+        columns.append(getattr(Launches, group_by).label(group_by))
+    columns += [_metric_column(metric).label('value'), func.count(Launches.id).label('launches')]
+
+    # Group by the position of the columns (bucket and group), it is the same expression of the select
+    group_columns = [literal_column(str(position)) for position in range(1, len(columns) - 1)]
+    query = (
+        session.query(*columns)
+        .filter(Launches.date_utc.isnot(None))
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+    )
+
+    rows = []
+    for row in query.all():
+        item = {'bucket': row.bucket}
+        if group_by:
+            item[group_by] = getattr(row, group_by)
+        if metric == 'count' or row.value is None:
+            item['value'] = row.value
+        else:
+            item['value'] = round(float(row.value), 3)
+        item['launches'] = row.launches
+        rows.append(item)
+    return rows
@@ -0,0 +1,293 @@
+from datetime import date
+
+import numpy as np
+from sqlalchemy import Boolean, Date, Float, Integer
+
+from databases.models import Rockets, Launches, Starlink, Session, engine
+from backend.data_version import get_data_version
+from helpers.query_sort_filter import BOOLEAN_VALUES
+from helpers.singleflight import SingleFlight
+from helpers.logger import logger
+
+"""
+Read model in memory (READ_ENGINE=memory): the rockets, launches and starlink tables loaded in NumPy
+columns, with the order of each column computed once (presorted indexes). The list endpoints and the
+dashboard filter, sort and count with these arrays instead of a query, the database is only read when
+the version of the data changes (backend/data_version.py) and the new model replaces the old one at once.
+The filters and sorts are the ones of helpers/query_sort_filter.py, the NULL values are sorted where the
+database of the app sorts them (last in the ascending order in PostgreSQL, first in SQLite). A filter that is not supported here (Ex: a year on a text column)
+returns None and the caller runs the SQL query.
+Ex:
+records = filter_sort_records(Launches, 'flight_number', 'desc', 'date_utc', '2022')
+"""
+
+MODELS = (Rockets, Launches, Starlink)
+
+# PostgreSQL sorts the NULL values as the highest values (last in ASC), SQLite as the lowest (first in ASC)
+NULLS_LAST = engine.dialect.name == 'postgresql'
+
+class _Table:
+    """
+    Columns of a table: 'kind' (string, number, date or boolean), the values, the NULL values,
+    the indexes of the rows in ascending order with the NULL values last ('order', for the binary searches)
+    and with the NULL values where the database sorts them ('sort'), and the position of each row in 'sort'.
+    """
+    def __init__(self, model, records):
+        self.model = model
+        self.rows = [record.to_dict() for record in records]
+        self.columns = {}
+        for column in model.__table__.columns:
+            values = [getattr(record, column.name) for record in records]
+            null = np.array([value is None for value in values], dtype=bool)
+            if isinstance(column.type, Boolean):
+                kind, array = 'boolean', np.array([bool(value) for value in values], dtype=bool)
+            elif isinstance(column.type, (Integer, Float)):
+                kind, array = 'number', np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+            elif isinstance(column.type, Date):
+                kind, array = 'date', np.array(['NaT' if value is None else value for value in values], dtype='datetime64[D]')
+            else:
+                kind, array = 'string', np.array(['' if value is None else value for value in values], dtype=str)
+            # The NULL values after the others, the ties in the order of the table
+            order = np.argsort(array, kind='stable')
+            order = np.concatenate([order[~null[order]], order[null[order]]])
+            sort = order if NULLS_LAST else np.concatenate([order[null[order]], order[~null[order]]])
+            # Position of each row in the order of the sort (to sort a subset of the rows)
+            rank = np.empty(len(sort), dtype=np.int64)
+            rank[sort] = np.arange(len(sort))
+            self.columns[column.name] = {'kind': kind, 'values': array, 'null': null, 'order': order, 'sort': sort, 'rank': rank}
+            if kind == 'string':
+                self.columns[column.name]['lower'] = np.char.lower(array)
+            elif kind == 'number':
+                # Values without NULL in ascending order, for the binary searches of the ranges
+                self.columns[column.name]['sorted'] = array[order[:len(order) - null.sum()]]
+            elif kind == 'date':
+                self.columns[column.name]['year'] = array.astype('datetime64[Y]').astype(np.int64) + 1970
+
+        # Longest distance between the periapsis and the apoapsis of an orbit (interval index of the altitudes)
+        self.max_orbit_span = 0.0
+        if 'periapsis' in self.columns:
+            span = self.columns['apoapsis']['values'] - self.columns['periapsis']['values']
+            span = span[~np.isnan(span)]
+            self.max_orbit_span = max(float(span.max()), 0.0) if len(span) else 0.0
+
+class _ReadModel:
+    """
+    The tables of a version of the data.
+    """
+    def __init__(self, version, tables):
+        self.version = version
+        self.tables = tables
+
+_flight = SingleFlight()
+_current = None
+
+def _build(version):
+    global _current
+    session = Session()
+    try:
+        tables = {model: _Table(model, session.query(model).all()) for model in MODELS}
+    finally:
+        session.close()
+    # A single assignment, the requests use the old model or the new one, never a mix
+    _current = _ReadModel(version, tables)
+    logger.info(f"Read model loaded in memory for the data version {version} "
+                f"({', '.join(f'{model.__tablename__}: {len(table.rows)}' for model, table in tables.items())})")
+    return _current
+
+def get_read_model():
+    """
+    Get the read model of the current version of the data, it is loaded again if the version changed.
+    The requests that arrive while it is loaded wait for it (only one load).
+
+    Returns:
+        _ReadModel: The tables in memory.
+    """
+    version = get_data_version()['version']
+    model = _current
+    if model is not None and model.version == version:
+        return model
+    return _flight.do(('read_model', version), _build, version)
+
+def refresh_read_model():
+    """
+    Load the read model again after an ingest, only in the processes that already use it.
+    """
+    if _current is not None:
+        get_read_model()
+
+def _filter_mask(table, filter_field, filter_value):
+    """
+    Rows that match the filter of helpers/query_sort_filter.py apply_filtering.
+
+    Returns:
+        np.ndarray: Mask of the rows, None if the filter has to run in SQL.
+    """
+    column = table.columns.get(filter_field)
+    if column is None:
+        # A field that is not in the model is ignored (the same as in SQL), the other attributes go to SQL
+        return np.ones(len(table.rows), dtype=bool) if getattr(table.model, filter_field, None) is None else None
+    kind, values, null = column['kind'], column['values'], column['null']
+
+    if filter_field == 'id':
+        return None if filter_value.isdigit() else values == filter_value
+
+    if kind == 'boolean':
+        value = filter_value.lower()
+        if value not in BOOLEAN_VALUES:
+            raise ValueError(f"Invalid value '{filter_value}' for {filter_field}, it must be true, false or null.")
+        if BOOLEAN_VALUES[value] is None:
+            return null.copy()
+        return ~null & (values == BOOLEAN_VALUES[value])
+
+    if filter_value.isdigit():
+        return column['year'] == int(filter_value) if kind == 'date' else None
+    if '-' in filter_value:
+        if kind == 'string':
+            return ~null & (values == filter_value)
+        if kind == 'date':
+            try:
+                return values == np.datetime64(date.fromisoformat(filter_value))
+            except ValueError:
+                return None
+        return None
+    # ILIKE '%value%', the values with wildcards go to SQL
+    if kind != 'string' or '%' in filter_value or '_' in filter_value:
+        return None
+    return ~null & (np.char.find(column['lower'], filter_value.lower()) >= 0)
+
+def _altitude_rows(table, alt_min=None, alt_max=None):
+    """
+    Satellites whose orbit crosses the altitude range (periapsis <= alt_max and apoapsis >= alt_min), found
+    with binary searches in the presorted periapsis and apoapsis, without reading the other rows.
+    With both limits only the orbits with periapsis between alt_min - max_orbit_span and alt_max
+    are checked, an orbit that starts lower can't reach alt_min.
+
+    Returns:
+        np.ndarray: Indexes of the rows (not in the order of the table).
+    """
+    periapsis, apoapsis = table.columns['periapsis'], table.columns['apoapsis']
+    if alt_max is None:
+        start = np.searchsorted(apoapsis['sorted'], alt_min, side='left')
+        return apoapsis['order'][start:len(apoapsis['sorted'])]
+    end = np.searchsorted(periapsis['sorted'], alt_max, side='right')
+    if alt_min is None:
+        return periapsis['order'][:end]
+    start = np.searchsorted(periapsis['sorted'], alt_min - table.max_orbit_span, side='left')
+    candidates = periapsis['order'][start:end]
+    return candidates[apoapsis['values'][candidates] >= alt_min]
+
+def filter_sort_records(model, sort_param=None, sort_order='asc', filter_field=None, filter_value=None, alt_min=None, alt_max=None):
+    """
+    Filter and sort the records of a table of the read model (the current data).
+
+    Args:
+        model (Base): Model of the table (Rockets, Launches or Starlink).
+        sort_param (str, optional): Field to sort by.
+        sort_order (str, optional): Sort order ('asc' or 'desc'). Default is 'asc'.
+        filter_field (str, optional): Field to filter by.
+        filter_value (str, optional): Value to filter by.
+        alt_min (float, optional): Lowest altitude (km) of the orbits (only Starlink).
+        alt_max (float, optional): Highest altitude (km) of the orbits (only Starlink).
+
+    Returns:
+        list: The dictionaries of the records (to_dict), None if the query has to run in SQL.
+    """
+    if (filter_field and not filter_value) or (not filter_field and filter_value):
+        raise ValueError(f"Both filter_field and filter_value for {model.__name__} must be provided for filtering.")
+    if sort_param == 'id':
+        raise ValueError("Sorting by 'id' is not allowed.")
+    table = get_read_model().tables[model]
+
+    mask = None
+    if filter_field:
+        mask = _filter_mask(table, filter_field, filter_value)
+        if mask is None:
+            return None
+
+    column = table.columns.get(sort_param) if sort_param else None
+    if column is None and sort_param and getattr(model, sort_param, None) is not None:
+        return None
+
+    if alt_min is not None or alt_max is not None:
+        # Only the rows of the range are read, they are sorted with the position of each row in the order of the column
+        rows = _altitude_rows(table, alt_min, alt_max)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        if column is None:
+            indexes = np.sort(rows)
+        else:
+            ranks = column['rank'][rows]
+            indexes = rows[np.argsort(ranks if sort_order == 'asc' else -ranks, kind='stable')]
+    elif column is not None:
+        order = column['sort'] if sort_order == 'asc' else column['sort'][::-1]
+        indexes = order if mask is None else order[mask[order]]
+    else:
+        indexes = np.arange(len(table.rows)) if mask is None else np.flatnonzero(mask)
+    return [table.rows[index] for index in indexes]
+
+def _nan_mean(column):
+    """
+    Mean of a number column without the NULL values (as AVG in SQL), None if all the values are NULL.
+    """
+    return float(np.nanmean(column['values'])) if (~column['null']).any() else None
+
+def _nan_sum(column):
+    """
+    Sum of a number column without the NULL values (as SUM in SQL), None if all the values are NULL.
+    """
+    return int(np.nansum(column['values'])) if (~column['null']).any() else None
+
+def launches_per_year(total, first_date, last_date):
+    """
+    Average of launches per year between the first and the last launch, None without two different dates.
+    """
+    if first_date is None or last_date is None or last_date == first_date:
+        return None
+    return total / ((last_date - first_date).days / 365)
+
+def read_model_statistics(model):
+    """
+    Statistics of the dashboard (the same as helpers/statistics.py) computed with the columns in memory.
+
+    Args:
+        model (Base): Rockets, Launches or Starlink.
+
+    Returns:
+        dict: The statistics of the group.
+    """
+    table = get_read_model().tables[model]
+    columns = table.columns
+    total = len(table.rows)
+
+    if model is Rockets:
+        return {
+            "total_rockets": total,
+            "avg_success_rate": _nan_mean(columns['success_rate_pct']) if total else 0,
+            "total_cost_per_launch": _nan_sum(columns['cost_per_launch']) if total else 0,
+            "avg_height": _nan_mean(columns['height_meters']) if total else 0,
+            "avg_diameter": _nan_mean(columns['diameter_meters']) if total else 0
+        }
+
+    if model is Launches:
+        success = columns['success']
+        # The dates without NULL, None if there are no dates (as MIN/MAX in SQL)
+        dates = columns['date_utc']['values'][~columns['date_utc']['null']]
+        first_date, last_date = (dates.min().item(), dates.max().item()) if len(dates) else (None, None)
+        most_used_rocket = None
+        if total:
+            rocket_ids, counts = np.unique(columns['rocket_id']['values'], return_counts=True)
+            most_used_rocket = str(rocket_ids[counts.argmax()]) or None
+        return {
+            "total_launches": total,
+            "successful_launches": int((~success['null'] & success['values']).sum()),
+            "failed_launches": int((~success['null'] & ~success['values']).sum()),
+            "avg_launches_per_year": launches_per_year(total, first_date, last_date) if total else 0,
+            "most_used_rocket": most_used_rocket
+        }
+
+    active = int(columns['decay_date']['null'].sum())
+    return {
+        "total_satellites": total,
+        "active_satellites": active,
+        "decayed_satellites": total - active
+    }
@@ -1,11 +1,13 @@
 from helpers.logger import logger
 from helpers.query_sort_filter import apply_filtering, apply_sorting
+from backend.history import query_as_of
+from helpers.query_expand import apply_expand_include
 from sqlalchemy.orm import Session
-from databases.models import Rockets
+from databases.models import Rockets, HISTORY_MODELS
 
-def get_filter_sort_rocket(session: Session, sort_param=None, sort_order='asc', filter_field=None, filter_value=None):
+def query_filter_sort_rocket(session: Session, sort_param=None, sort_order='asc', filter_field=None, filter_value=None, as_of=None, expand=(), include=()):
     """
-    Retrieve rocket data with optional sorting and filtering.
+    Build the query of rocket data with optional sorting and filtering.
 
     Args:
         session (Session): SQLAlchemy session object.
@@ -13,12 +15,18 @@ def get_filter_sort_rocket(session: Session, sort_param=None, sort_order='asc',
         sort_order (str, optional): Sort order ('asc' or 'desc'). Default is 'asc'.
         filter_field (str, optional): Field to filter by.
         filter_value (str, optional): Value to filter by.
+        as_of (datetime, optional): Time of the history, None for the current data.
+        expand (tuple, optional): Relationships loaded with the records (helpers/query_expand.py).
+        include (tuple, optional): Aggregated values added to the records (Ex: counts).
 
     Returns:
-        list: List of rocket data records.
+        Query: Query of the Rockets records, without executing it
+               (Ex: to read it as DataFrame with pd.read_sql(query.statement, engine)).
     """
     # Create the sesion for the query
-    query = session.query(Rockets)
+    query = query_as_of(session, Rockets, as_of)
+    # The filters and the sort use the columns of the history table with as_of
+    model = HISTORY_MODELS[Rockets] if as_of else Rockets
     
     # Check if both filter parameters are present.
     if (filter_field and not filter_value) or (not filter_field and filter_value):
@@ -26,8 +34,32 @@ def get_filter_sort_rocket(session: Session, sort_param=None, sort_order='asc',
         raise ValueError("Both filter_field and filter_value for Rocket must be provided for filtering.")
     # Applies filtering if both the filter field and value are specified.
     if filter_field and filter_value:
-        query = apply_filtering(query, Rockets, filter_field, filter_value)
+        query = apply_filtering(query, model, filter_field, filter_value)
     # Applies the sorting if the sort parameter is specified.
     if sort_param:
-        query = apply_sorting(query, Rockets, sort_param, sort_order)
-    return query.all()
\ No newline at end of file
+        query = apply_sorting(query, model, sort_param, sort_order)
+    # Related data, the history tables don't have relationships
+    if expand or include:
+        if as_of:
+            raise ValueError("expand and include can't be used with as_of.")
+        query = apply_expand_include(query, Rockets, expand, include)
+    return query
+
+def get_filter_sort_rocket(session: Session, sort_param=None, sort_order='asc', filter_field=None, filter_value=None, as_of=None, expand=(), include=()):
+    """
+    Retrieve rocket data with optional sorting and filtering.
+
+    Args:
+        session (Session): SQLAlchemy session object.
+        sort_param (str, optional): Field to sort by.
+        sort_order (str, optional): Sort order ('asc' or 'desc'). Default is 'asc'.
+        filter_field (str, optional): Field to filter by.
+        filter_value (str, optional): Value to filter by.
+        as_of (datetime, optional): Time of the history, None for the current data.
+        expand (tuple, optional): Relationships loaded with the records (helpers/query_expand.py).
+        include (tuple, optional): Aggregated values added to the records (Ex: counts).
+
+    Returns:
+        list: List of rocket data records (rows (record, value, ...) with include).
+    """
+    return query_filter_sort_rocket(session, sort_param, sort_order, filter_field, filter_value, as_of, expand, include).all()
\ No newline at end of file
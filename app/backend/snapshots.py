@@ -0,0 +1,279 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from helpers.logger import logger
+from config import DATA_DIR, BACKUP_DIR, BACKUP_KEEP
+
+"""
+Store of the JSON snapshots of the SpaceX API (data/<key>/ and backup/<key>/).
+Each snapshot is written in a temporary file and renamed, a reader never finds a half written file.
+The manifest (data/manifest.json) has the current snapshot and the backups of each resource with
+the path, the time, the sha256 and the size, so the rotation and the loading don't list the folders.
+Ex of data/manifest.json:
+{"starlink": {"current": {"file": "raw-starlink-24-05-2024_13-45.json", "path": ".../data/starlink/raw-...json",
+                          "created_at": "2024-05-24T13:45:12Z", "sha256": "...", "size": 5242880, "count": 5000},
+              "backups": [{...}, ...]}}
+The watermark is the last snapshot loaded in the database (set_watermark), a restart continues from it.
+It is saved after each batch, in a small file of each resource (data/watermark-<key>.json), not in the manifest:
+{"sha256": "...", "file": "raw-starlink-....json", "next_batch": 5, "complete": true, ...}
+"""
+
+MANIFEST_NAME = 'manifest.json'
+
+# Only one thread of the process updates the manifest at the same time (the ingest lock elects the process)
+_manifest_lock = threading.Lock()
+
+def manifest_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, MANIFEST_NAME)
+
+def watermark_path(key, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"watermark-{key}.json")
+
+def write_atomic(path, content):
+    """
+    Write the bytes in a temporary file of the same folder, flush them to the disk and rename it.
+
+    Args:
+        path (path): The final file.
+        content (bytes): The content of the file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(content)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, path)
+
+def _entry(path, content, count):
+    return {
+        'file': os.path.basename(path),
+        'path': os.path.abspath(path),
+        'created_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'size': len(content),
+        'count': count
+    }
+
+def _scan_entries(resource_dir):
+    """
+    Entries of the JSON files of a folder, from the oldest to the newest (only to build a missing manifest).
+    """
+    if not os.path.isdir(resource_dir):
+        return []
+    entries = []
+    files = [file for file in os.listdir(resource_dir) if file.endswith('.json')]
+    files.sort(key=lambda file: os.path.getmtime(os.path.join(resource_dir, file)))
+    for file in files:
+        path = os.path.join(resource_dir, file)
+        with open(path, 'rb') as json_file:
+            content = json_file.read()
+        try:
+            count = len(json.loads(content))
+        except ValueError:
+            # Half written file of a previous version of the ingest
+            logger.warning(f"Invalid snapshot {path}, it is not added to the manifest")
+            continue
+        entries.append(_entry(path, content, count))
+    return entries
+
+def rebuild_manifest(data_dir=DATA_DIR, backup_dir=BACKUP_DIR, resources=('rockets', 'launches', 'starlink')):
+    """
+    Build the manifest from the files of the folders (the snapshots saved before the manifest existed).
+
+    Returns:
+        dict: The manifest.
+    """
+    manifest = {}
+    for key in resources:
+        current = _scan_entries(os.path.join(data_dir, key))
+        backups = _scan_entries(os.path.join(backup_dir, key))
+        if not current and not backups:
+            continue
+        # Only the newest file stays in data/, the older ones are moved to the backup
+        for entry in current[:-1]:
+            destination = os.path.join(backup_dir, key, entry['file'])
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(entry['path'], destination)
+            backups.append({**entry, 'path': os.path.abspath(destination)})
+        manifest[key] = {'current': current[-1] if current else None, 'backups': backups}
+    os.makedirs(data_dir, exist_ok=True)
+    write_atomic(manifest_path(data_dir), json.dumps(manifest, indent=4).encode())
+    logger.info(f"Snapshot manifest built from the folders of {data_dir}")
+    return manifest
+
+def load_manifest(data_dir=DATA_DIR):
+    """
+    Read the manifest of the snapshots.
+
+    Args:
+        data_dir (path, optional): The data folder.
+
+    Returns:
+        dict: The manifest, None if the folder doesn't have a manifest.
+    """
+    try:
+        with open(manifest_path(data_dir), 'r') as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return None
+
+def current_snapshot(key, data_dir=DATA_DIR):
+    """
+    Get the entry of the current (newest) snapshot of a resource.
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        data_dir (path, optional): The data folder.
+
+    Returns:
+        dict: The entry of the manifest (path, created_at, sha256, size, count), None if there is no snapshot.
+    """
+    manifest = load_manifest(data_dir) or {}
+    return (manifest.get(key) or {}).get('current')
+
+def gzip_path(entry):
+    """
+    Get the gzip variant of a snapshot (used by the raw endpoints), it is created if it doesn't exist.
+
+    Args:
+        entry (dict): Entry of the manifest.
+
+    Returns:
+        path: The .json.gz file of the snapshot.
+    """
+    path = f"{entry['path']}.gz"
+    if not os.path.exists(path):
+        with open(entry['path'], 'rb') as json_file:
+            write_atomic(path, gzip.compress(json_file.read(), compresslevel=6))
+    return path
+
+def load_watermark(key, data_dir=DATA_DIR, manifest=None):
+    """
+    Read the progress of the load of a resource in the database.
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        data_dir (path, optional): The data folder.
+        manifest (dict, optional): The manifest, the previous versions saved the watermark in it.
+
+    Returns:
+        dict: The watermark, None if the resource was never loaded.
+    """
+    try:
+        with open(watermark_path(key, data_dir), 'r') as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return ((manifest or {}).get(key) or {}).get('watermark')
+
+def set_watermark(key, watermark, data_dir=DATA_DIR):
+    """
+    Save the progress of the load of a snapshot in the database (the watermark of the resource).
+    With 'complete' the snapshot is fully loaded, the next ingest skips it if the data didn't change (same sha256).
+    Only the small file of the resource is written (after each batch), not the manifest.
+    Ex: {"sha256": "...", "file": "raw-starlink-....json", "next_batch": 3, "complete": false}
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        watermark (dict): The progress of the load.
+        data_dir (path, optional): The data folder.
+    """
+    watermark = {**watermark, 'updated_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+    write_atomic(watermark_path(key, data_dir), json.dumps(watermark).encode())
+
+def read_snapshot_bytes(entry):
+    """
+    Read the JSON of a snapshot (without decoding it) and check it with the hash of the manifest.
+
+    Args:
+        entry (dict): Entry of the manifest.
+
+    Returns:
+        bytes: The content of the file.
+    """
+    with open(entry['path'], 'rb') as json_file:
+        content = json_file.read()
+    if hashlib.sha256(content).hexdigest() != entry['sha256']:
+        raise ValueError(f"The snapshot {entry['path']} doesn't match the hash of the manifest")
+    return content
+
+def read_snapshot(entry):
+    """
+    Read the data of a snapshot and check it with the hash of the manifest.
+
+    Args:
+        entry (dict): Entry of the manifest.
+
+    Returns:
+        list: The data of the snapshot.
+    """
+    return json.loads(read_snapshot_bytes(entry))
+
+def write_snapshot(key, data, time_stamp, data_dir=DATA_DIR, backup_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """
+    Save a new snapshot of a resource: atomic write of the file, the previous snapshot is moved
+    to the backup folder and only the newest 'keep' backups are kept, all with the manifest (no folder listing).
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        data (list): The data of the SpaceX API.
+        time_stamp (str): Time stamp of the name of the file.
+        data_dir (path, optional): The data folder.
+        backup_dir (path, optional): The backup folder.
+        keep (int, optional): Number of backups kept.
+
+    Returns:
+        dict: The entry of the new snapshot.
+    """
+    data_subdir = os.path.join(data_dir, key)
+    backup_subdir = os.path.join(backup_dir, key)
+    os.makedirs(data_subdir, exist_ok=True)
+    os.makedirs(backup_subdir, exist_ok=True)
+
+    content = json.dumps(data, indent=4).encode()
+    path = os.path.join(data_subdir, f"raw-{key}-{time_stamp}.json")
+
+    with _manifest_lock:
+        # The manifest is built before the new file exists (first run after an update of the app)
+        manifest = load_manifest(data_dir)
+        if manifest is None:
+            manifest = rebuild_manifest(data_dir, backup_dir)
+
+        write_atomic(path, content)
+        # Compressed copy for the raw endpoints, made once here instead of in each request
+        write_atomic(f"{path}.gz", gzip.compress(content, compresslevel=6))
+        entry = _entry(path, content, len(data))
+        logger.info(f"The data was successfully saved to {path}")
+
+        resource = manifest.setdefault(key, {'current': None, 'backups': []})
+
+        previous = resource.get('current')
+        # Two snapshots in the same minute have the same name, the new one replaced the file
+        if previous and previous['path'] != entry['path']:
+            destination = os.path.join(backup_subdir, previous['file'])
+            try:
+                os.replace(previous['path'], destination)
+                # The backups don't need the compressed copy
+                if os.path.exists(f"{previous['path']}.gz"):
+                    os.remove(f"{previous['path']}.gz")
+                resource['backups'] = [backup for backup in resource['backups'] if backup['file'] != previous['file']]
+                resource['backups'].append({**previous, 'path': os.path.abspath(destination)})
+                logger.info(f"Moved {previous['path']} to {destination}")
+            except FileNotFoundError:
+                logger.warning(f"The snapshot {previous['path']} doesn't exist, it is not moved to the backup")
+        resource['current'] = entry
+
+        # Only the newest backups are kept
+        while len(resource['backups']) > keep:
+            oldest = resource['backups'].pop(0)
+            try:
+                os.remove(oldest['path'])
+                logger.info(f"Removed old backup file: {oldest['file']}")
+            except FileNotFoundError:
+                pass
+
+        write_atomic(manifest_path(data_dir), json.dumps(manifest, indent=4).encode())
+    return entry
@@ -0,0 +1,178 @@
+# Dependencies
+from datetime import datetime, timedelta
+
+import requests
+
+# Other classes
+from helpers.logger import logger
+from backend.spaceX.spaceX_data import get_data
+from config import SPACEX_API_URL, FETCH_PAGE_SIZE, FETCH_LOOKBACK_DAYS
+
+"""
+Incremental client of the SpaceX API (FETCH_MODE=incremental): instead of downloading the whole collection
+with GET /v4/<resource>, it asks POST /v4/<resource>/query for the records newer than the high-water mark
+of the current snapshot, only with the fields saved in the database (select), page by page.
+Ex of the body of a request:
+{"query": {"spaceTrack.EPOCH": {"$gt": "2024-05-20T10:00:00.000000"}},
+ "options": {"select": {"spaceTrack.OBJECT_NAME": 1, ...}, "page": 1, "limit": 1000}}
+The new records are merged in the items of the current snapshot (by id), so the snapshot is still the full collection.
+The raw endpoints serve the snapshot, so it always has the complete records: the first snapshot is a full
+GET, and the records that are not in the snapshot yet (new ids) are asked again without select.
+"""
+
+# Fields of each resource used by backend/transforms.py
+SELECTS = {
+    'rockets': ['id', 'name', 'success_rate_pct', 'cost_per_launch', 'height.meters', 'diameter.meters', 'mass.kg',
+                'first_stage.thrust_sea_level.kN', 'first_stage.thrust_vacuum.kN', 'first_flight'],
+    'launches': ['id', 'name', 'date_utc', 'success', 'rocket', 'flight_number'],
+    'starlink': ['id', 'launch', 'spaceTrack.OBJECT_NAME', 'spaceTrack.LAUNCH_DATE', 'spaceTrack.DECAY_DATE',
+                 'spaceTrack.INCLINATION', 'spaceTrack.APOAPSIS', 'spaceTrack.PERIAPSIS', 'spaceTrack.EPOCH']
+}
+
+def query_data(endpoint, query=None, select=None, page_size=FETCH_PAGE_SIZE):
+    """
+    Get all the pages of a query of the SpaceX API (POST /v4/<endpoint>/query).
+
+    Args:
+        endpoint (str): Resource of the API (Ex: rockets, launches, starlink).
+        query (dict, optional): Filter of the records (MongoDB syntax), all the records by default.
+        select (list, optional): Fields of the records, all of them by default.
+        page_size (int, optional): Records of each page.
+
+    Returns:
+        tuple: The records (or the error) and the status code.
+    """
+    url = f"{SPACEX_API_URL}{endpoint}/query"
+    options = {'limit': page_size, 'page': 1}
+    if select:
+        options['select'] = {field: 1 for field in select}
+    docs = []
+    try:
+        while True:
+            response = requests.post(url, json={'query': query or {}, 'options': options})
+            # To catch an HTTPError for bad responses
+            response.raise_for_status()
+            page = response.json()
+            docs.extend(page['docs'])
+            if not page.get('hasNextPage'):
+                break
+            options['page'] = page['nextPage']
+        logger.info(f"Successfully fetched {len(docs)} records from {url}")
+        return docs, response.status_code
+
+    # Handling specific HTTP errors
+    except requests.exceptions.HTTPError as http_err:
+        error_message = f"HTTP error occurred: {http_err}"
+        logger.critical(error_message)
+        return {"error": error_message}, response.status_code
+
+    # Handling general request exceptions
+    except requests.exceptions.RequestException as request_err:
+        error_message = f"Request error occurred: {request_err}"
+        logger.critical(error_message)
+        return {"error": error_message}, 500
+
+    # Handling any other exceptions (Ex: a page without 'docs')
+    except Exception as e:
+        error_message = f"An error occurred: {e}"
+        logger.critical(error_message)
+        return {"error": error_message}, 500
+
+def high_water_mark(key, items):
+    """
+    Get the high-water mark of a resource from the items of the current snapshot.
+    Starlink: the newest EPOCH of the tracking data (it changes when the orbit or the decay is updated).
+    Launches: the newest date of a launch with result, less FETCH_LOOKBACK_DAYS (late changes of the
+    recent launches), the upcoming launches are always after it. The launches older than the lookback
+    (30 days by default) are not asked again: an upstream edit of an older launch is missed until a
+    full GET (FETCH_MODE=full, or a new snapshot without items).
+    Rockets: None, the collection is small and it is always fetched complete.
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        items (list): Raw items of the current snapshot.
+
+    Returns:
+        str: The mark in ISO format, None to fetch all the records.
+    """
+    if key == 'starlink':
+        epochs = [item['spaceTrack']['EPOCH'] for item in items if (item.get('spaceTrack') or {}).get('EPOCH')]
+        return max(epochs) if epochs else None
+    if key == 'launches':
+        dates = [item['date_utc'] for item in items if item.get('date_utc') and item.get('success') is not None]
+        if not dates:
+            return None
+        newest = datetime.fromisoformat(max(dates)[:19])
+        return (newest - timedelta(days=FETCH_LOOKBACK_DAYS)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return None
+
+def incremental_query(key, mark):
+    """
+    Build the filter of the records after the high-water mark.
+    """
+    if mark is None:
+        return {}
+    if key == 'starlink':
+        return {'spaceTrack.EPOCH': {'$gt': mark}}
+    return {'date_utc': {'$gte': mark}}
+
+def _merge_item(old, new):
+    """
+    Update an item with the fields of the new version (the nested fields one by one), the fields
+    that were not selected keep the value of the old version.
+    """
+    merged = dict(old)
+    for field, value in new.items():
+        if isinstance(value, dict) and isinstance(merged.get(field), dict):
+            merged[field] = _merge_item(merged[field], value)
+        else:
+            merged[field] = value
+    return merged
+
+def merge_items(items, docs):
+    """
+    Merge the records of the query in the items of the snapshot, by id (the new ones at the end).
+
+    Args:
+        items (list): Raw items of the current snapshot.
+        docs (list): Records of the query.
+
+    Returns:
+        list: The items of the new snapshot.
+    """
+    merged = {item['id']: item for item in items}
+    for doc in docs:
+        merged[doc['id']] = _merge_item(merged[doc['id']], doc) if doc['id'] in merged else doc
+    return list(merged.values())
+
+def fetch_incremental(key, items):
+    """
+    Get the records of a resource changed after the high-water mark of the snapshot and merge them.
+    Without snapshot the whole collection is downloaded (GET), the new records are downloaded complete.
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        items (list): Raw items of the current snapshot (empty list if there is no snapshot).
+
+    Returns:
+        tuple: The merged items (or the error), the status code and the number of records fetched.
+    """
+    if not items:
+        data, status_code = get_data(key)
+        return data, status_code, len(data) if status_code == 200 else 0
+
+    mark = high_water_mark(key, items)
+    docs, status_code = query_data(key, incremental_query(key, mark), SELECTS[key])
+    if status_code != 200:
+        return docs, status_code, 0
+    known = {item['id'] for item in items}
+    new_ids = [doc['id'] for doc in docs if doc['id'] not in known]
+    if new_ids:
+        # Only the fields of the database were selected, the new records are asked again with all their fields
+        full_docs, status_code = query_data(key, {'_id': {'$in': new_ids}})
+        if status_code != 200:
+            return full_docs, status_code, 0
+        full = {doc['id']: doc for doc in full_docs}
+        docs = [full.get(doc['id'], doc) for doc in docs]
+    logger.info(f"{len(docs)} {key} records after the high-water mark {mark} ({len(new_ids)} new)")
+    return merge_items(items, docs), status_code, len(docs) + len(new_ids)
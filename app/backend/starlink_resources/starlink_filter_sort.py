@@ -1,11 +1,13 @@
 from helpers.logger import logger
-from helpers.query_sort_filter import apply_filtering, apply_sorting
+from helpers.query_sort_filter import apply_filtering, apply_sorting, apply_altitude_range
+from backend.history import query_as_of
+from helpers.query_expand import apply_expand_include
 from sqlalchemy.orm import Session
-from databases.models import Starlink
+from databases.models import Starlink, HISTORY_MODELS
 
-def get_filter_sort_starlink(session: Session, sort_param=None, sort_order='asc', filter_field=None, filter_value=None):
+def query_filter_sort_starlink(session: Session, sort_param=None, sort_order='asc', filter_field=None, filter_value=None, as_of=None, expand=(), include=(), alt_min=None, alt_max=None):
     """
-    Retrieve Starlink data with optional sorting and filtering.
+    Build the query of Starlink data with optional sorting and filtering.
 
     Args:
         session (Session): SQLAlchemy session object.
@@ -13,12 +15,20 @@ def get_filter_sort_starlink(session: Session, sort_param=None, sort_order='asc'
         sort_order (str, optional): Sort order ('asc' or 'desc'). Default is 'asc'.
         filter_field (str, optional): Field to filter by.
         filter_value (str, optional): Value to filter by.
+        as_of (datetime, optional): Time of the history, None for the current data.
+        expand (tuple, optional): Relationships loaded with the records (helpers/query_expand.py).
+        include (tuple, optional): Aggregated values added to the records (Ex: counts).
+        alt_min (float, optional): Lowest altitude (km) of the orbits, apoapsis >= alt_min.
+        alt_max (float, optional): Highest altitude (km) of the orbits, periapsis <= alt_max.
 
     Returns:
-        list: List of Starlink data records.
+        Query: Query of the Starlink records, without executing it
+               (Ex: to read it as DataFrame with pd.read_sql(query.statement, engine)).
     """
     # Create the sesion for the query
-    query = session.query(Starlink)
+    query = query_as_of(session, Starlink, as_of)
+    # The filters and the sort use the columns of the history table with as_of
+    model = HISTORY_MODELS[Starlink] if as_of else Starlink
     
     # Check if both filter parameters are present.
     if (filter_field and not filter_value) or (not filter_field and filter_value):
@@ -26,8 +36,37 @@ def get_filter_sort_starlink(session: Session, sort_param=None, sort_order='asc'
         raise ValueError("Both filter_field and filter_value for Starlink must be provided for filtering.")
     # Applies filtering if both the filter field and value are specified.
     if filter_field and filter_value:
-        query = apply_filtering(query, Starlink, filter_field, filter_value)
+        query = apply_filtering(query, model, filter_field, filter_value)
+    # Satellites whose orbit crosses the altitude range
+    if alt_min is not None or alt_max is not None:
+        query = apply_altitude_range(query, model, alt_min, alt_max)
     # Applies the sorting if the sort parameter is specified.
     if sort_param:
-        query = apply_sorting(query, Starlink, sort_param, sort_order)
-    return query.all()
\ No newline at end of file
+        query = apply_sorting(query, model, sort_param, sort_order)
+    # Related data, the history tables don't have relationships
+    if expand or include:
+        if as_of:
+            raise ValueError("expand and include can't be used with as_of.")
+        query = apply_expand_include(query, Starlink, expand, include)
+    return query
+
+def get_filter_sort_starlink(session: Session, sort_param=None, sort_order='asc', filter_field=None, filter_value=None, as_of=None, expand=(), include=(), alt_min=None, alt_max=None):
+    """
+    Retrieve Starlink data with optional sorting and filtering.
+
+    Args:
+        session (Session): SQLAlchemy session object.
+        sort_param (str, optional): Field to sort by.
+        sort_order (str, optional): Sort order ('asc' or 'desc'). Default is 'asc'.
+        filter_field (str, optional): Field to filter by.
+        filter_value (str, optional): Value to filter by.
+        as_of (datetime, optional): Time of the history, None for the current data.
+        expand (tuple, optional): Relationships loaded with the records (helpers/query_expand.py).
+        include (tuple, optional): Aggregated values added to the records (Ex: counts).
+        alt_min (float, optional): Lowest altitude (km) of the orbits, apoapsis >= alt_min.
+        alt_max (float, optional): Highest altitude (km) of the orbits, periapsis <= alt_max.
+
+    Returns:
+        list: List of Starlink data records (rows (record, value, ...) with include).
+    """
+    return query_filter_sort_starlink(session, sort_param, sort_order, filter_field, filter_value, as_of, expand, include, alt_min, alt_max).all()
\ No newline at end of file
@@ -0,0 +1,168 @@
+import numpy as np
+
+from databases.models import Starlink, Session
+from backend.data_version import get_data_version
+from backend.read_model import get_read_model
+from helpers.singleflight import singleflight
+from helpers.logger import logger
+from config import READ_ENGINE
+
+"""
+Orbital analytics of the Starlink satellites computed with NumPy over the columns apoapsis, periapsis,
+inclination and decay_date (the columns of the read model, or one query of the four columns).
+The result is kept for each version of the data, the next ingest computes it again.
+Ex:
+api/starlink/orbits?bin_km=10&inclination_bin=1
+{"satellites": {"total": 5000, "active": 4630, "decayed": 370, "mean_altitude_km": 547.3, ...},
+ "altitude_histogram": [{"from": 540.0, "to": 550.0, "satellites": 1530}, ...],
+ "inclination_histogram": [{"from": 53.0, "to": 54.0, "satellites": 1580}, ...],
+ "shells": [{"altitude_from": 540.0, "altitude_to": 550.0, "inclination_from": 53.0, "inclination_to": 54.0,
+             "satellites": 1450, "mean_altitude_km": 546.1, "mean_inclination": 53.05}, ...],
+ "decay_per_month": [{"month": "2021-05", "decayed": 12}, ...]}
+The altitude of a satellite is the mean of its apoapsis and periapsis (km), the histograms and the
+shells only count the active satellites (without decay_date) with orbit data.
+"""
+
+# Limits of the size of the bins (km and degrees), smaller bins would only give one satellite per bin
+MIN_BIN_KM = 0.1
+MAX_BIN_KM = 1000
+MIN_INCLINATION_BIN = 0.01
+MAX_INCLINATION_BIN = 180
+
+# Results of the current version of the data, by size of the bins (at most MAX_CACHED_RESULTS sizes)
+MAX_CACHED_RESULTS = 32
+_cache = {'version': None, 'results': {}}
+
+def _parse_bin(value, default, name, minimum, maximum):
+    """
+    Convert the size of a bin of the request, it must be a number between minimum and maximum (NaN is rejected).
+    """
+    if value is None:
+        return default
+    try:
+        size = float(value)
+    except ValueError:
+        size = None
+    if size is None or not minimum <= size <= maximum:
+        logger.error(f"Invalid {name} for the Starlink orbits: {value}")
+        raise ValueError(f"Invalid {name} '{value}', it must be a number between {minimum} and {maximum}.")
+    return size
+
+def _orbit_columns():
+    """
+    Get the columns of the orbits as arrays: apoapsis, periapsis, inclination (NaN if NULL) and decay_date (NaT if NULL).
+    """
+    if READ_ENGINE == 'memory':
+        columns = get_read_model().tables[Starlink].columns
+        return tuple(columns[name]['values'] for name in ('apoapsis', 'periapsis', 'inclination', 'decay_date'))
+    session = Session()
+    try:
+        rows = session.query(Starlink.apoapsis, Starlink.periapsis, Starlink.inclination, Starlink.decay_date).all()
+    finally:
+        session.close()
+    apoapsis, periapsis, inclination, decay_date = zip(*rows) if rows else ((), (), (), ())
+    return (
+        np.array(apoapsis, dtype=np.float64),
+        np.array(periapsis, dtype=np.float64),
+        np.array(inclination, dtype=np.float64),
+        np.array(['NaT' if value is None else value for value in decay_date], dtype='datetime64[D]')
+    )
+
+def _histogram(values, size):
+    """
+    Number of values in each bin of the given size (only the bins with values, the memory doesn't
+    depend on the distance between the lowest and the highest value).
+    """
+    if not len(values):
+        return []
+    bins, counts = np.unique(np.floor(values / size).astype(np.int64), return_counts=True)
+    return [
+        {'from': round(float(position * size), 3), 'to': round(float((position + 1) * size), 3), 'satellites': int(count)}
+        for position, count in zip(bins, counts)
+    ]
+
+def _shells(altitude, inclination, bin_km, inclination_bin):
+    """
+    Groups of satellites with the same bin of altitude and inclination, from the largest to the smallest.
+    """
+    if not len(altitude):
+        return []
+    altitude_bins = np.floor(altitude / bin_km).astype(np.int64)
+    inclination_bins = np.floor(inclination / inclination_bin).astype(np.int64)
+    # One integer for each pair of bins, np.unique of a 1-D array is much faster than of the pairs.
+    # The pairs are used only if the key could overflow int64 (orbits far from the others)
+    altitude_first, inclination_first = altitude_bins.min(), inclination_bins.min()
+    width = int(inclination_bins.max() - inclination_first) + 1
+    if int(altitude_bins.max() - altitude_first) + 1 <= np.iinfo(np.int64).max // width:
+        keys, groups, counts = np.unique((altitude_bins - altitude_first) * width + (inclination_bins - inclination_first),
+                                         return_inverse=True, return_counts=True)
+        pairs = np.stack([keys // width + altitude_first, keys % width + inclination_first], axis=1)
+    else:
+        pairs, groups, counts = np.unique(np.stack([altitude_bins, inclination_bins], axis=1), axis=0,
+                                          return_inverse=True, return_counts=True)
+        groups = groups.ravel()
+    mean_altitude = np.bincount(groups, weights=altitude) / counts
+    mean_inclination = np.bincount(groups, weights=inclination) / counts
+    shells = [
+        {
+            'altitude_from': round(float(pair[0] * bin_km), 3),
+            'altitude_to': round(float((pair[0] + 1) * bin_km), 3),
+            'inclination_from': round(float(pair[1] * inclination_bin), 3),
+            'inclination_to': round(float((pair[1] + 1) * inclination_bin), 3),
+            'satellites': int(count),
+            'mean_altitude_km': round(float(altitude_mean), 3),
+            'mean_inclination': round(float(inclination_mean), 3)
+        }
+        for pair, count, altitude_mean, inclination_mean in zip(pairs, counts, mean_altitude, mean_inclination)
+    ]
+    shells.sort(key=lambda shell: -shell['satellites'])
+    return shells
+
+@singleflight
+def _compute_orbits(version, bin_km, inclination_bin):
+    apoapsis, periapsis, inclination, decay_date = _orbit_columns()
+    decayed = ~np.isnat(decay_date)
+    with_orbit = ~np.isnan(apoapsis) & ~np.isnan(periapsis) & ~np.isnan(inclination)
+    active = with_orbit & ~decayed
+
+    altitude = (apoapsis[active] + periapsis[active]) / 2
+    active_inclination = inclination[active]
+    months, decay_counts = np.unique(decay_date[decayed].astype('datetime64[M]'), return_counts=True)
+
+    result = {
+        'satellites': {
+            'total': int(len(apoapsis)),
+            'active': int((~decayed).sum()),
+            'decayed': int(decayed.sum()),
+            'active_with_orbit': int(active.sum()),
+            'mean_altitude_km': round(float(altitude.mean()), 3) if len(altitude) else None,
+            'mean_inclination': round(float(active_inclination.mean()), 3) if len(altitude) else None
+        },
+        'altitude_histogram': _histogram(altitude, bin_km),
+        'inclination_histogram': _histogram(active_inclination, inclination_bin),
+        'shells': _shells(altitude, active_inclination, bin_km, inclination_bin),
+        'decay_per_month': [{'month': str(month), 'decayed': int(count)} for month, count in zip(months, decay_counts)]
+    }
+    if _cache['version'] != version or len(_cache['results']) >= MAX_CACHED_RESULTS:
+        _cache['version'], _cache['results'] = version, {}
+    _cache['results'][(bin_km, inclination_bin)] = result
+    return result
+
+def get_starlink_orbits(bin_km=None, inclination_bin=None):
+    """
+    Retrieve the orbital analytics of the Starlink satellites, computed once for each version of the data.
+
+    Args:
+        bin_km (str, optional): Size of the altitude bins in km. Default is 10.
+        inclination_bin (str, optional): Size of the inclination bins in degrees. Default is 1.
+
+    Returns:
+        dict: The totals, the histograms of altitude and inclination, the shells and the decays per month.
+    """
+    bin_km = _parse_bin(bin_km, 10.0, 'bin_km', MIN_BIN_KM, MAX_BIN_KM)
+    inclination_bin = _parse_bin(inclination_bin, 1.0, 'inclination_bin', MIN_INCLINATION_BIN, MAX_INCLINATION_BIN)
+    version = get_data_version()['version']
+    result = _cache['results'].get((bin_km, inclination_bin)) if _cache['version'] == version else None
+    if result is None:
+        result = _compute_orbits(version, bin_km, inclination_bin)
+    return {'data_version': version, 'bin_km': bin_km, 'inclination_bin': inclination_bin, **result}
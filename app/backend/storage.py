@@ -1,255 +1,359 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime  
-from flask import current_app, Flask
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from threading import Thread
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy.exc import IntegrityError, DataError
 
-from databases.models import Rockets, Launches, Starlink, Base
-from config import DATABASE_URI
+from databases.bulk import upsert_rows
+from databases.models import Rockets, Launches, Starlink, Session
+from config import SCHEDULER_INTERVAL_SECONDS, DATA_DIR, BACKUP_DIR, INGEST_BATCH_SIZE, READ_ENGINE, FETCH_MODE
 
 import os
-import json
-import time
 
 # Functions from other files
-from backend.application.api import get_rockets, get_launches, get_starlink
+from backend.spaceX.spaceX_data import get_data
+from backend.spaceX.spaceX_query import fetch_incremental
+from backend.transforms import rocket_record, launch_record, starlink_record
+from backend.decoding import decode_records, decode_batch, decode_ids, split_batches
+from backend.data_version import bump_data_version
+from backend.read_model import refresh_read_model
+from backend.history import record_history, close_missing, utc_now
+from backend.snapshots import write_snapshot, load_manifest, read_snapshot, read_snapshot_bytes, load_watermark, set_watermark, current_snapshot
+from backend.dead_letter import add_dead_letter
 from helpers.logger import logger
 
-def save_data(app):
+# Resources of the SpaceX API that we save
+RESOURCES = ["rockets", "launches", "starlink"]
+
+# Errors of the data of a row, the row goes to the dead letters. Other errors (Ex: OperationalError, the
+# database is down or locked) stop the load, the batch is loaded again in the next cycle
+DATA_ERRORS = (IntegrityError, DataError)
+
+def save_data():
     """
     Function to save the data of the API calls from Space X, we will save it in JSON 
-    and move old files to the backup folder.
-    
-    Args:
-        app (Flask): Flask application context.
+    and move old files to the backup folder (backend/snapshots.py, atomic writes and manifest).
+    With FETCH_MODE='incremental' only the new records are downloaded (backend/spaceX/spaceX_query.py).
+    It doesn't need Flask, it can run in the API or in the ingest process (backend/ingest.py).
+
+    Returns:
+        path: The directory where the data was saved.
     """
-    with app.app_context():
-        logger.info("Starting the save_data process")
-        
-        # Define the endpoints
-        endpoints = {
-            "rockets": get_rockets,
-            "launches": get_launches,
-            "starlink": get_starlink
-        }
-        
-        # Dictionary to store all data
-        all_data = {}  
-        
-        # Get the base directory for this script
-        base_dir = os.path.dirname(os.path.abspath(__file__))
+    logger.info("Starting the save_data process")
+    
+    for key in RESOURCES:
+        # Get the current timestamp in the specified format. 
+        time_stamp = datetime.now().strftime('%d-%m-%Y_%H-%M')
         
-        # Define the destination directories (for data and for backup)
-        data_dir = os.path.join(base_dir, '..', 'data')
-        backup_dir = os.path.join(base_dir, '..', 'backup')
+        # Get the data of the APIs calls
+        if FETCH_MODE == 'incremental':
+            # Only the records after the high-water mark, merged in the current snapshot
+            entry = current_snapshot(key, DATA_DIR)
+            items = read_snapshot(entry) if entry else []
+            data, status_code, _ = fetch_incremental(key, items)
+            if status_code == 200 and data == items:
+                logger.info(f"No new {key} records, the snapshot is not written again")
+                continue
+        else:
+            data, status_code = get_data(key)
         
-        for key, func in endpoints.items():
-            # Get the current timestamp in the specified format. 
-            time_stamp = datetime.now().strftime('%d-%m-%Y_%H-%M')
-            
-            # Create the directory for the data (rockets, launches, starlink) and the backup if doesn't exist
-            data_subdir = os.path.join(data_dir , key)
-            backup_subdir = os.path.join(backup_dir, key)
-            
-            os.makedirs(data_subdir, exist_ok=True)
-            os.makedirs(backup_subdir, exist_ok=True)
-            
-            # Get the data of the APIs calls
-            data, status_code = func()
-            
-            if status_code == 200:
-                # Save the data in a new JSON file.
-                file_name = f"raw-{key}-{time_stamp}.json"
-                file_path = os.path.join(data_subdir, file_name)
-                
-                with open(file_path, 'w') as json_file:
-                    json.dump(data, json_file, indent= 4)
-                    logger.info(f"The data was successfully saved to {file_path}")
-                move_to_backup(data_subdir, backup_subdir)
-            else:
-                logger.error(f"Failed to fetch data for {key}")
-    
-        # Start a thread to run save_to_db after we save the JSON and move the JSON to the backup.
-        db_thread = Thread(target=save_to_db, args=(data_dir,))
-        db_thread.start()
-            
-def move_to_backup(data_subdir, backup_subdir):
+        if status_code == 200:
+            # Save the data in a new JSON file, the previous one goes to the backup
+            write_snapshot(key, data, time_stamp, DATA_DIR, BACKUP_DIR)
+        else:
+            logger.error(f"Failed to fetch data for {key}")
+    return DATA_DIR
+
+def run_ingest(workers=1):
     """
-    Function to move the old JSON files (data of rockets, or launches or starlink to the backup Folder)
+    Run a complete cycle of the ingest: get the data of the SpaceX API, save the JSON
+    (moving the old files to the backup) and save the data in the database.
+
     Args:
-        data_subdir (path): The subdirectory where the data is saved (Ex: data/rockets)
-        backup_subdir (path): The subdirectory where the old data will be save (Ex: backup/rockets)
+        workers (int, optional): Processes that decode the snapshots (only the ingest process, backend/ingest.py,
+            starts them: the embedded scheduler of the API decodes in its own process).
     """
-    
-    files = []  
+    data_dir = save_data()
+    save_to_db(data_dir, workers)
 
-    # Iterate over each file in the directory, check if the file ends with '.json', if so, add it to the 'files' list
-    for i in os.listdir(data_subdir): 
-        if i.endswith('.json'):  
-            files.append(i)  
-    
-    # Sort all the JSON by modification date if there is more than 1
-    if len(files) > 1:
-        # Sorted the files with the modification time
-        files.sort(key=lambda f: os.path.getmtime(os.path.join(data_subdir, f))) 
-    
-    
-    # All files are moved to the backup folder except the most recent one.
-        for file in files[:-1]:
-            source = os.path.join(data_subdir, file)
-            destination = os.path.join(backup_subdir, file)
-            # os.rename: this function move o rename, if there are in the same path, the funtion rename the file, else, move
-            os.rename(source, destination)
-            logger.info(f"Moved {source} to {destination}")  
-    else:
-        logger.info(f"No older files to move to backup in {data_subdir}") 
-    
-    # Ensure only the 40 most recent files are kept in the backup folder
-    cleanup_backup_folder(backup_subdir)
+# Table, transformation and name in the logs of each resource
+DB_RESOURCES = {
+    'rockets': (Rockets, rocket_record, 'Rocket'),
+    'launches': (Launches, launch_record, 'Launch'),
+    'starlink': (Starlink, starlink_record, 'Starlink')
+}
 
-def cleanup_backup_folder(backup_subdir):
+def load_contents(data_dir, key, manifest):
     """
-    Function to clean up the backup folder, ensuring only the 40 most recent files are kept.
+    Read the JSON of a resource (not decoded): the current snapshot of the manifest, or all the JSON files
+    of the folder when it doesn't have a manifest (Ex: folders of the benchmarks).
+
     Args:
-        backup_subdir (path): The subdirectory where the backup data is saved (backup/rockets)
+        data_dir (path): The data folder.
+        key (str): The resource (rockets, launches or starlink).
+        manifest (dict): The manifest of the folder, None if it doesn't have one.
+
+    Returns:
+        list: The content (bytes) of each file, None if there is no data of the resource.
     """
-    files= []
-    # Iterate over each file in the backup directory, check if the file ends with '.json', if so, add it to the 'files' list
-    for i in os.listdir(backup_subdir):
-        if i.endswith('.json'):
-            files.append(i)
-    
-    # Sort all the JSON files by modification date
-    if len(files) > 40:
-        # Sort the files by modification time
-        files.sort(key=lambda f: os.path.getmtime(os.path.join(backup_subdir, f)))
+    if manifest is not None:
+        entry = (manifest.get(key) or {}).get('current')
+        return [read_snapshot_bytes(entry)] if entry else None
 
-        # Remove the oldest files, keeping only the 40 most recent
-        files_to_remove = files[:-40]
-        for file in files_to_remove:
-            os.remove(os.path.join(backup_subdir, file))
-            logger.info(f"Removed old backup file: {file}")
+    resource_dir = os.path.join(data_dir, key)
+    if not os.path.exists(resource_dir):
+        return None
+    contents = []
+    for file in os.listdir(resource_dir):
+        if file.endswith('.json'):
+            with open(os.path.join(resource_dir, file), 'rb') as json_file:
+                contents.append(json_file.read())
+    return contents
 
-def save_to_db(data_dir):
-    """Save the transformed data to the SQL database.
+def decoded_batches(key, contents, first_batch=0, pool=None, max_in_flight=2):
+    """
+    Decode the batches of INGEST_BATCH_SIZE items of the files (backend/decoding.py), in the pool of
+    processes if there is one. Only max_in_flight batches are decoded ahead of the writer, the next batch
+    is sent when the writer takes the oldest one (the memory doesn't grow if the database is slower).
 
     Args:
-        data (list): List of data items to be saved.
-        data_type (string): The type of data being saved (e.g., 'rockets', 'launches', 'starlink').
+        key (str): The resource (rockets, launches or starlink).
+        contents (list): The JSON of each file.
+        first_batch (int, optional): The batches before it are skipped (load resumed).
+        pool (ProcessPoolExecutor, optional): Worker processes, None to decode in this process.
+        max_in_flight (int, optional): Batches sent to the pool and not taken by the writer yet.
+
+    Yields:
+        tuple: (index, rows, rejected) of each batch, in the order of the files.
+    """
+    batches = (batch for content in contents for batch in split_batches(content, INGEST_BATCH_SIZE))
+    in_flight = deque()
+    for index, batch in enumerate(batches):
+        if index < first_batch:
+            continue
+        if pool is None:
+            yield (index, *decode_records(key, batch))
+            continue
+        in_flight.append((index, pool.submit(decode_batch, key, batch)))
+        if len(in_flight) >= max_in_flight:
+            yield _batch_result(*in_flight.popleft())
+    while in_flight:
+        yield _batch_result(*in_flight.popleft())
+
+def _batch_result(index, future):
+    """
+    Wait for a batch of the pool and build the dictionaries of its rows.
     """
+    fields, rows, rejected = future.result()
+    return index, [dict(zip(fields, row)) for row in rows], rejected
+
+def save_batch(key, model, records, changed_at, snapshot):
+    """
+    Save a batch of rows (and their history) in its own transaction, with a bulk upsert (databases/bulk.py).
+    If the data of the batch fails, its rows are saved one by one and the rows that fail go to the dead letters.
+    Other errors are raised (the rows are not dead lettered when the database is down).
+
+    Args:
+        key (str): The resource (rockets, launches or starlink).
+        model (Base): Model of the table.
+        records (list): Rows of the batch.
+        changed_at (datetime): Time (UTC) of the ingest.
+        snapshot (str): Name of the snapshot of the rows.
+
+    Returns:
+        int: Number of rows saved.
+    """
+    session = Session()
     try:
-        # Create the database engine and session
-        engine = create_engine(DATABASE_URI)
-        Session = sessionmaker(bind=engine)
+        # The rows of the batch have different ids (save_resource), one INSERT ... ON CONFLICT for all of them
+        upsert_rows(session.connection(), model, records)
+        record_history(session, model, records, changed_at)
+        session.commit()
+        return len(records)
+    except DATA_ERRORS as e:
+        session.rollback()
+        logger.warning(f"Batch of {key} failed ({e}), saving its rows one by one")
+    finally:
+        session.close()
+
+    saved = 0
+    for record in records:
         session = Session()
-        
-        
-        # Load and save rockets data
-        rockets_dir = os.path.join(data_dir, 'rockets')
-        # To save the rockets data.
-        if os.path.exists(rockets_dir):
-            for file in os.listdir(rockets_dir):
-                if file.endswith('.json'):
-                    with open(os.path.join(rockets_dir, file), 'r') as json_file:
-                        data = json.load(json_file)
-                        for item in data:
-                            rocket = Rockets(
-                                id=item['id'],
-                                name=item['name'],
-                                success_rate_pct=item['success_rate_pct'],
-                                cost_per_launch=item['cost_per_launch'],
-                                height_meters=item['height']['meters'],
-                                diameter_meters=item['diameter']['meters'],
-                                mass_kg=item['mass']['kg'],
-                                thrust_sea_level_kN=item['first_stage']['thrust_sea_level']['kN'],
-                                thrust_vacuum_kN=item['first_stage']['thrust_vacuum']['kN'],
-                                first_flight=item['first_flight']
-                            )
-                            session.merge(rocket)
-            logger.info("Rocket data saved to the database.")
-        else:
-            logger.error("Rocket information is empty.")
-        
-        # Load and save launches data
-        launches_dir = os.path.join(data_dir, 'launches')
-        if os.path.exists(launches_dir):
-            for file in os.listdir(launches_dir):
-                if file.endswith('.json'):
-                    with open(os.path.join(launches_dir, file), 'r') as json_file:
-                        data = json.load(json_file)
-                        for item in data:
-                            launch = Launches(
-                                id=item['id'],
-                                name=item['name'],
-                                date_utc=item['date_utc'],
-                                success=item['success'],
-                                rocket_id=item['rocket'],
-                                flight_number=item['flight_number'],
-                            )
-                            session.merge(launch)
-            logger.info("Launch data saved to the database.")
-        else:
-            logger.error("Launches information is empty.")
-        
-        # Load and save starlink data
-        starlink_dir = os.path.join(data_dir, 'starlink')
-        if os.path.exists(starlink_dir):
-            for file in os.listdir(starlink_dir):
-                if file.endswith('.json'):
-                    with open(os.path.join(starlink_dir, file), 'r') as json_file:
-                        data = json.load(json_file)
-                        for item in data:
-                            starlink = Starlink(
-                                id=item['id'],
-                                object_name=item['spaceTrack']['OBJECT_NAME'],
-                                launch_date=item['spaceTrack']['LAUNCH_DATE'],
-                                decay_date=item['spaceTrack']['DECAY_DATE'],
-                                inclination=item['spaceTrack']['INCLINATION'],
-                                apoapsis=item['spaceTrack']['APOAPSIS'],
-                                periapsis=item['spaceTrack']['PERIAPSIS'],
-                                launch_id=item['launch']
-                            )
-                            session.merge(starlink)
-            logger.info("Starlink data saved to the database.")
-        else:
-            logger.error("Starlink information is empty.")
+        try:
+            upsert_rows(session.connection(), model, [record])
+            record_history(session, model, [record], changed_at)
+            session.commit()
+            saved += 1
+        except DATA_ERRORS as e:
+            session.rollback()
+            add_dead_letter(key, snapshot, record, e)
+        finally:
+            session.close()
+    return saved
+
+def close_deleted(model, contents, changed_at):
+    """
+    Close in the history the records that are not in the snapshot anymore (deleted in the SpaceX API).
+    The rows stay in the current table. A snapshot without ids (Ex: empty) doesn't close anything.
+
+    Args:
+        model (Base): Model of the table.
+        contents (list): The JSON of the files of the snapshot.
+        changed_at (datetime): Time (UTC) of the ingest.
+
+    Returns:
+        int: Number of versions closed.
+    """
+    ids = set().union(*(decode_ids(content) for content in contents))
+    if not ids:
+        return 0
+    session = Session()
+    try:
+        closed = close_missing(session, model, ids, changed_at)
         session.commit()
-        
-    except Exception as e:
-        logger.error(f"Error saving data to the database: {e}")
+        return closed
+    except Exception:
+        session.rollback()
+        raise
     finally:
         session.close()
 
-def start_scheduler(app):
+def save_resource(data_dir, key, manifest, changed_at, pool=None, max_in_flight=2):
+    """
+    Save the current snapshot of a resource in the database, in batches of INGEST_BATCH_SIZE items.
+    The items rejected by the decoding go to the dead letters, the progress is saved in the watermark
+    of the manifest after each batch: a snapshot already loaded is skipped, and a load that was stopped
+    (Ex: the database was down) continues from the batch that failed in the next cycle. When the whole
+    snapshot is saved, the records that are not in it are closed in the history.
+
+    Args:
+        data_dir (path): The data folder.
+        key (str): The resource (rockets, launches or starlink).
+        manifest (dict): The manifest of the folder, None if it doesn't have one.
+        changed_at (datetime): Time (UTC) of the ingest.
+        pool (ProcessPoolExecutor, optional): Worker processes that decode the batches.
+        max_in_flight (int, optional): Batches decoded ahead of the writer.
+
+    Returns:
+        dict: Rows saved, dead letters and if the snapshot was skipped. None if there is no data of the resource.
+    """
+    model, _, label = DB_RESOURCES[key]
+    entry = (manifest.get(key) or {}).get('current') if manifest is not None else None
+    watermark = load_watermark(key, data_dir, manifest) if manifest is not None else None
+    same_snapshot = entry is not None and watermark is not None and watermark.get('sha256') == entry['sha256']
+    if same_snapshot and watermark.get('complete'):
+        logger.info(f"{label} data didn't change since the last load, it is not saved again.")
+        return {'rows': 0, 'dead_letters': 0, 'skipped': True}
+
+    contents = load_contents(data_dir, key, manifest)
+    if contents is None:
+        return None
+    snapshot = entry['file'] if entry else data_dir
+
+    # When a stopped load is resumed the batches already saved (and their bad items) are skipped
+    first_batch = watermark.get('next_batch', 0) if same_snapshot else 0
+    if first_batch:
+        logger.info(f"Resuming the load of {entry['file']} from the batch {first_batch}")
+
+    saved = 0
+    rows = 0
+    dead_letters = 0
+    next_batch = first_batch
+    # Only this thread writes, the batches arrive decoded in order
+    for index, records, rejected in decoded_batches(key, contents, first_batch, pool, max_in_flight):
+        # By id (if an id is twice in the batch the last one wins, an upsert can't update a row twice)
+        records = list({record['id']: record for record in records}.values())
+        # An error of the database stops the load here: the watermark stays at this batch and not complete
+        saved_batch = save_batch(key, model, records, changed_at, snapshot) if records else 0
+        for item, e in rejected:
+            add_dead_letter(key, snapshot, item, e)
+        saved += saved_batch
+        rows += len(records)
+        dead_letters += len(rejected) + len(records) - saved_batch
+        next_batch = index + 1
+        if entry:
+            set_watermark(key, {'sha256': entry['sha256'], 'file': entry['file'], 'next_batch': next_batch, 'complete': False}, data_dir)
+    close_deleted(model, contents, changed_at)
+    if entry:
+        set_watermark(key, {'sha256': entry['sha256'], 'file': entry['file'], 'next_batch': next_batch, 'complete': True,
+                            'rows': rows, 'dead_letters': dead_letters}, data_dir)
+    logger.info(f"{label} data saved to the database.")
+    return {'rows': saved, 'dead_letters': dead_letters, 'skipped': False}
+
+def save_to_db(data_dir, workers=1):
+    """Save the transformed data to the SQL database, and the changes in the history tables.
+    Each resource is saved on its own (an error in the Starlink data doesn't undo the rockets and launches).
+
+    Args:
+        data_dir (path): The directory with the JSON files of each resource (Ex: data/rockets/raw-rockets-....json).
+        workers (int, optional): Processes that decode the snapshots, with 1 they are decoded in this process.
+            The spawned processes import the main script again, only backend/ingest.py passes INGEST_WORKERS.
+
+    Returns:
+        dict: The result of each resource (rows saved, dead letters, skipped or error).
+    """
+    # The same time for all the changes of this ingest
+    changed_at = utc_now()
+    manifest = load_manifest(data_dir)
+    summary = {}
+    # The decoding runs on the other cores, 'spawn' to start clean worker processes (no threads or connections copied)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) if workers > 1 else None
+    try:
+        for key in DB_RESOURCES:
+            try:
+                # Two batches per worker: the workers don't wait for the writer, and the writer doesn't wait for them
+                result = save_resource(data_dir, key, manifest, changed_at, pool, 2 * workers)
+                if result is None:
+                    logger.error(f"{key.capitalize()} information is empty.")
+                    continue
+                summary[key] = result
+            except Exception as e:
+                logger.error(f"Error saving {key} data to the database: {e}")
+                summary[key] = {'error': str(e)}
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # The API and the frontend use the version to know that the data changed
+    if any(result.get('rows') for result in summary.values()):
+        bump_data_version()
+        # The API of this process (embedded ingest) loads the new data before the next request
+        if READ_ENGINE == 'memory':
+            try:
+                refresh_read_model()
+            except Exception as e:
+                logger.error(f"Error loading the read model: {e}")
+    return summary
+
+def start_scheduler():
     """
-    Start the scheduler and execute the save_data method immediately.
+    Start the scheduler that runs the ingest (run_ingest) in a parallel thread.
     """
     scheduler = BackgroundScheduler()
     
     try: 
-        # logger.info("Scheduler started to every 80 secondas")
-        scheduler.add_job(save_data, 'interval', seconds=80, args=[app])
+        # By default every 80 seconds (SCHEDULER_INTERVAL_SECONDS)
+        scheduler.add_job(run_ingest, 'interval', seconds=SCHEDULER_INTERVAL_SECONDS)
     
         # Schedule the save_data function to run every 12 hours.
-        # scheduler.add_job(save_data, 'interval', hours=12)
+        # scheduler.add_job(run_ingest, 'interval', hours=12)
     
         # Other example to Schedule in specific time.
     
         # Schedule the job to run daily at 3 AM
-        # scheduler.add_job(save_data, 'cron', hour=3, minute=0, args=[app])
+        # scheduler.add_job(run_ingest, 'cron', hour=3, minute=0)
         # logger.info("Scheduler started to run daily at 3 AM")
     
         # Schedule the job to run daily at 12 AM
-        # scheduler.add_job(save_data, 'cron', hour=0, minute=0, args=[app])
+        # scheduler.add_job(run_ingest, 'cron', hour=0, minute=0)
         # logger.info("Scheduler started to run daily at 12 AM")
     
         # Schedule the job to run daily at 3 PM
-        # scheduler.add_job(save_data, 'cron', hour=15, minute=0, args=[app])
+        # scheduler.add_job(run_ingest, 'cron', hour=15, minute=0)
         # logger.info("Scheduler started to run daily at 3 PM")
     
-        logger.info("Scheduler started to every 80 seconds")
+        logger.info(f"Scheduler started to every {SCHEDULER_INTERVAL_SECONDS} seconds")
         scheduler.start()
     except Exception as e:
         logger.error(f"An error occurred while starting the scheduler: {e}")
\ No newline at end of file
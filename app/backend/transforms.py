@@ -0,0 +1,94 @@
+from datetime import date, datetime
+
+"""
+Functions to transform the raw items of the SpaceX API into the rows we store in the database.
+Ex:
+rocket_record(item) -> {'id': ..., 'name': ..., 'height_meters': ..., ...}
+Only the fields of the models are kept, the dates are converted to date objects,
+this way the same rows can be saved in PostgreSQL or SQLite.
+"""
+
+def parse_date(value):
+    """
+    Convert a date string of the SpaceX API to a date object.
+
+    Args:
+        value (str | date | None): Date like '2006-03-24' or '2006-03-24T22:30:00.000Z'.
+
+    Returns:
+        date: The date, or None if the value is empty.
+    """
+    if value is None or value == '':
+        return None
+    # datetime is a subclass of date, so check it first
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # We only need the date part (yyyy-mm-dd) of the value
+    return date.fromisoformat(value[:10])
+
+def rocket_record(item):
+    """
+    Transform a raw rocket of the SpaceX API into a row of the 'rockets' table.
+
+    Args:
+        item (dict): Raw rocket data.
+
+    Returns:
+        dict: The rocket row.
+    """
+    return {
+        'id': item['id'],
+        'name': item['name'],
+        'success_rate_pct': item['success_rate_pct'],
+        'cost_per_launch': item['cost_per_launch'],
+        'height_meters': item['height']['meters'],
+        'diameter_meters': item['diameter']['meters'],
+        'mass_kg': item['mass']['kg'],
+        'thrust_sea_level_kN': item['first_stage']['thrust_sea_level']['kN'],
+        'thrust_vacuum_kN': item['first_stage']['thrust_vacuum']['kN'],
+        'first_flight': parse_date(item['first_flight'])
+    }
+
+def launch_record(item):
+    """
+    Transform a raw launch of the SpaceX API into a row of the 'launches' table.
+
+    Args:
+        item (dict): Raw launch data.
+
+    Returns:
+        dict: The launch row.
+    """
+    return {
+        'id': item['id'],
+        'name': item['name'],
+        'date_utc': parse_date(item['date_utc']),
+        # True/False, None if the launch has no result yet (upcoming launches)
+        'success': bool(item['success']) if item['success'] is not None else None,
+        'rocket_id': item['rocket'],
+        'flight_number': item['flight_number']
+    }
+
+def starlink_record(item):
+    """
+    Transform a raw Starlink satellite of the SpaceX API into a row of the 'starlink' table.
+
+    Args:
+        item (dict): Raw Starlink data.
+
+    Returns:
+        dict: The Starlink row.
+    """
+    space_track = item['spaceTrack']
+    return {
+        'id': item['id'],
+        'object_name': space_track['OBJECT_NAME'],
+        'launch_date': parse_date(space_track['LAUNCH_DATE']),
+        'decay_date': parse_date(space_track['DECAY_DATE']),
+        'inclination': space_track['INCLINATION'],
+        'apoapsis': space_track['APOAPSIS'],
+        'periapsis': space_track['PERIAPSIS'],
+        'launch_id': item['launch']
+    }
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+"""
+Benchmark of the altitude range queries of /api/starlink (periapsis <= alt_max AND apoapsis >= alt_min):
+the SQL query with the index (periapsis, apoapsis) and without it (table scan), and the read model in
+memory with the interval index (binary searches in the presorted columns) and with a scan of the arrays.
+Run it from the app folder:
+python -m benchmarks.bench_altitude_range --starlink 200000 --output bench_altitude.json
+"""
+
+# (alt_min, alt_max) of the queries: a narrow shell, a wide band and the open ranges
+RANGES = [(540.0, 560.0), (400.0, 500.0), (None, 350.0), (555.0, None)]
+
+def _scan_rows(table, alt_min, alt_max):
+    """
+    The same range with a comparison of every row (what the index avoids).
+    """
+    import numpy as np
+
+    mask = np.ones(len(table.rows), dtype=bool)
+    if alt_max is not None:
+        mask &= table.columns['periapsis']['values'] <= alt_max
+    if alt_min is not None:
+        mask &= table.columns['apoapsis']['values'] >= alt_min
+    return np.flatnonzero(mask)
+
+def bench_sql(alt_ranges, repeat):
+    """
+    Measure the range in the database with the index and after dropping it. The rows are counted
+    (query_filter_sort_starlink(...).count()), the time of the ORM objects is not the access to the table.
+    """
+    from sqlalchemy import text
+    from benchmarks.bench_hot_paths import _measure
+    from databases.models import Session, engine
+    from databases.migrations import create_index
+    from backend.starlink_resources.starlink_filter_sort import query_filter_sort_starlink
+
+    results = []
+    for access in ('index', 'scan'):
+        if access == 'scan':
+            with engine.begin() as connection:
+                connection.execute(text("DROP INDEX IF EXISTS ix_starlink_periapsis_apoapsis"))
+        for alt_min, alt_max in alt_ranges:
+            session = Session()
+            try:
+                query = lambda: query_filter_sort_starlink(session, alt_min=alt_min, alt_max=alt_max).count()
+                rows = query()
+                timing = _measure(query, repeat)
+            finally:
+                session.close()
+            results.append({'group': 'sql', 'access': access, 'alt_min': alt_min, 'alt_max': alt_max, 'rows': rows, **timing})
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        create_index(connection, 'ix_starlink_periapsis_apoapsis', 'starlink', ['periapsis', 'apoapsis'])
+    return results
+
+def bench_memory(alt_ranges, repeat):
+    """
+    Measure the rows of the range in the read model, with the interval index and with a scan.
+    """
+    from benchmarks.bench_hot_paths import _measure
+    from databases.models import Starlink
+    from backend.read_model import get_read_model, _altitude_rows
+
+    table = get_read_model().tables[Starlink]
+    results = []
+    for access, rows_function in (('index', _altitude_rows), ('scan', _scan_rows)):
+        for alt_min, alt_max in alt_ranges:
+            rows = len(rows_function(table, alt_min, alt_max))
+            timing = _measure(lambda: rows_function(table, alt_min, alt_max), repeat)
+            results.append({'group': 'memory', 'access': access, 'alt_min': alt_min, 'alt_max': alt_max, 'rows': rows, **timing})
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the altitude range queries of the Starlink satellites.")
+    parser.add_argument('--starlink', type=int, default=100000, help="Number of Starlink satellites.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs of each measure.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the synthetic data.")
+    parser.add_argument('--database-uri', default=None, help="Database to use, by default a temporary SQLite database.")
+    parser.add_argument('--output', default=None, help="JSON file for the results, by default the standard output.")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='spacex-bench-')
+    # The modules of the API create the engine and read the folders when imported, so they are set before
+    os.environ['DATABASE_URI'] = args.database_uri or 'sqlite:///' + os.path.join(work_dir, 'bench.db')
+    os.environ['DATA_DIR'] = os.path.join(work_dir, 'data')
+
+    from benchmarks.synthetic_data import generate_payloads, write_snapshots
+    from databases.models import create_tables, engine
+    from backend.storage import save_to_db
+
+    create_tables()
+    payloads = generate_payloads(args.starlink, seed=args.seed)
+    write_snapshots(payloads, os.environ['DATA_DIR'])
+    save_to_db(os.environ['DATA_DIR'])
+
+    results = bench_memory(RANGES, args.repeat) + bench_sql(RANGES, args.repeat)
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'database': engine.dialect.name,
+            'starlink': len(payloads['starlink']),
+            'repeat': args.repeat,
+            'seed': args.seed
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json_file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+    return report
+
+if __name__ == '__main__':
+    main()
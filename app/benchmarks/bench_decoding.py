@@ -0,0 +1,100 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+"""
+Benchmark of the decoding of the snapshots: json.loads and the functions of backend/transforms.py
+(dictionaries of all the fields of the items, then the rows) against the typed decoding of
+backend/decoding.py (msgspec structs with only the stored fields, dates parsed while decoding),
+with valid snapshots and with a snapshot that has an invalid item (decoded item by item).
+Run it from the app folder:
+python -m benchmarks.bench_decoding --starlink 100000 --output bench_decoding.json
+"""
+
+RESOURCES = ['rockets', 'launches', 'starlink']
+
+def dict_records(key, content):
+    """
+    The rows with json.loads and the functions of backend/transforms.py (the decoding before the structs).
+    """
+    from backend.decoding import _decode_with_json
+    return _decode_with_json(key, content)
+
+def _best_time(function, repeat):
+    """
+    The best time (seconds) of several runs, and the result of the last one.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def bench_resource(key, content, repeat, invalid=False):
+    """
+    Measure both decoders with the JSON of a resource.
+
+    Returns:
+        list: Records per second of each decoder.
+    """
+    from backend.decoding import decode_records
+
+    results = []
+    for decoder, function in (('dict', dict_records), ('typed', decode_records)):
+        seconds, (rows, rejected) = _best_time(lambda: function(key, content), repeat)
+        results.append({
+            'resource': key,
+            'decoder': decoder,
+            'invalid_item': invalid,
+            'records': len(rows),
+            'rejected': len(rejected),
+            'bytes': len(content),
+            'seconds': round(seconds, 4),
+            'records_per_second': round((len(rows) + len(rejected)) / seconds) if seconds else None
+        })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the decoding of the snapshots into rows.")
+    parser.add_argument('--starlink', type=int, default=100000, help="Number of Starlink satellites.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs of each measure.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the synthetic data.")
+    parser.add_argument('--output', default=None, help="JSON file for the results, by default the standard output.")
+    args = parser.parse_args(argv)
+
+    from benchmarks.synthetic_data import generate_payloads
+    from backend.decoding import msgspec
+
+    payloads = generate_payloads(args.starlink, seed=args.seed)
+    results = []
+    for key in RESOURCES:
+        results += bench_resource(key, json.dumps(payloads[key]).encode(), args.repeat)
+    # A satellite without tracking data in the middle of the snapshot
+    satellites = list(payloads['starlink'])
+    satellites[len(satellites) // 2] = {'id': 'invalid', 'launch': None}
+    results += bench_resource('starlink', json.dumps(satellites).encode(), args.repeat, invalid=True)
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'msgspec': msgspec.__version__ if msgspec is not None else None,
+            'starlink': len(payloads['starlink']),
+            'repeat': args.repeat,
+            'seed': args.seed
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json_file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+    return report
+
+if __name__ == '__main__':
+    main()
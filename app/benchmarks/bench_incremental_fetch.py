@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+"""
+Benchmark of the download of the SpaceX API against the local stub: the full GET of each collection
+(FETCH_MODE=full) and the incremental fetch (FETCH_MODE=incremental), the first cycle without snapshot
+and a second cycle after a part of the satellites changed their tracking data and new satellites were added.
+It also checks that the merged items of the second cycle are the same as a full GET (the fields saved in the
+database and the complete records served by the raw endpoints), it exits with 1 if they are not.
+Run it from the app folder:
+python -m benchmarks.bench_incremental_fetch --starlink 100000 --changed 0.01 --new 100 --output bench_fetch.json
+"""
+
+RESOURCES = ['rockets', 'launches', 'starlink']
+
+def _cycle(server, fetch):
+    """
+    Run a fetch of each resource and measure its time and the bytes sent by the stub.
+
+    Args:
+        server (ThreadingHTTPServer): The stub server.
+        fetch (callable): Function of the resource that returns (items, records fetched).
+
+    Returns:
+        tuple: The results by resource and the items by resource.
+    """
+    results = {}
+    items = {}
+    for key in RESOURCES:
+        bytes_before = server.bytes_sent
+        start = time.perf_counter()
+        items[key], fetched = fetch(key)
+        results[key] = {
+            'records_fetched': fetched,
+            'records': len(items[key]),
+            'bytes': server.bytes_sent - bytes_before,
+            'seconds': round(time.perf_counter() - start, 4)
+        }
+    return results, items
+
+def change_satellites(payloads, fraction, epoch='2030-01-01T00:00:00.000000'):
+    """
+    Change the tracking data (EPOCH and orbit) of a part of the satellites, as a new day of the real API.
+
+    Returns:
+        int: Number of satellites changed.
+    """
+    step = max(1, int(1 / fraction)) if fraction else 0
+    changed = payloads['starlink'][::step] if step else []
+    for satellite in changed:
+        satellite['spaceTrack']['EPOCH'] = epoch
+        satellite['spaceTrack']['APOAPSIS'] = round(satellite['spaceTrack']['APOAPSIS'] - 0.5, 3)
+    return len(changed)
+
+def check_items(key, merged, full):
+    """
+    Compare the items of the incremental fetch with the ones of a full GET, by id.
+
+    Returns:
+        dict: If the fields saved in the database and the complete records are the same.
+    """
+    from backend.decoding import TRANSFORMS
+
+    merged = sorted(merged, key=lambda item: item['id'])
+    full = sorted(full, key=lambda item: item['id'])
+    return {
+        'stored_fields': [TRANSFORMS[key](item) for item in merged] == [TRANSFORMS[key](item) for item in full],
+        'complete_records': merged == full
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the full and incremental download of the SpaceX API.")
+    parser.add_argument('--starlink', type=int, default=10000, help="Number of Starlink satellites.")
+    parser.add_argument('--changed', type=float, default=0.01, help="Fraction of the satellites changed between cycles.")
+    parser.add_argument('--new', type=int, default=100, help="Satellites added between cycles.")
+    parser.add_argument('--page-size', type=int, default=1000, help="Records of each page of the queries.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the synthetic data.")
+    parser.add_argument('--output', default=None, help="JSON file for the results, by default the standard output.")
+    args = parser.parse_args(argv)
+
+    from benchmarks.synthetic_data import generate_payloads
+    from benchmarks.spacex_stub import start_stub_server
+
+    payloads = generate_payloads(args.starlink, seed=args.seed)
+    # The new satellites are not in the API until the second cycle (newer EPOCH than the snapshot)
+    new_satellites = payloads['starlink'][len(payloads['starlink']) - args.new:] if args.new else []
+    del payloads['starlink'][len(payloads['starlink']) - len(new_satellites):]
+    server, url = start_stub_server(payloads)
+    # The modules of the app read the configuration when imported
+    os.environ['SPACEX_API_URL'] = url
+    os.environ['FETCH_PAGE_SIZE'] = str(args.page_size)
+    os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='spacex-bench-'))
+
+    from backend.spaceX.spaceX_data import get_data
+    from backend.spaceX.spaceX_query import fetch_incremental
+
+    def full(key):
+        data, _ = get_data(key)
+        return data, len(data)
+
+    def incremental(snapshot):
+        def fetch(key):
+            items, _, fetched = fetch_incremental(key, snapshot.get(key, []))
+            return items, fetched
+        return fetch
+
+    full_results, _ = _cycle(server, full)
+    first_results, snapshot = _cycle(server, incremental({}))
+    changed = change_satellites(payloads, args.changed)
+    for satellite in new_satellites:
+        satellite['spaceTrack']['EPOCH'] = '2030-01-01T00:00:00.000000'
+    payloads['starlink'].extend(new_satellites)
+    server.reload_bodies()
+    next_results, merged = _cycle(server, incremental(snapshot))
+    checks = {key: check_items(key, merged[key], get_data(key)[0]) for key in RESOURCES}
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'starlink': len(payloads['starlink']),
+            'changed_satellites': changed,
+            'new_satellites': len(new_satellites),
+            'page_size': args.page_size,
+            'seed': args.seed
+        },
+        'results': {
+            'full': full_results,
+            'incremental_first': first_results,
+            'incremental_next': next_results
+        },
+        'checks': checks
+    }
+    server.shutdown()
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json_file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+    return report
+
+if __name__ == '__main__':
+    report = main()
+    sys.exit(0 if all(all(check.values()) for check in report['checks'].values()) else 1)
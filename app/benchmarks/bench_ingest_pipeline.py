@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+"""
+Benchmark of the ingest pipeline (backend/storage.py save_to_db): the snapshots are decoded in batches by
+INGEST_WORKERS processes and saved by a single writer. It measures the decoding stage alone (the batches
+of the snapshot without the database) and the whole ingest in a new database, for each number of workers.
+Run it from the app folder:
+python -m benchmarks.bench_ingest_pipeline --starlink 100000 --workers 1 2 4 --output bench_pipeline.json
+"""
+
+def bench_decoding(data_dir, workers):
+    """
+    Decode all the batches of the Starlink snapshot with the pool, without saving them.
+
+    Returns:
+        dict: Rows, seconds and rows per second.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from backend.storage import load_contents, decoded_batches
+
+    contents = load_contents(data_dir, 'starlink', None)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) if workers > 1 else None
+    try:
+        if pool is not None:
+            # The workers are started before the measure
+            list(pool.map(abs, range(workers)))
+        start = time.perf_counter()
+        rows = sum(len(records) for _, records, _ in decoded_batches('starlink', contents, pool=pool, max_in_flight=2 * workers))
+        seconds = time.perf_counter() - start
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {'stage': 'decoding', 'workers': workers, 'rows': rows, 'seconds': round(seconds, 3),
+            'rows_per_second': round(rows / seconds) if seconds else None}
+
+def bench_ingest(data_dir, workers):
+    """
+    Save the snapshots in empty tables with save_to_db.
+
+    Returns:
+        dict: Rows saved, seconds and rows per second.
+    """
+    from databases.models import Base, engine
+    from backend.storage import save_to_db
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    start = time.perf_counter()
+    summary = save_to_db(data_dir, workers=workers)
+    seconds = time.perf_counter() - start
+    rows = sum(result.get('rows', 0) for result in summary.values())
+    return {'stage': 'ingest', 'workers': workers, 'rows': rows, 'seconds': round(seconds, 3),
+            'rows_per_second': round(rows / seconds) if seconds else None}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the decoding processes and the writer of the ingest.")
+    parser.add_argument('--starlink', type=int, default=100000, help="Number of Starlink satellites.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Numbers of worker processes to measure.")
+    parser.add_argument('--skip-ingest', action='store_true', help="Only measure the decoding stage.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the synthetic data.")
+    parser.add_argument('--output', default=None, help="JSON file for the results, by default the standard output.")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='spacex-bench-')
+    # The modules of the app create the engine and read the folders when imported, so they are set before
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(work_dir, 'bench.db')
+    os.environ['DATA_DIR'] = os.path.join(work_dir, 'data')
+    os.environ['DEAD_LETTER_DIR'] = os.path.join(work_dir, 'dead_letter')
+
+    from benchmarks.synthetic_data import generate_payloads, write_snapshots
+
+    payloads = generate_payloads(args.starlink, seed=args.seed)
+    write_snapshots(payloads, os.environ['DATA_DIR'])
+
+    results = [bench_decoding(os.environ['DATA_DIR'], workers) for workers in args.workers]
+    if not args.skip_ingest:
+        results += [bench_ingest(os.environ['DATA_DIR'], workers) for workers in args.workers]
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'cpus': os.cpu_count(),
+            'starlink': len(payloads['starlink']),
+            'seed': args.seed
+        },
+        'results': results
+    }
+    shutil.rmtree(work_dir, ignore_errors=True)
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json_file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+    return report
+
+if __name__ == '__main__':
+    main()
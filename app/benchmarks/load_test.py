@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+"""
+Load test of the Flask API with a local stand-in of the SpaceX API.
+Run it from the app folder:
+python -m benchmarks.load_test --concurrency 16 --duration 30 --output load.json
+
+The harness:
+1. Starts the stub of the SpaceX API (benchmarks/spacex_stub.py).
+2. Fills a database (temporary SQLite by default or --database-uri) with the same data.
+3. Starts app.py (or serve.py with --server production) in another process pointing to the stub and the database.
+4. Sends a weighted mix of requests with N concurrent clients and gives throughput and latency percentiles.
+The test runs two phases: 'baseline' without ingest and 'ingest' with the scheduler running
+every --ingest-interval seconds, to measure the interference of the background ingest thread.
+"""
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mix of requests: (label, path, weight)
+DEFAULT_MIX = [
+    ('dashboard', '/api/dashboard', 3),
+    ('dashboard_html', '/api/dashboard/html', 1),
+    ('rockets', '/api/rockets?sort_low=cost_per_launch', 1),
+    ('rockets_html', '/api/rockets/html', 1),
+    ('launches_year', '/api/launches?filter_field=date_utc&filter_value=2020&sort_low=flight_number', 2),
+    ('launches_text_html', '/api/launches/html?filter_field=name&filter_value=Mission 1&sort_high=date_utc', 1),
+    ('starlink_year', '/api/starlink?filter_field=launch_date&filter_value=2021&sort_high=periapsis', 2),
+    ('starlink_text', '/api/starlink?filter_field=object_name&filter_value=STARLINK-1', 2),
+    ('starlink_html', '/api/starlink/html?filter_field=launch_date&filter_value=2020', 1)
+]
+
+def _free_port():
+    """
+    Get a free TCP port of the machine.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _percentile(sorted_values, pct):
+    """
+    Get the percentile of a sorted list (nearest rank).
+    """
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def _summary(samples, seconds):
+    """
+    Summarize a list of (latency in ms, status code) samples.
+    """
+    latencies = sorted(latency for latency, _ in samples)
+    errors = len([status for _, status in samples if status is None or status >= 500])
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / seconds, 1) if seconds else None,
+        'p50_ms': round(_percentile(latencies, 50), 3) if latencies else None,
+        'p90_ms': round(_percentile(latencies, 90), 3) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 95), 3) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 99), 3) if latencies else None,
+        'max_ms': round(latencies[-1], 3) if latencies else None
+    }
+
+def parse_mix(values):
+    """
+    Change the weights of the default mix with 'label=weight' values (weight 0 removes the request).
+
+    Args:
+        values (list): Values like ['dashboard=5', 'starlink_html=0'].
+
+    Returns:
+        list: The mix (label, path, weight).
+    """
+    weights = {}
+    for value in values or []:
+        label, _, weight = value.partition('=')
+        if label not in {item[0] for item in DEFAULT_MIX}:
+            raise ValueError(f"Unknown request of the mix: {label}")
+        weights[label] = int(weight)
+    mix = [(label, path, weights.get(label, weight)) for label, path, weight in DEFAULT_MIX]
+    return [item for item in mix if item[2] > 0]
+
+def seed_database(database_uri, payloads, work_dir):
+    """
+    Fill the database with the synthetic data before starting the app.
+    """
+    os.environ['DATABASE_URI'] = database_uri
+    from benchmarks.synthetic_data import write_snapshots
+    from databases.models import create_tables
+    from backend.storage import save_to_db
+
+    create_tables()
+    seed_dir = os.path.join(work_dir, 'seed')
+    write_snapshots(payloads, seed_dir)
+    save_to_db(seed_dir)
+
+def start_app(port, env, log_path, server='dev'):
+    """
+    Start the app in another process and wait until it answers.
+
+    Args:
+        port (int): Port of the app.
+        env (dict): Environment variables of the app.
+        log_path (path): File for the output of the app.
+        server (str): 'dev' for the Flask server of app.py or 'production' for serve.py (gunicorn).
+
+    Returns:
+        Popen: The process of the app.
+    """
+    if server == 'production':
+        env = dict(env, WEB_BIND=f'127.0.0.1:{port}')
+        command = [sys.executable, 'serve.py']
+    else:
+        command = [sys.executable, '-c', f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    log_file = open(log_path, 'w')
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The app stopped during the start, see {log_path}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/rockets", timeout=2)
+            return process
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"The app did not start in 60 seconds, see {log_path}")
+
+def run_load(base_url, mix, concurrency, duration, warmup, seed):
+    """
+    Send the mix of requests with concurrent clients during the given seconds.
+
+    Returns:
+        dict: Summary of all the requests and of each request of the mix.
+    """
+    labels = [item[0] for item in mix]
+    paths = {item[0]: item[1] for item in mix}
+    weights = [item[2] for item in mix]
+
+    def client(number, stop_at, record_from):
+        rng = random.Random(seed + number)
+        session = requests.Session()
+        samples = []
+        while time.time() < stop_at:
+            label = rng.choices(labels, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = session.get(base_url + paths[label], timeout=60).status_code
+            except requests.exceptions.RequestException:
+                status = None
+            latency = (time.perf_counter() - start) * 1000
+            if time.time() >= record_from:
+                samples.append((label, latency, status))
+        session.close()
+        return samples
+
+    record_from = time.time() + warmup
+    stop_at = record_from + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(client, number, stop_at, record_from) for number in range(concurrency)]
+        samples = [sample for future in futures for sample in future.result()]
+
+    by_label = defaultdict(list)
+    for label, latency, status in samples:
+        by_label[label].append((latency, status))
+    return {
+        'total': _summary([(latency, status) for _, latency, status in samples], duration),
+        'requests': {label: _summary(by_label[label], duration) for label in labels}
+    }
+
+def run_phase(name, args, mix, env, work_dir):
+    """
+    Start the app with the environment of the phase, send the load and stop the app.
+    """
+    port = _free_port()
+    log_path = os.path.join(work_dir, f'app-{name}.log')
+    process = start_app(port, env, log_path, args.server)
+    try:
+        result = run_load(f"http://127.0.0.1:{port}", mix, args.concurrency, args.duration, args.warmup, args.seed)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    with open(log_path) as log_file:
+        app_log = log_file.read()
+    # Each ingest cycle starts with save_data and ends when the Starlink data is saved
+    # (or skipped, when the snapshot is the same of the last load)
+    result['ingest_cycles_started'] = app_log.count("Starting the save_data process")
+    result['ingest_cycles_completed'] = app_log.count("Starlink data saved to the database.") + \
+        app_log.count("Starlink data didn't change since the last load")
+    result['app_log'] = log_path
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test of the Flask API with a local SpaceX stand-in.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients.")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds of load of each phase.")
+    parser.add_argument('--warmup', type=float, default=2, help="Seconds of load before recording.")
+    parser.add_argument('--starlink', type=int, default=10000, help="Number of Starlink satellites.")
+    parser.add_argument('--ingest-interval', type=int, default=5, help="Seconds between ingest cycles in the 'ingest' phase.")
+    parser.add_argument('--stub-delay-ms', type=int, default=0, help="Latency of the SpaceX stub in milliseconds.")
+    parser.add_argument('--phases', default='baseline,ingest', help="Phases to run (baseline, ingest).")
+    parser.add_argument('--mix', action='append', help="Weight of a request of the mix, like dashboard=5 (repeatable).")
+    parser.add_argument('--server', choices=['dev', 'production'], default='dev', help="Flask development server or serve.py (gunicorn).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-uri', default=None, help="Database to use, by default a temporary SQLite database.")
+    parser.add_argument('--output', default=None, help="JSON file for the results, by default the standard output.")
+    args = parser.parse_args(argv)
+
+    from benchmarks.synthetic_data import generate_payloads
+    from benchmarks.spacex_stub import start_stub_server
+
+    mix = parse_mix(args.mix)
+    work_dir = tempfile.mkdtemp(prefix='spacex-load-')
+    database_uri = args.database_uri or 'sqlite:///' + os.path.join(work_dir, 'load.db')
+
+    payloads = generate_payloads(args.starlink, seed=args.seed)
+    stub, stub_url = start_stub_server(payloads, delay_ms=args.stub_delay_ms)
+    seed_database(database_uri, payloads, work_dir)
+
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URI': database_uri,
+        'SPACEX_API_URL': stub_url,
+        'DATA_DIR': os.path.join(work_dir, 'data'),
+        'BACKUP_DIR': os.path.join(work_dir, 'backup')
+    })
+    phases = {}
+    try:
+        for name in args.phases.split(','):
+            phase_env = dict(env)
+            # Without ingest the first cycle of the scheduler happens after the test
+            phase_env['SCHEDULER_INTERVAL_SECONDS'] = str(args.ingest_interval if name == 'ingest' else 86400)
+            phases[name] = run_phase(name, args, mix, phase_env, work_dir)
+    finally:
+        stub.shutdown()
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'database': database_uri.split(':')[0],
+            'starlink': args.starlink,
+            'server': args.server,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'ingest_interval': args.ingest_interval,
+            'mix': [{'label': label, 'path': path, 'weight': weight} for label, path, weight in mix]
+        },
+        'phases': phases
+    }
+    if 'baseline' in phases and 'ingest' in phases:
+        baseline = phases['baseline']['total']
+        ingest = phases['ingest']['total']
+        # Interference of the ingest: loss of throughput and increase of the latency
+        report['ingest_interference'] = {
+            'throughput_change_pct': round((ingest['throughput_rps'] - baseline['throughput_rps']) / baseline['throughput_rps'] * 100, 1) if baseline['throughput_rps'] else None,
+            'p50_change_ms': round(ingest['p50_ms'] - baseline['p50_ms'], 3) if ingest['p50_ms'] is not None and baseline['p50_ms'] is not None else None,
+            'p99_change_ms': round(ingest['p99_ms'] - baseline['p99_ms'], 3) if ingest['p99_ms'] is not None and baseline['p99_ms'] is not None else None
+        }
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json_file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+    return report
+
+if __name__ == '__main__':
+    main()
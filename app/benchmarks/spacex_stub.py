@@ -0,0 +1,202 @@
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from benchmarks.synthetic_data import generate_payloads
+
+"""
+Local server that replaces https://api.spacexdata.com/v4/ in benchmarks and load tests.
+It serves synthetic data with the same shape of the SpaceX API:
+GET /v4/rockets, /v4/launches and /v4/starlink
+POST /v4/<resource>/query with the subset of the query interface used by the incremental fetch:
+filters by field ($gt, $gte, $lt, $lte, $in or equal, dotted fields like 'spaceTrack.EPOCH'), select and pages.
+The queries read the payloads in each request, the benchmarks can change them between cycles.
+Run it alone from the app folder:
+python -m benchmarks.spacex_stub --port 8765 --starlink 10000
+And give SPACEX_API_URL=http://127.0.0.1:8765/v4/ to the app.
+"""
+
+OPERATORS = {
+    '$gt': lambda value, operand: value > operand,
+    '$gte': lambda value, operand: value >= operand,
+    '$lt': lambda value, operand: value < operand,
+    '$lte': lambda value, operand: value <= operand,
+    '$in': lambda value, operand: value in operand
+}
+
+def _get_field(item, field):
+    """
+    Value of a dotted field of an item (Ex: 'spaceTrack.EPOCH'), None if it doesn't exist.
+    The API returns the _id of MongoDB as id.
+    """
+    if field == '_id':
+        field = 'id'
+    for part in field.split('.'):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(part)
+    return item
+
+def _matches(item, query):
+    """
+    Check if an item matches the filter of a query.
+    """
+    for field, condition in query.items():
+        value = _get_field(item, field)
+        if isinstance(condition, dict):
+            if value is None:
+                return False
+            if not all(OPERATORS[operator](value, operand) for operator, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+def _project(item, select):
+    """
+    Copy of the item with only the selected fields (and the id).
+    """
+    projected = {'id': item['id']}
+    for field in select:
+        value = _get_field(item, field)
+        if value is None and field.split('.')[0] not in item:
+            continue
+        target = projected
+        parts = field.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return projected
+
+def query_payload(items, body):
+    """
+    Answer a POST /query of the SpaceX API (paginated response of mongoose-paginate).
+
+    Args:
+        items (list): Raw items of the resource.
+        body (dict): Body of the request ('query' and 'options').
+
+    Returns:
+        dict: The page with 'docs' and the pagination fields.
+    """
+    options = body.get('options') or {}
+    query = body.get('query') or {}
+    matched = [item for item in items if _matches(item, query)] if query else items
+    limit = int(options.get('limit', 10))
+    page = int(options.get('page', 1))
+    total_pages = max(1, -(-len(matched) // limit))
+    docs = matched[(page - 1) * limit:page * limit]
+    select = options.get('select')
+    if select:
+        docs = [_project(item, list(select)) for item in docs]
+    return {
+        'docs': docs,
+        'totalDocs': len(matched),
+        'limit': limit,
+        'page': page,
+        'totalPages': total_pages,
+        'hasPrevPage': page > 1,
+        'hasNextPage': page < total_pages,
+        'prevPage': page - 1 if page > 1 else None,
+        'nextPage': page + 1 if page < total_pages else None
+    }
+
+def make_stub_server(payloads, host='127.0.0.1', port=0, delay_ms=0):
+    """
+    Create the stub server of the SpaceX API.
+
+    Args:
+        payloads (dict): Raw data by resource ('rockets', 'launches', 'starlink').
+        host (str): Host of the server.
+        port (int): Port of the server, 0 to use any free port.
+        delay_ms (int): Delay added to each response to emulate the latency of the real API.
+
+    Returns:
+        ThreadingHTTPServer: The server (not started yet).
+    """
+    # The JSON of the GET is generated only once (the stub should not be the bottleneck),
+    # server.reload_bodies() generates it again after a change of the payloads
+    bodies = {}
+
+    def reload_bodies():
+        bodies.update({key: json.dumps(data).encode('utf-8') for key, data in payloads.items()})
+    reload_bodies()
+
+    class SpaceXStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, body, status):
+            # Counted before the write, the client can measure as soon as it gets the body
+            server.bytes_sent += len(body)
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            key = self.path.split('?')[0].strip('/').split('/')[-1]
+            body = bodies.get(key)
+            if delay_ms:
+                time.sleep(delay_ms / 1000)
+            if body is None:
+                self._send(json.dumps({"error": "Not Found"}).encode('utf-8'), 404)
+            else:
+                self._send(body, 200)
+
+        def do_POST(self):
+            parts = self.path.split('?')[0].strip('/').split('/')
+            request_body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if delay_ms:
+                time.sleep(delay_ms / 1000)
+            if len(parts) < 2 or parts[-1] != 'query' or parts[-2] not in payloads:
+                self._send(json.dumps({"error": "Not Found"}).encode('utf-8'), 404)
+                return
+            try:
+                page = query_payload(payloads[parts[-2]], json.loads(request_body or b'{}'))
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(json.dumps({"error": str(e)}).encode('utf-8'), 400)
+                return
+            self._send(json.dumps(page).encode('utf-8'), 200)
+
+        def log_message(self, format, *args):
+            # Without logs of each request, the load tests make a lot of them
+            pass
+
+    server = ThreadingHTTPServer((host, port), SpaceXStubHandler)
+    # Bytes of the bodies sent, to compare the size of the downloads
+    server.bytes_sent = 0
+    server.reload_bodies = reload_bodies
+    return server
+
+def start_stub_server(payloads, host='127.0.0.1', port=0, delay_ms=0):
+    """
+    Start the stub server in a parallel thread.
+
+    Returns:
+        tuple: The server and the base URL to use as SPACEX_API_URL.
+    """
+    server = make_stub_server(payloads, host, port, delay_ms)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v4/"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in of the SpaceX API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--starlink', type=int, default=10000, help="Number of Starlink satellites.")
+    parser.add_argument('--delay-ms', type=int, default=0, help="Delay of each response in milliseconds.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    server = make_stub_server(generate_payloads(args.starlink, seed=args.seed), args.host, args.port, args.delay_ms)
+    print(f"SpaceX stub serving on http://{args.host}:{server.server_address[1]}/v4/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
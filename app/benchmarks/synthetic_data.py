@@ -0,0 +1,195 @@
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+"""
+Functions to generate synthetic data with the same shape of the SpaceX API (v4).
+Ex:
+generate_payloads(starlink=100000) -> {'rockets': [...], 'launches': [...], 'starlink': [...]}
+The launches reference the rockets and the Starlink satellites reference the launches,
+so the data can be saved in a database with foreign keys.
+"""
+
+ROCKET_NAMES = ['Falcon 1', 'Falcon 9', 'Falcon Heavy', 'Starship']
+
+def _object_id(rng):
+    """
+    Generate an id with the same format of the SpaceX API (24 hex characters).
+    """
+    return '%024x' % rng.getrandbits(96)
+
+def generate_rockets(rng, count):
+    """
+    Generate the raw data of the rockets.
+
+    Args:
+        rng (Random): Random generator.
+        count (int): Number of rockets.
+
+    Returns:
+        list: Raw rockets.
+    """
+    rockets = []
+    for i in range(count):
+        rockets.append({
+            'id': _object_id(rng),
+            'name': ROCKET_NAMES[i % len(ROCKET_NAMES)] + (f' {i}' if i >= len(ROCKET_NAMES) else ''),
+            'type': 'rocket',
+            'active': rng.random() > 0.3,
+            'stages': rng.randint(1, 2),
+            'boosters': rng.randint(0, 2),
+            'success_rate_pct': rng.randint(0, 100),
+            'cost_per_launch': rng.randint(1, 100) * 1000000,
+            'first_flight': (date(2006, 1, 1) + timedelta(days=rng.randint(0, 6000))).isoformat(),
+            'country': 'United States',
+            'company': 'SpaceX',
+            'height': {'meters': round(rng.uniform(20, 120), 1), 'feet': round(rng.uniform(60, 400), 1)},
+            'diameter': {'meters': round(rng.uniform(1.5, 9), 2), 'feet': round(rng.uniform(5, 30), 1)},
+            'mass': {'kg': rng.randint(30000, 5000000), 'lb': rng.randint(60000, 11000000)},
+            'first_stage': {
+                'thrust_sea_level': {'kN': rng.randint(400, 75000), 'lbf': rng.randint(90000, 17000000)},
+                'thrust_vacuum': {'kN': rng.randint(500, 80000), 'lbf': rng.randint(100000, 18000000)},
+                'reusable': rng.random() > 0.5,
+                'engines': rng.randint(1, 33),
+                'fuel_amount_tons': round(rng.uniform(40, 3400), 1),
+                'burn_time_sec': rng.randint(100, 200)
+            },
+            'description': 'Synthetic rocket generated for benchmarks.',
+            'wikipedia': 'https://en.wikipedia.org/wiki/SpaceX'
+        })
+    return rockets
+
+def generate_launches(rng, count, rocket_ids):
+    """
+    Generate the raw data of the launches.
+
+    Args:
+        rng (Random): Random generator.
+        count (int): Number of launches.
+        rocket_ids (list): Ids of the rockets used by the launches.
+
+    Returns:
+        list: Raw launches.
+    """
+    launches = []
+    start = datetime(2006, 3, 24, 22, 30)
+    for i in range(count):
+        launch_date = start + timedelta(hours=rng.randint(0, 18 * 365 * 24))
+        launches.append({
+            'id': _object_id(rng),
+            'name': f'Mission {i + 1}',
+            'flight_number': i + 1,
+            'date_utc': launch_date.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'date_unix': int(launch_date.timestamp()),
+            'date_precision': 'hour',
+            'upcoming': False,
+            'success': rng.choice([True, True, True, True, False, None]),
+            'rocket': rng.choice(rocket_ids),
+            'details': 'Synthetic launch generated for benchmarks.',
+            'crew': [],
+            'ships': [],
+            'capsules': [],
+            'payloads': [_object_id(rng)],
+            'launchpad': _object_id(rng),
+            'cores': [{'core': _object_id(rng), 'flight': rng.randint(1, 15), 'reused': rng.random() > 0.5, 'landing_success': rng.random() > 0.2}],
+            'links': {'patch': {'small': None, 'large': None}, 'webcast': None, 'wikipedia': None},
+            'auto_update': True
+        })
+    return launches
+
+def generate_starlink(rng, count, launch_ids):
+    """
+    Generate the raw data of the Starlink satellites.
+
+    Args:
+        rng (Random): Random generator.
+        count (int): Number of satellites.
+        launch_ids (list): Ids of the launches of the satellites.
+
+    Returns:
+        list: Raw Starlink satellites.
+    """
+    satellites = []
+    for i in range(count):
+        launch_date = date(2019, 5, 24) + timedelta(days=rng.randint(0, 2000))
+        decayed = rng.random() < 0.15
+        decay_date = (launch_date + timedelta(days=rng.randint(30, 1500))).isoformat() if decayed else None
+        periapsis = round(rng.uniform(330, 560), 3)
+        satellites.append({
+            'id': _object_id(rng),
+            'version': rng.choice(['v0.9', 'v1.0', 'v1.5']),
+            'launch': rng.choice(launch_ids),
+            'longitude': round(rng.uniform(-180, 180), 3),
+            'latitude': round(rng.uniform(-90, 90), 3),
+            'height_km': round(rng.uniform(330, 570), 3),
+            'velocity_kms': round(rng.uniform(7.5, 7.7), 3),
+            'spaceTrack': {
+                'CCSDS_OMM_VERS': '2.0',
+                'OBJECT_NAME': f'STARLINK-{i + 1}',
+                'OBJECT_ID': f'{launch_date.year}-{i % 1000:03d}A',
+                'EPOCH': launch_date.isoformat() + 'T00:00:00.000000',
+                'MEAN_MOTION': round(rng.uniform(15, 16), 8),
+                'ECCENTRICITY': round(rng.uniform(0, 0.002), 7),
+                'INCLINATION': rng.choice([53.0, 53.2, 70.0, 97.6]) + round(rng.uniform(-0.1, 0.1), 4),
+                'RA_OF_ASC_NODE': round(rng.uniform(0, 360), 4),
+                'ARG_OF_PERICENTER': round(rng.uniform(0, 360), 4),
+                'MEAN_ANOMALY': round(rng.uniform(0, 360), 4),
+                'CLASSIFICATION_TYPE': 'U',
+                'NORAD_CAT_ID': 44000 + i,
+                'REV_AT_EPOCH': rng.randint(1, 20000),
+                'BSTAR': round(rng.uniform(0, 0.001), 8),
+                'SEMIMAJOR_AXIS': round(6378 + periapsis + 5, 3),
+                'PERIOD': round(rng.uniform(91, 96), 3),
+                'APOAPSIS': round(periapsis + rng.uniform(0, 15), 3),
+                'PERIAPSIS': periapsis,
+                'OBJECT_TYPE': 'PAYLOAD',
+                'LAUNCH_DATE': launch_date.isoformat(),
+                'SITE': 'AFETR',
+                'DECAY_DATE': decay_date
+            }
+        })
+    return satellites
+
+def generate_payloads(starlink=10000, launches=None, rockets=4, seed=42):
+    """
+    Generate the raw data of all the resources.
+
+    Args:
+        starlink (int): Number of Starlink satellites (10k to 1M for benchmarks).
+        launches (int, optional): Number of launches, by default one per 50 satellites (at least 200).
+        rockets (int): Number of rockets.
+        seed (int): Seed of the random generator, the same seed gives the same data.
+
+    Returns:
+        dict: Raw data by resource ('rockets', 'launches', 'starlink').
+    """
+    rng = random.Random(seed)
+    if launches is None:
+        launches = max(200, starlink // 50)
+    rockets_data = generate_rockets(rng, rockets)
+    launches_data = generate_launches(rng, launches, [rocket['id'] for rocket in rockets_data])
+    starlink_data = generate_starlink(rng, starlink, [launch['id'] for launch in launches_data])
+    return {'rockets': rockets_data, 'launches': launches_data, 'starlink': starlink_data}
+
+def write_snapshots(payloads, data_dir, time_stamp=None):
+    """
+    Save the payloads in JSON files with the same layout of the ingest (data/<key>/raw-<key>-<time>.json).
+
+    Args:
+        payloads (dict): Raw data by resource.
+        data_dir (path): Destination directory.
+        time_stamp (str, optional): Time stamp of the file names.
+
+    Returns:
+        dict: Path of the file by resource.
+    """
+    time_stamp = time_stamp or datetime.now().strftime('%d-%m-%Y_%H-%M')
+    paths = {}
+    for key, data in payloads.items():
+        subdir = os.path.join(data_dir, key)
+        os.makedirs(subdir, exist_ok=True)
+        paths[key] = os.path.join(subdir, f"raw-{key}-{time_stamp}.json")
+        with open(paths[key], 'w') as json_file:
+            json.dump(data, json_file)
+    return paths
@@ -5,4 +5,67 @@ import os
 load_dotenv()
 
 # Get the database URI from environment variables
-DATABASE_URI = os.getenv('DATABASE_URI')
\ No newline at end of file
+DATABASE_URI = os.getenv('DATABASE_URI')
+
+# The API Requets URL for "SpaceX API" (can point to a local stub for load tests)
+SPACEX_API_URL = os.getenv('SPACEX_API_URL', 'https://api.spacexdata.com/v4/')
+
+# How the ingest gets the data: 'full' (GET of the whole collections) or 'incremental' (POST /query of the
+# records after the high-water mark of the snapshot, only the saved fields, FETCH_PAGE_SIZE records by page).
+# FETCH_LOOKBACK_DAYS: days before the newest launch with result that are fetched again (late changes)
+FETCH_MODE = os.getenv('FETCH_MODE', 'full')
+FETCH_PAGE_SIZE = int(os.getenv('FETCH_PAGE_SIZE', '1000'))
+FETCH_LOOKBACK_DAYS = int(os.getenv('FETCH_LOOKBACK_DAYS', '30'))
+
+# Seconds between each run of the scheduler that saves the data of the SpaceX API
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv('SCHEDULER_INTERVAL_SECONDS', '80'))
+
+# Folders where the JSON files of the SpaceX API are saved (by default app/data and app/backup)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(APP_DIR, 'data'))
+BACKUP_DIR = os.getenv('BACKUP_DIR', os.path.join(APP_DIR, 'backup'))
+
+# Number of old snapshots of each resource kept in the backup folder
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '40'))
+
+# Rows saved in each transaction of the ingest, and folder of the records that could not be saved
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '1000'))
+DEAD_LETTER_DIR = os.getenv('DEAD_LETTER_DIR', os.path.join(DATA_DIR, 'dead_letter'))
+
+# Processes of backend/ingest.py that decode the batches of the snapshots while the ingest saves the previous ones
+# (backend/decoding.py), with 1 the batches are decoded in the process of the ingest. By default 1: the writer
+# is slower than the decoding in one process. The embedded ingest of the API always decodes in its own process
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '1'))
+
+# Source of the *-raw endpoints: 'snapshot' (the newest JSON saved by the ingest, the SpaceX API only
+# if there is no snapshot yet) or 'upstream' (the SpaceX API in each request)
+RAW_SOURCE = os.getenv('RAW_SOURCE', 'snapshot')
+
+# Dashboard statistics: 'parallel' (the three groups at the same time on a pool of threads) or 'sequential'.
+# With 'parallel' the groups that are not ready after DASHBOARD_TIMEOUT_SECONDS are left out of the response
+DASHBOARD_MODE = os.getenv('DASHBOARD_MODE', 'parallel')
+# DASHBOARD_WORKERS is shared by the concurrent requests of a process: by default 3 groups for each thread (WEB_THREADS)
+DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', str(3 * int(os.getenv('WEB_THREADS', '4')))))
+DASHBOARD_TIMEOUT_SECONDS = float(os.getenv('DASHBOARD_TIMEOUT_SECONDS', '10'))
+
+# Engine of the reads of the list endpoints and the dashboard: 'sql' (a query in each request) or 'memory'
+# (the tables in NumPy arrays, loaded again when the data version changes, backend/read_model.py)
+READ_ENGINE = os.getenv('READ_ENGINE', 'sql')
+
+# How the ingest runs: 'embedded' (scheduler inside the API, only in one process) or 'off' (separate ingest process)
+INGEST_MODE = os.getenv('INGEST_MODE', 'embedded')
+
+# File lock used to elect the only process that runs the ingest
+INGEST_LOCK_FILE = os.getenv('INGEST_LOCK_FILE', os.path.join(DATA_DIR, '.ingest.lock'))
+
+# Apply the pending migrations of the schema when the API or the ingest start (databases/migrations.py).
+# Set it to 'false' to run them only with: python -m databases.migrations upgrade
+AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'true').lower() == 'true'
+
+# File lock used to run the migrations in only one process at the same time (not PostgreSQL)
+MIGRATIONS_LOCK_FILE = os.getenv('MIGRATIONS_LOCK_FILE', os.path.join(DATA_DIR, '.migrations.lock'))
+
+# Production server (serve.py): address, worker processes and threads of each worker
+WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:5001')
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', str((os.cpu_count() or 1) * 2 + 1)))
+WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
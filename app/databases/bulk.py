@@ -0,0 +1,43 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+"""
+Bulk writes of rows (dictionaries) in one statement for each batch, instead of one merge for each row.
+Ex:
+with engine.begin() as connection:
+    upsert_rows(connection, Starlink, rows)
+"""
+
+# Rows of each INSERT (SQLite accepts up to 32766 parameters in a statement)
+DEFAULT_BATCH_SIZE = 1000
+
+def _insert(connection, model):
+    if connection.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    if connection.dialect.name == 'sqlite':
+        return sqlite.insert(model)
+    raise ValueError(f"Bulk upsert is not supported for the database '{connection.dialect.name}'.")
+
+def upsert_rows(connection, model, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert the rows, or update them if the primary key already exists (INSERT ... ON CONFLICT DO UPDATE).
+
+    Args:
+        connection (Connection): Connection of the transaction.
+        model (Base): Model of the table.
+        rows (list): Rows with all the columns of the table.
+        batch_size (int, optional): Rows of each statement.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = list(rows)
+    primary_key = [column.name for column in model.__table__.primary_key.columns]
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        statement = _insert(connection, model).values(batch)
+        updates = {
+            column.name: statement.excluded[column.name]
+            for column in model.__table__.columns if column.name not in primary_key
+        }
+        connection.execute(statement.on_conflict_do_update(index_elements=primary_key, set_=updates))
+    return len(rows)
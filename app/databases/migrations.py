@@ -0,0 +1,256 @@
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import Boolean, inspect, text
+
+from config import MIGRATIONS_LOCK_FILE
+from databases.models import Base, engine, HISTORY_MODELS, OPEN_VALID_TO
+from helpers.logger import logger
+from helpers.process_lock import try_acquire_lock, release_lock
+
+"""
+Migrations of the schema of the database (Rockets, Launches and Starlink).
+Each migration has a number, the numbers applied to the database are saved in the table 'schema_migrations',
+so an existing deployment only runs the migrations it doesn't have yet.
+Ex:
+python -m databases.migrations status
+python -m databases.migrations upgrade
+
+A new migration is a function added at the end of MIGRATIONS (with the next number).
+The indexes are created with create_index, on PostgreSQL it uses CREATE INDEX CONCURRENTLY,
+the table is not locked for writes while the index is built in a live database.
+"""
+
+VERSION_TABLE = 'schema_migrations'
+
+# Key of the PostgreSQL advisory lock, only one process migrates the database at the same time
+ADVISORY_LOCK_KEY = 7310462
+
+# Seconds between the tries of the lock when upgrade waits for other process
+LOCK_POLL_SECONDS = 1
+
+def create_index(connection, name, table, columns, where=None):
+    """
+    Create an index if it doesn't exist.
+    On PostgreSQL the index is built CONCURRENTLY (the migration must run with transactional=False),
+    an INVALID index left by a failed CREATE INDEX CONCURRENTLY is dropped and built again
+    (IF NOT EXISTS would keep it, and PostgreSQL doesn't use it in the queries).
+
+    Args:
+        connection (Connection): Connection of the migration.
+        name (str): Name of the index.
+        table (str): Name of the table.
+        columns (list): Columns of the index.
+        where (str, optional): Condition of a partial index (Ex: 'success IS NOT NULL').
+    """
+    concurrently = 'CONCURRENTLY ' if connection.dialect.name == 'postgresql' else ''
+    if concurrently:
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+        ), {'name': name}).first()
+        if invalid:
+            logger.warning(f"Index {name} is INVALID (failed build), it is dropped and created again.")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    statement = f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    if where:
+        statement += f" WHERE {where}"
+    connection.execute(text(statement))
+    logger.info(f"Index {name} created on {table}.")
+
+def initial_tables(connection):
+    """
+    Tables of the first version of the models (only the missing tables are created).
+    """
+    Base.metadata.create_all(connection)
+
+def launches_success_boolean(connection):
+    """
+    Convert the column 'success' of the launches from text ('true'/'false'/'none') to a nullable boolean.
+    """
+    columns = {column['name']: column['type'] for column in inspect(connection).get_columns('launches')}
+    if isinstance(columns.get('success'), Boolean):
+        return
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            "ALTER TABLE launches ALTER COLUMN success TYPE BOOLEAN USING "
+            "CASE lower(success) WHEN 'true' THEN TRUE WHEN 'false' THEN FALSE ELSE NULL END"
+        ))
+    else:
+        # SQLite can't change the type of a column: new column, copy the values and replace the old one
+        connection.execute(text("ALTER TABLE launches ADD COLUMN success_bool BOOLEAN"))
+        connection.execute(text(
+            "UPDATE launches SET success_bool = "
+            "CASE lower(success) WHEN 'true' THEN 1 WHEN 'false' THEN 0 ELSE NULL END"
+        ))
+        connection.execute(text("ALTER TABLE launches DROP COLUMN success"))
+        connection.execute(text("ALTER TABLE launches RENAME COLUMN success_bool TO success"))
+    logger.info("Column launches.success migrated to boolean.")
+
+def launches_success_index(connection):
+    """
+    Partial index of the launches with a result (the ones counted as successful or failed).
+    """
+    create_index(connection, 'ix_launches_success', 'launches', ['success'], where='success IS NOT NULL')
+
+def relation_and_date_indexes(connection):
+    """
+    Indexes of the foreign keys (joins and group by rocket) and of the dates used to sort.
+    """
+    create_index(connection, 'ix_launches_rocket_id', 'launches', ['rocket_id'])
+    create_index(connection, 'ix_launches_date_utc', 'launches', ['date_utc'])
+    create_index(connection, 'ix_starlink_launch_id', 'starlink', ['launch_id'])
+    create_index(connection, 'ix_starlink_launch_date', 'starlink', ['launch_date'])
+
+def history_tables(connection):
+    """
+    History tables (SCD type 2) of the rockets, launches and satellites.
+    The rows that are already in the database are the first version, valid from now.
+    """
+    Base.metadata.create_all(connection, tables=[history.__table__ for history in HISTORY_MODELS.values()])
+    valid_from = datetime.now(timezone.utc).replace(tzinfo=None)
+    for model, history in HISTORY_MODELS.items():
+        if connection.execute(text(f"SELECT COUNT(*) FROM {history.__tablename__}")).scalar():
+            continue
+        fields = ', '.join(column.name for column in model.__table__.columns)
+        connection.execute(
+            text(f"INSERT INTO {history.__tablename__} ({fields}, valid_from, valid_to) "
+                 f"SELECT {fields}, :valid_from, :valid_to FROM {model.__tablename__}"),
+            {'valid_from': valid_from, 'valid_to': OPEN_VALID_TO}
+        )
+
+def starlink_altitude_index(connection):
+    """
+    Index of the orbits of the satellites for the altitude range queries (periapsis first, then apoapsis).
+    """
+    create_index(connection, 'ix_starlink_periapsis_apoapsis', 'starlink', ['periapsis', 'apoapsis'])
+
+# (number, migration, transactional), in order.
+# transactional=False for the migrations that can't run inside a transaction (CREATE INDEX CONCURRENTLY)
+MIGRATIONS = [
+    (1, initial_tables, True),
+    (2, launches_success_boolean, True),
+    (3, launches_success_index, False),
+    (4, relation_and_date_indexes, False),
+    (5, history_tables, True),
+    (6, starlink_altitude_index, False),
+]
+
+def _create_version_table(connection):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+    ))
+
+def _record(connection, number, migration):
+    connection.execute(
+        text(f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+        {'version': number, 'name': migration.__name__, 'applied_at': datetime.now(timezone.utc).isoformat()}
+    )
+
+def applied_versions():
+    """
+    Get the numbers of the migrations applied to the database.
+
+    Returns:
+        set: The numbers of the applied migrations.
+    """
+    with engine.begin() as connection:
+        _create_version_table(connection)
+        return {row[0] for row in connection.execute(text(f"SELECT version FROM {VERSION_TABLE}"))}
+
+def _upgrade():
+    model_tables = set(Base.metadata.tables)
+    existing_tables = set(inspect(engine).get_table_names())
+    applied = applied_versions()
+
+    # New database: the tables of the models already have the last schema (with the indexes),
+    # the migrations are only recorded as applied
+    if not applied and not model_tables & existing_tables:
+        with engine.begin() as connection:
+            Base.metadata.create_all(connection)
+            for number, migration, _ in MIGRATIONS:
+                _record(connection, number, migration)
+        logger.info("Tables created.")
+        return [number for number, _, _ in MIGRATIONS]
+
+    done = []
+    for number, migration, transactional in MIGRATIONS:
+        if number in applied:
+            continue
+        logger.info(f"Applying migration {number} ({migration.__name__})")
+        if transactional:
+            with engine.begin() as connection:
+                migration(connection)
+                _record(connection, number, migration)
+        else:
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                migration(connection)
+                _record(connection, number, migration)
+        done.append(number)
+    if not done:
+        logger.info("The database schema is up to date.")
+    return done
+
+def upgrade(wait=False):
+    """
+    Apply the migrations that the database doesn't have yet.
+    Only one process migrates at the same time (advisory lock on PostgreSQL, file lock on other databases).
+    By default a process that doesn't get the lock skips the migrations: a process blocked in
+    pg_advisory_lock keeps a snapshot open, and CREATE INDEX CONCURRENTLY of the process that migrates
+    waits for that snapshot (a deadlock that PostgreSQL doesn't detect). With wait=True the lock is
+    tried again every LOCK_POLL_SECONDS, without a query waiting in the database.
+
+    Args:
+        wait (bool, optional): Wait until the other process finishes instead of skipping the migrations.
+
+    Returns:
+        list: Numbers of the migrations applied now (empty if other process has the lock).
+    """
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as lock_connection:
+            while not lock_connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': ADVISORY_LOCK_KEY}).scalar():
+                if not wait:
+                    logger.info("Other process is applying the migrations, they are skipped in this process.")
+                    return []
+                time.sleep(LOCK_POLL_SECONDS)
+            try:
+                return _upgrade()
+            finally:
+                lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': ADVISORY_LOCK_KEY})
+
+    if not try_acquire_lock(MIGRATIONS_LOCK_FILE, wait=wait):
+        logger.info("Other process is applying the migrations, they are skipped in this process.")
+        return []
+    try:
+        return _upgrade()
+    finally:
+        release_lock(MIGRATIONS_LOCK_FILE)
+
+def status():
+    """
+    Get the state of each migration.
+
+    Returns:
+        list: (number, name, applied) of each migration.
+    """
+    applied = applied_versions()
+    return [(number, migration.__name__, number in applied) for number, migration, _ in MIGRATIONS]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrations of the schema of the database.")
+    parser.add_argument('command', choices=['upgrade', 'status'])
+    args = parser.parse_args(argv)
+
+    if args.command == 'upgrade':
+        applied = upgrade(wait=True)
+        print(f"Applied migrations: {applied}" if applied else "The database schema is up to date.")
+    else:
+        for number, name, applied in status():
+            print(f"{number:>4}  {'applied' if applied else 'pending':<8} {name}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
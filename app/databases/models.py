@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, Date, inspect, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import create_engine, Column, String, Integer, Float, Date, DateTime, Boolean, Index, text, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
-from config import DATABASE_URI
+from config import DATABASE_URI, AUTO_MIGRATE
 
 from helpers.logger import logger
 # Declarative base for defining models
@@ -64,21 +66,28 @@ class Launches(Base):
         id (str): Unique identifier for the launch.
         name (str): Name of the launch.
         date_utc (date): Date of the launch in UTC.
-        success (str): Success of the launch (True/False).
+        success (bool): Success of the launch (True/False, None if the launch has no result yet).
         rocket_id (str): Identifier of the rocket used.
         flight_number (int): Flight number.
     """
     __tablename__ = 'launches'
     id = Column(String, primary_key=True)
     name = Column(String)
-    date_utc = Column(Date)
-    success = Column(String)
-    rocket_id = Column(String, ForeignKey('rockets.id'))
+    date_utc = Column(Date, index=True)
+    success = Column(Boolean, nullable=True)
+    rocket_id = Column(String, ForeignKey('rockets.id'), index=True)
     flight_number = Column(Integer)
     
     
     rocket = relationship('Rockets', back_populates='launches')
     starlinks = relationship('Starlink', back_populates='launch')
+
+    # Partial index, only the launches with a result (the ones counted as successful or failed)
+    __table_args__ = (
+        Index('ix_launches_success', 'success',
+              postgresql_where=text('success IS NOT NULL'),
+              sqlite_where=text('success IS NOT NULL')),
+    )
     
     def to_dict(self):
         return {
@@ -109,14 +118,19 @@ class Starlink(Base):
     __tablename__ = 'starlink'
     id = Column(String, primary_key=True)
     object_name = Column(String)
-    launch_date = Column(Date)
+    launch_date = Column(Date, index=True)
     decay_date = Column(Date)
     inclination = Column(Float)
     apoapsis = Column(Float)
     periapsis = Column(Float)
-    launch_id = Column(String, ForeignKey('launches.id'))
+    launch_id = Column(String, ForeignKey('launches.id'), index=True)
     
     launch = relationship('Launches', back_populates='starlinks')
+
+    # Altitude range of the orbits (periapsis <= alt_max AND apoapsis >= alt_min)
+    __table_args__ = (
+        Index('ix_starlink_periapsis_apoapsis', 'periapsis', 'apoapsis'),
+    )
     
     def to_dict(self):
         return {
@@ -129,6 +143,105 @@ class Starlink(Base):
             'periapsis': self.periapsis,
             'launch_id': self.launch_id
         }
+# End of the validity of the current version of a record in the history tables (it is still valid).
+# A date instead of NULL, so the version valid at a time is a range query (valid_from <= t < valid_to) on the index
+OPEN_VALID_TO = datetime(9999, 12, 31)
+
+class RocketsHistory(Base):
+    """SQLAlchemy model for the 'rockets_history' table, every version of each rocket (SCD type 2).
+
+    Attributes:
+        history_id (int): Unique identifier of the version.
+        valid_from (datetime): Time (UTC) of the ingest that saved this version.
+        valid_to (datetime): Time (UTC) of the ingest that replaced it (OPEN_VALID_TO if it is the current version).
+        The other attributes are the same of Rockets.
+    """
+    __tablename__ = 'rockets_history'
+    history_id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(String, nullable=False)
+    name = Column(String)
+    success_rate_pct = Column(Float)
+    cost_per_launch = Column(Integer)
+    height_meters = Column(Float)
+    diameter_meters = Column(Float)
+    mass_kg = Column(Integer)
+    thrust_sea_level_kN = Column(Float)
+    thrust_vacuum_kN = Column(Float)
+    first_flight = Column(Date)
+    valid_from = Column(DateTime, nullable=False)
+    valid_to = Column(DateTime, nullable=False, default=OPEN_VALID_TO)
+
+    __table_args__ = (
+        Index('ix_rockets_history_validity', 'valid_from', 'valid_to'),
+        Index('ix_rockets_history_id', 'id', 'valid_to'),
+    )
+
+    # Same dictionary of the current table
+    to_dict = Rockets.to_dict
+
+class LaunchesHistory(Base):
+    """SQLAlchemy model for the 'launches_history' table, every version of each launch (SCD type 2).
+
+    Attributes:
+        history_id (int): Unique identifier of the version.
+        valid_from (datetime): Time (UTC) of the ingest that saved this version.
+        valid_to (datetime): Time (UTC) of the ingest that replaced it (OPEN_VALID_TO if it is the current version).
+        The other attributes are the same of Launches.
+    """
+    __tablename__ = 'launches_history'
+    history_id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(String, nullable=False)
+    name = Column(String)
+    date_utc = Column(Date)
+    success = Column(Boolean, nullable=True)
+    rocket_id = Column(String)
+    flight_number = Column(Integer)
+    valid_from = Column(DateTime, nullable=False)
+    valid_to = Column(DateTime, nullable=False, default=OPEN_VALID_TO)
+
+    __table_args__ = (
+        Index('ix_launches_history_validity', 'valid_from', 'valid_to'),
+        Index('ix_launches_history_id', 'id', 'valid_to'),
+    )
+
+    to_dict = Launches.to_dict
+
+class StarlinkHistory(Base):
+    """SQLAlchemy model for the 'starlink_history' table, every version of each satellite (SCD type 2).
+
+    Attributes:
+        history_id (int): Unique identifier of the version.
+        valid_from (datetime): Time (UTC) of the ingest that saved this version.
+        valid_to (datetime): Time (UTC) of the ingest that replaced it (OPEN_VALID_TO if it is the current version).
+        The other attributes are the same of Starlink.
+    """
+    __tablename__ = 'starlink_history'
+    history_id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(String, nullable=False)
+    object_name = Column(String)
+    launch_date = Column(Date)
+    decay_date = Column(Date)
+    inclination = Column(Float)
+    apoapsis = Column(Float)
+    periapsis = Column(Float)
+    launch_id = Column(String)
+    valid_from = Column(DateTime, nullable=False)
+    valid_to = Column(DateTime, nullable=False, default=OPEN_VALID_TO)
+
+    __table_args__ = (
+        Index('ix_starlink_history_validity', 'valid_from', 'valid_to'),
+        Index('ix_starlink_history_id', 'id', 'valid_to'),
+    )
+
+    to_dict = Starlink.to_dict
+
+# History table of each table
+HISTORY_MODELS = {
+    Rockets: RocketsHistory,
+    Launches: LaunchesHistory,
+    Starlink: StarlinkHistory
+}
+
 # Create the database engine
 engine = create_engine(DATABASE_URI)
 
@@ -136,17 +249,19 @@ engine = create_engine(DATABASE_URI)
 Session = sessionmaker(bind=engine)
 session = Session()
 
-def create_tables():
+def create_tables(wait=False):
     """
-    Create tables in the database based on the defined models if they do not exist.
+    Create the tables in the database if they do not exist, and apply the pending migrations
+    of the tables created by previous versions (databases/migrations.py).
+
+    Args:
+        wait (bool, optional): Wait if other process is migrating, by default the migrations are skipped.
     """
-    inspector = inspect(engine)
-    tables = inspector.get_table_names()
-    if not {'rockets', 'launches', 'starlink'}.issubset(tables):
-        Base.metadata.create_all(engine)
-        logger.info("Tables created.")
-    else:
-        logger.info("Tables already exist.")
+    if not AUTO_MIGRATE:
+        logger.info("AUTO_MIGRATE is disabled, run: python -m databases.migrations upgrade")
+        return
+    from databases.migrations import upgrade
+    upgrade(wait)
 
 if __name__ == "__main__":
     create_tables()
\ No newline at end of file
@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+"""
+Client of the Flask API shared by the frontend (views and chart_generation).
+- One session with a pool of keep-alive connections (no new connection for each request).
+- Timeouts, a request never blocks a page forever.
+- Cache in memory with a short TTL: a fresh response is given without calling the API.
+- Stale-while-revalidate: a stale response is given immediately and it is refreshed in a parallel thread.
+- Conditional requests: the ETag of the last response is sent (If-None-Match), with 304 the cached data is kept.
+Ex:
+from api_client import api_client
+data = api_client.get_json('dashboard')
+"""
+
+# URL of the Flask API
+API_BASE_URL = os.getenv('SPACEX_API_BASE_URL', 'http://localhost:5001/api/')
+
+# Seconds that a response is fresh, and seconds after that it can still be given while it is refreshed
+API_CACHE_TTL_SECONDS = float(os.getenv('API_CACHE_TTL_SECONDS', '10'))
+API_CACHE_STALE_SECONDS = float(os.getenv('API_CACHE_STALE_SECONDS', '60'))
+
+# Seconds to connect and to read the response of the API
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', '3'))
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', '30'))
+
+# Connections kept open to the API
+API_POOL_SIZE = int(os.getenv('API_POOL_SIZE', '10'))
+
+class APIClient:
+    """
+    Client of the Flask API with pool of connections, timeouts and cache.
+    """
+    def __init__(self, base_url=API_BASE_URL, ttl=API_CACHE_TTL_SECONDS, stale=API_CACHE_STALE_SECONDS,
+                 timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT), pool_size=API_POOL_SIZE):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.stale = stale
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Cache: key -> {'data': ..., 'etag': ..., 'fetched_at': ...}
+        self._cache = {}
+        self._lock = threading.Lock()
+        # Keys that are being refreshed in a parallel thread
+        self._refreshing = set()
+
+    def _key(self, path, params):
+        return (path, tuple(sorted((params or {}).items())))
+
+    def _fetch(self, key, path, params):
+        """
+        Call the API (with If-None-Match if we have the ETag) and save the response in the cache.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        response = self.session.get(self.base_url + path, params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry:
+            # The data didn't change, only the time of the cache
+            data = entry['data']
+        else:
+            response.raise_for_status()
+            data = response.json()
+
+        with self._lock:
+            self._cache[key] = {'data': data, 'etag': response.headers.get('ETag'), 'fetched_at': time.monotonic()}
+        return data
+
+    def _refresh_in_background(self, key, path, params):
+        """
+        Refresh a stale response in a parallel thread (only one thread for each key).
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch(key, path, params)
+            except Exception as e:
+                logger.warning(f"Could not refresh {path} from the API: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get_json(self, path, params=None, ttl=None):
+        """
+        Get the JSON of an endpoint of the API.
+
+        Args:
+            path (str): Path of the endpoint without /api/ (Ex: 'dashboard', 'launches').
+            params (dict, optional): Query parameters.
+            ttl (float, optional): Seconds that the cached response is fresh, by default the TTL of the client.
+                                   Use 0 to always ask the API (with a conditional request).
+
+        Returns:
+            The JSON data of the response.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        key = self._key(path, params)
+        with self._lock:
+            entry = self._cache.get(key)
+
+        if entry:
+            age = time.monotonic() - entry['fetched_at']
+            if age < ttl:
+                return entry['data']
+            if ttl > 0 and age < ttl + self.stale:
+                self._refresh_in_background(key, path, params)
+                return entry['data']
+        return self._fetch(key, path, params)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+# Client shared by all the frontend
+api_client = APIClient()
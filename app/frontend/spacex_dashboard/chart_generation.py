@@ -1,72 +1,155 @@
-import matplotlib.pyplot as plt
-import pandas as pd
+from matplotlib.figure import Figure
+import logging
+import multiprocessing
 import os
-import requests
-
-def fetch_data(url):
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
-
-def generate_charts():
-    # Ruta absoluta para la carpeta static/images
-    static_dir = os.path.join(os.path.dirname(__file__), 'spacex_dashboard/static/images')
-
-    # Fetch data from API
-    rockets_response = requests.get('http://localhost:5001/api/rockets')
-    launches_response = requests.get('http://localhost:5001/api/launches')
-    
-    rockets_data = rockets_response.json()
-    launches_data = launches_response.json()
-    
-    # Prepare rockets DataFrame
-    rockets_df = pd.DataFrame(rockets_data)
-    
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from data_source import get_rockets_df, get_launches_timeseries_df, get_data_version, add_backend_path
+
+logger = logging.getLogger(__name__)
+
+# Ruta absoluta para la carpeta static/images
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'spacex_dashboard/static/images')
+
+def save_figure(fig, file_name, static_dir):
+    """
+    Save the chart as PNG, first in a temporary file and then renamed,
+    so the server never gives a half written image.
+    """
+    path = os.path.join(static_dir, file_name)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fig.savefig(tmp_path, format='png')
+    os.replace(tmp_path, path)
+
+def bar_chart(names, values, color, ylabel, title, ylim=None):
+    """
+    Bar chart of the rockets (one bar for each rocket).
+    """
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar(names, values, color=color)
+    ax.set_xlabel('Rocket Models')
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    if ylim is not None:
+        ax.set_ylim(0, ylim)  # Adjust the y-axis
+    return fig
+
+def generate_charts(static_dir=STATIC_DIR):
+    # Fetch data from API (or from the database in direct mode). ttl=0: the charts of a new data version
+    # are never built with a response of the cache of the client (it can be the previous version)
+    rockets_df = get_rockets_df(ttl=0)
+
     # Rocket success comparison
-    plt.figure(figsize=(10, 6))
-    plt.bar(rockets_df['name'], rockets_df['success_rate_pct'], color='skyblue')
-    plt.xlabel('Rocket Models')
-    plt.ylabel('Success Rate (%)')
-    plt.title('Success Rate Comparison of Rocket Models')
-    plt.savefig(os.path.join(static_dir, 'rocket_success_comparison.png'))
-    plt.close()
+    fig = bar_chart(rockets_df['name'], rockets_df['success_rate_pct'], 'skyblue', 'Success Rate (%)', 'Success Rate Comparison of Rocket Models')
+    save_figure(fig, 'rocket_success_comparison.png', static_dir)
 
     # Rocket cost comparison
-    plt.figure(figsize=(10, 6))
-    plt.bar(rockets_df['name'], rockets_df['cost_per_launch'], color='salmon')
-    plt.xlabel('Rocket Models')
-    plt.ylabel('Cost per Launch ($)')
-    plt.title('Launch Cost Comparison of Rockets')
-    plt.ylim(0, rockets_df['cost_per_launch'].max() * 1.2)  # Adjust the y-axis
-    plt.savefig(os.path.join(static_dir, 'rocket_cost_comparison.png'))
-    plt.close()
+    fig = bar_chart(rockets_df['name'], rockets_df['cost_per_launch'], 'salmon', 'Cost per Launch ($)', 'Launch Cost Comparison of Rockets',
+                    rockets_df['cost_per_launch'].max() * 1.2)
+    save_figure(fig, 'rocket_cost_comparison.png', static_dir)
 
     # Rocket weight comparison
-    plt.figure(figsize=(10, 6))
-    plt.bar(rockets_df['name'], rockets_df['mass_kg'], color='orange')
-    plt.xlabel('Rocket Models')
-    plt.ylabel('Weight (kg)')
-    plt.title('Weight Comparison of Rockets')
-    plt.ylim(0, rockets_df['mass_kg'].max() * 1.2)  # Adjust the y-axis
-    plt.savefig(os.path.join(static_dir, 'rocket_weight_comparison.png'))
-    plt.close()
-
-    # Prepare launches DataFrame
-    launches_df = pd.DataFrame(launches_data)
-    launches_df['date_utc'] = pd.to_datetime(launches_df['date_utc'])
-    launches_df['year'] = launches_df['date_utc'].dt.year
-
-    # Launch success rate per year
-    launches_df['success'] = launches_df['success'].map({'true': True, 'false': False, 'none': False})
-    success_rate_per_year = launches_df.groupby('year')['success'].mean() * 100
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(success_rate_per_year.index, success_rate_per_year.values, marker='o', linestyle='-', color='green')
-    plt.xlabel('Year')
-    plt.ylabel('Success Rate (%)')
-    plt.title('Launch Success Rate Per Year')
-    plt.savefig(os.path.join(static_dir, 'launch_success_rate_per_year.png'))
-    plt.close()
+    fig = bar_chart(rockets_df['name'], rockets_df['mass_kg'], 'orange', 'Weight (kg)', 'Weight Comparison of Rockets',
+                    rockets_df['mass_kg'].max() * 1.2)
+    save_figure(fig, 'rocket_weight_comparison.png', static_dir)
+
+    # Launch success rate per year (aggregated by the API, not the whole launches table)
+    success_rate_per_year = get_launches_timeseries_df('year', 'success_rate', ttl=0)
+    success_rate_per_year['bucket'] = success_rate_per_year['bucket'].astype(int)
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(success_rate_per_year['bucket'], success_rate_per_year['value'], marker='o', linestyle='-', color='green')
+    ax.set_xlabel('Year')
+    ax.set_ylabel('Success Rate (%)')
+    ax.set_title('Launch Success Rate Per Year')
+    save_figure(fig, 'launch_success_rate_per_year.png', static_dir)
+
+class ChartBuilder:
+    """
+    Build the charts in the background when the data of the API changes.
+    A thread asks the version of the data (/api/data-version) every poll_seconds,
+    when the version changes the charts are generated in a worker process (matplotlib and pandas
+    don't block the server), the server keeps giving the previous images until the new ones are ready.
+    """
+    def __init__(self, poll_seconds=30, static_dir=STATIC_DIR):
+        self.poll_seconds = poll_seconds
+        self.static_dir = static_dir
+        self.built_version = None
+        self._stop = threading.Event()
+        self._thread = None
+        # 'spawn' to not copy the threads of the server in the worker process
+        self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='chart-builder', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def check(self):
+        """
+        Build the charts if the version of the data changed since the last build.
+
+        Returns:
+            bool: True if the charts were built.
+        """
+        # Always ask the API (conditional request, 304 if the version didn't change)
+        version = get_data_version()
+        if version is None or version == self.built_version:
+            return False
+        self._pool.submit(generate_charts, self.static_dir).result()
+        self.built_version = version
+        logger.info(f"Charts built for the data version {version}")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                # The API could be down, the previous charts are kept and we try again later
+                logger.warning(f"The charts could not be built: {e}")
+            self._stop.wait(self.poll_seconds)
+
+_builder = None
+
+def _acquire_builder_lock(path):
+    """
+    Try to get the lock of the builder without waiting, with the file lock of the ingest of the API
+    (helpers/process_lock.py). The operating system releases it when the process ends.
+
+    Returns:
+        bool: True if this process has the lock, False if other process has it.
+    """
+    add_backend_path()
+    from helpers.process_lock import try_acquire_lock
+    return try_acquire_lock(path)
+
+def start_chart_builder(poll_seconds=30, lock_file=None):
+    """
+    Start the builder of the charts once per process. With lock_file only one process of the
+    server (Ex: one of the workers of gunicorn) runs it, the others serve the images it builds.
+
+    Args:
+        poll_seconds (int, optional): Seconds between the checks of the data version.
+        lock_file (path, optional): File lock shared by the processes of the server.
+
+    Returns:
+        ChartBuilder: The builder, None if other process runs it.
+    """
+    global _builder
+    if _builder is None:
+        if lock_file and not _acquire_builder_lock(lock_file):
+            logger.info(f"Other process builds the charts (lock {lock_file}), the builder is not started")
+            return None
+        _builder = ChartBuilder(poll_seconds).start()
+    return _builder
 
 if __name__ == "__main__":
-    generate_charts()
\ No newline at end of file
+    generate_charts()
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+
+"""
+Charts of the dashboard with cache.
+The PNG of each chart is saved in CHART_CACHE_DIR with the hash of the statistics in the name,
+Ex: launches-3f2a9c0d1b7e4a55.png
+If the statistics don't change the chart is not rendered again, the page only gives the URL of the image
+and the browser can keep the image because the same URL always has the same image.
+The charts use the Figure object of matplotlib (not pyplot), so they can be rendered in parallel threads.
+"""
+
+# Lock to not render the same chart twice at the same time
+_render_lock = threading.Lock()
+
+def render_bar_chart(data):
+    """
+    Render the bar chart of the launch statistics.
+
+    Args:
+        data (dict): Launch statistics of the API.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    fig = Figure()
+    ax = fig.subplots()
+
+    categories = ['Failed Launches', 'Successful Launches', 'Total Launches', 'Avg Launches Per Year']
+    values = [
+        data['failed_launches'],
+        data['successful_launches'],
+        data['total_launches'],
+        # None when the launches don't have two different dates
+        data['avg_launches_per_year'] or 0
+    ]
+
+    ax.bar(categories, values, color=['red', 'green', 'blue', 'orange'])
+    ax.set_title('Launch Statistics')
+    ax.set_xlabel('')
+    ax.set_ylabel('Count')
+    ax.yaxis.set_major_locator(MaxNLocator(integer=True))  # Ensure y-axis has integer ticks
+
+    # Remove x-axis labels to avoid clutter
+    ax.set_xticks(range(len(categories)))
+    ax.set_xticklabels([])
+
+    # Adjust the position of the bar chart to the right
+    fig.subplots_adjust(left=0.2, right=0.9, top=0.8, bottom=0.2)
+
+    buf = BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+def render_pie_chart(data):
+    """
+    Render the pie chart of the Starlink statistics.
+
+    Args:
+        data (dict): Starlink statistics of the API.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    fig = Figure()
+    ax = fig.subplots()
+
+    labels = ['Active Satellites', 'Decayed Satellites']
+    sizes = [
+        data['active_satellites'],
+        data['decayed_satellites']
+    ]
+
+    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=['green', 'red'])
+    ax.set_title('Starlink Satellite Statistics')
+    ax.axis('equal')
+
+    buf = BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+# Charts of the dashboard, the name is used in the URL of the image
+CHART_RENDERERS = {
+    'launches': render_bar_chart,
+    'starlink': render_pie_chart
+}
+
+def chart_digest(data):
+    """
+    Hash of the statistics of a chart, the same statistics give the same hash.
+
+    Args:
+        data (dict): Statistics of the chart.
+
+    Returns:
+        str: Hexadecimal hash (16 characters).
+    """
+    payload = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+def chart_path(kind, digest):
+    """
+    Path of the PNG of a chart in the cache.
+    """
+    return os.path.join(settings.CHART_CACHE_DIR, f'{kind}-{digest}.png')
+
+def _cleanup_cache(keep):
+    """
+    Remove the oldest charts of the cache, only the CHART_CACHE_MAX_FILES most recent are kept.
+
+    Args:
+        keep (path): Chart that was just saved, it is never removed.
+    """
+    files = [os.path.join(settings.CHART_CACHE_DIR, f) for f in os.listdir(settings.CHART_CACHE_DIR) if f.endswith('.png')]
+    files = [file for file in files if file != keep]
+    if len(files) >= settings.CHART_CACHE_MAX_FILES:
+        files.sort(key=os.path.getmtime)
+        for file in files[:len(files) + 1 - settings.CHART_CACHE_MAX_FILES]:
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+
+def get_chart(kind, data):
+    """
+    Get the hash of the chart, rendering and saving it only if it is not in the cache.
+
+    Args:
+        kind (str): Name of the chart (key of CHART_RENDERERS).
+        data (dict): Statistics of the chart.
+
+    Returns:
+        str: Hash of the chart, used in the URL of the image.
+    """
+    digest = chart_digest(data)
+    path = chart_path(kind, digest)
+    if os.path.exists(path):
+        return digest
+
+    with _render_lock:
+        # Other thread could render it while we were waiting
+        if not os.path.exists(path):
+            image = CHART_RENDERERS[kind](data)
+            os.makedirs(settings.CHART_CACHE_DIR, exist_ok=True)
+            # Write then rename, other process never reads a half written image
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as image_file:
+                image_file.write(image)
+            os.replace(tmp_path, path)
+            _cleanup_cache(path)
+    return digest
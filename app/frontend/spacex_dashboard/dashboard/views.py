@@ -1,88 +1,60 @@
-import requests
+import os
+import re
+
+from django.http import FileResponse, Http404
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from .tables import LaunchTable, RocketTable, StarlinkTable
-import matplotlib.pyplot as plt
-import io
-import base64
-from matplotlib.ticker import MaxNLocator
-
-def generate_bar_chart(data):
-    fig, ax = plt.subplots()
-
-    categories = ['Failed Launches', 'Successful Launches', 'Total Launches', 'Avg Launches Per Year']
-    values = [
-        data['failed_launches'],
-        data['successful_launches'],
-        data['total_launches'],
-        data['avg_launches_per_year']
-    ]
-
-    ax.bar(categories, values, color=['red', 'green', 'blue', 'orange'])
-    ax.set_title('Launch Statistics')
-    ax.set_xlabel('')
-    ax.set_ylabel('Count')
-    ax.yaxis.set_major_locator(MaxNLocator(integer=True))  # Ensure y-axis has integer ticks
-
-    # Remove x-axis labels to avoid clutter
-    ax.set_xticklabels([])
-
-    # Adjust the position of the bar chart to the right
-    fig.subplots_adjust(left=0.2, right=0.9, top=0.8, bottom=0.2)
+from .charts import CHART_RENDERERS, chart_path, get_chart
+from data_source import get_dashboard
 
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    buf.close()
-    plt.close(fig)
-    return image_base64
-
-def generate_pie_chart(data):
-    fig, ax = plt.subplots()
-
-    labels = ['Active Satellites', 'Decayed Satellites']
-    sizes = [
-        data['active_satellites'],
-        data['decayed_satellites']
-    ]
-
-    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=['green', 'red'])
-    ax.set_title('Starlink Satellite Statistics')
-    ax.axis('equal')
-
-    # Remove the legend from the chart
-    ax.legend().set_visible(False)
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    buf.close()
-    plt.close(fig)
-    return image_base64
+def chart_url(kind, data):
+    """
+    URL of the cached chart of the statistics, None if the group is missing.
+    """
+    if not data:
+        return None
+    return reverse('dashboard_chart', args=[kind, get_chart(kind, data)])
 
 def dashboard_view(request):
-    response = requests.get('http://localhost:5001/api/dashboard')
-    data = response.json()
+    # Cached response of the API, or the statistics of the database in direct mode (DASHBOARD_DATA_MODE)
+    data = get_dashboard()
 
     # Crear las tablas pasando una lista con un solo diccionario
-    launch_table = LaunchTable([data['launches']])
-    rocket_table = RocketTable([data['rockets']])
-    starlink_table = StarlinkTable([data['starlink']])
+    # (un grupo es None si la API no lo calculó a tiempo, la tabla queda vacía)
+    launch_table = LaunchTable([data['launches']] if data.get('launches') else [])
+    rocket_table = RocketTable([data['rockets']] if data.get('rockets') else [])
+    starlink_table = StarlinkTable([data['starlink']] if data.get('starlink') else [])
 
-    # Generar gráficos
-    bar_chart = generate_bar_chart(data['launches'])
-    pie_chart = generate_pie_chart(data['starlink'])
+    # Gráficos (solo se generan si las estadísticas cambiaron)
+    bar_chart_url = chart_url('launches', data.get('launches'))
+    pie_chart_url = chart_url('starlink', data.get('starlink'))
 
     context = {
         'launch_table': launch_table,
         'rocket_table': rocket_table,
         'starlink_table': starlink_table,
-        'bar_chart': bar_chart,
-        'pie_chart': pie_chart,
+        'bar_chart_url': bar_chart_url,
+        'pie_chart_url': pie_chart_url,
     }
 
     return render(request, 'dashboard/dashboard.html', context)
 
+def chart_image_view(request, kind, digest):
+    """
+    Give the PNG of a chart of the cache. The URL has the hash of the statistics,
+    so the image of a URL never changes and the browser can keep it.
+    """
+    if kind not in CHART_RENDERERS or not re.fullmatch(r'[0-9a-f]{16}', digest):
+        raise Http404("Chart not found")
+    path = chart_path(kind, digest)
+    if not os.path.exists(path):
+        raise Http404("Chart not found")
+
+    response = FileResponse(open(path, 'rb'), content_type='image/png')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['ETag'] = f'"{digest}"'
+    return response
+
 def home_view(request):
     return redirect('dashboard')
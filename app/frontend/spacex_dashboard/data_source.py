@@ -0,0 +1,163 @@
+import os
+import sys
+
+import pandas as pd
+
+from api_client import api_client
+
+"""
+Data of the frontend, from the Flask API (HTTP) or directly from the database (direct).
+The mode is selected with the environment variable DASHBOARD_DATA_MODE:
+- 'http' (default): the data is requested to the Flask API with the shared client (api_client.py).
+- 'direct': when the frontend and the API are in the same host, the frontend imports the functions of
+  the backend (helpers/statistics and the *_filter_sort queries) and reads the tables as DataFrames
+  with pd.read_sql, without the HTTP request and the JSON serialization.
+  It uses the DATABASE_URI of the backend (.env) and one engine for all the frontend.
+"""
+
+DASHBOARD_DATA_MODE = os.getenv('DASHBOARD_DATA_MODE', 'http')
+
+# Folder of the backend (app/), needed to import its modules in direct mode
+BACKEND_DIR = os.getenv('SPACEX_BACKEND_DIR', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+def add_backend_path():
+    """
+    Add the folder of the backend to the path, to import its modules (Ex: helpers/process_lock.py).
+    """
+    if BACKEND_DIR not in sys.path:
+        sys.path.append(BACKEND_DIR)
+
+def _backend():
+    """
+    Import the modules of the backend (only in direct mode).
+    """
+    add_backend_path()
+    import databases.models
+    return databases.models
+
+def _read_query(query_function, sort_param=None, sort_order='asc', filter_field=None, filter_value=None, as_of=None):
+    """
+    Read the query of a *_filter_sort function of the backend as DataFrame.
+    """
+    models = _backend()
+    from backend.history import parse_as_of
+    session = models.Session()
+    try:
+        query = query_function(session, sort_param, sort_order, filter_field, filter_value, parse_as_of(as_of))
+        return pd.read_sql(query.statement, models.engine)
+    finally:
+        session.close()
+
+def get_dashboard():
+    """
+    Get the statistics of the dashboard (rockets, launches and starlink).
+
+    Returns:
+        dict: The statistics by group.
+    """
+    if DASHBOARD_DATA_MODE == 'direct':
+        _backend()
+        from helpers.statistics import get_rocket_statistics, get_launch_statistics, get_starlink_statistics
+        return {
+            "rockets": get_rocket_statistics(),
+            "launches": get_launch_statistics(),
+            "starlink": get_starlink_statistics()
+        }
+    return api_client.get_json('dashboard')
+
+def get_rockets_df(ttl=None, **params):
+    """
+    Get the rockets as DataFrame.
+
+    Args:
+        ttl (float, optional): Seconds that the cached response of the API is fresh (api_client.py), 0 to ask the API.
+        params: sort_param, sort_order, filter_field, filter_value and as_of of the query.
+    """
+    if DASHBOARD_DATA_MODE == 'direct':
+        _backend()
+        from backend.rocket_resources.rocket_filter_sort import query_filter_sort_rocket
+        return _read_query(query_filter_sort_rocket, **params)
+    return pd.DataFrame(api_client.get_json('rockets', _api_params(params), ttl=ttl))
+
+def get_launches_df(ttl=None, **params):
+    """
+    Get the launches as DataFrame.
+
+    Args:
+        ttl (float, optional): Seconds that the cached response of the API is fresh (api_client.py), 0 to ask the API.
+        params: sort_param, sort_order, filter_field, filter_value and as_of of the query.
+    """
+    if DASHBOARD_DATA_MODE == 'direct':
+        _backend()
+        from backend.launches_resources.launches_filter_sort import query_filter_sort_launches
+        return _read_query(query_filter_sort_launches, **params)
+    return pd.DataFrame(api_client.get_json('launches', _api_params(params), ttl=ttl))
+
+def get_starlink_df(ttl=None, **params):
+    """
+    Get the Starlink satellites as DataFrame.
+
+    Args:
+        ttl (float, optional): Seconds that the cached response of the API is fresh (api_client.py), 0 to ask the API.
+        params: sort_param, sort_order, filter_field, filter_value and as_of of the query.
+    """
+    if DASHBOARD_DATA_MODE == 'direct':
+        _backend()
+        from backend.starlink_resources.starlink_filter_sort import query_filter_sort_starlink
+        return _read_query(query_filter_sort_starlink, **params)
+    return pd.DataFrame(api_client.get_json('starlink', _api_params(params), ttl=ttl))
+
+def get_launches_timeseries_df(bucket='year', metric='success_rate', group_by=None, ttl=None):
+    """
+    Get the launches aggregated by year or month (computed in the database) as DataFrame.
+
+    Args:
+        bucket (str): 'year' or 'month'.
+        metric (str): 'success_rate' or 'count'.
+        group_by (str, optional): 'rocket_id'.
+        ttl (float, optional): Seconds that the cached response of the API is fresh (api_client.py), 0 to ask the API.
+
+    Returns:
+        DataFrame: Columns bucket, (group), value and launches.
+    """
+    if DASHBOARD_DATA_MODE == 'direct':
+        models = _backend()
+        from backend.launches_resources.launches_timeseries import get_launches_timeseries
+        session = models.Session()
+        try:
+            return pd.DataFrame(get_launches_timeseries(session, bucket, metric, group_by))
+        finally:
+            session.close()
+    params = {'bucket': bucket, 'metric': metric}
+    if group_by:
+        params['group_by'] = group_by
+    return pd.DataFrame(api_client.get_json('launches/timeseries', params, ttl=ttl)['data'])
+
+def get_data_version(ttl=0):
+    """
+    Get the version of the data (it changes each time the ingest saves new data).
+
+    Returns:
+        str: The version, None if the data was never saved.
+    """
+    if DASHBOARD_DATA_MODE == 'direct':
+        _backend()
+        from backend.data_version import get_data_version as backend_data_version
+        return backend_data_version().get('version')
+    return api_client.get_json('data-version', ttl=ttl).get('version')
+
+def _api_params(params):
+    """
+    Convert the parameters of the queries to the query parameters of the API
+    (Ex: sort_param='mass_kg', sort_order='desc' -> sort_high=mass_kg).
+    """
+    api_params = {}
+    if params.get('sort_param'):
+        sort_key = 'sort_high' if params.get('sort_order') == 'desc' else 'sort_low'
+        api_params[sort_key] = params['sort_param']
+    if params.get('filter_field'):
+        api_params['filter_field'] = params['filter_field']
+        api_params['filter_value'] = params.get('filter_value')
+    if params.get('as_of'):
+        api_params['as_of'] = params['as_of']
+    return api_params or None
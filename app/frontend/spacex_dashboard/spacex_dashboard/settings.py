@@ -125,6 +125,17 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'spacex_dashboard', 'static')]
+
+# Cache of the charts of the dashboard (PNG files named with the hash of the statistics)
+CHART_CACHE_DIR = os.getenv('CHART_CACHE_DIR', os.path.join(BASE_DIR, 'chart_cache'))
+CHART_CACHE_MAX_FILES = int(os.getenv('CHART_CACHE_MAX_FILES', '50'))
+
+# Build of the static charts (chart_generation.py) in the background when the data version of the API changes
+CHART_BUILDER_ENABLED = os.getenv('CHART_BUILDER_ENABLED', 'true').lower() == 'true'
+CHART_BUILD_POLL_SECONDS = int(os.getenv('CHART_BUILD_POLL_SECONDS', '30'))
+# File lock that elects the only process of the server (Ex: gunicorn workers) that builds the charts
+CHART_BUILDER_LOCK_FILE = os.getenv('CHART_BUILDER_LOCK_FILE', os.path.join(BASE_DIR, '.chart_builder.lock'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
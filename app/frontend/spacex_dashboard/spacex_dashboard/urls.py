@@ -16,16 +16,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from dashboard.views import home_view, dashboard_view
-from chart_generation import generate_charts
-
-# Call the function to generate charts
-generate_charts()
+from dashboard.views import home_view, dashboard_view, chart_image_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', home_view, name='home'),
     path('dashboard/', dashboard_view, name='dashboard'),
+    path('dashboard/charts/<slug:kind>/<slug:digest>.png', chart_image_view, name='dashboard_chart'),
     path('rockets-and-launches/', include('rocket_launch_app.urls')),
 ]
 
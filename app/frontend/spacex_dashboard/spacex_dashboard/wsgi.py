@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spacex_dashboard.settings')
 
 application = get_wsgi_application()
+
+# Build the charts of the API in the background (not when the URLs are imported), only in one process of the server
+from django.conf import settings
+
+if settings.CHART_BUILDER_ENABLED:
+    from chart_generation import start_chart_builder
+    start_chart_builder(settings.CHART_BUILD_POLL_SECONDS, settings.CHART_BUILDER_LOCK_FILE)
@@ -0,0 +1,74 @@
+import os
+
+from helpers.logger import logger
+
+try:
+    import fcntl
+except ImportError:
+    # Windows does not have fcntl, msvcrt is used instead
+    fcntl = None
+    import msvcrt
+
+"""
+Lock between processes based in a file.
+Ex: with gunicorn and 4 workers the 4 processes call try_acquire_lock('data/.ingest.lock'),
+only the first one gets the lock and the others get False.
+The lock is released by the operating system when the process ends, so if the worker
+that has the lock dies, the next process that tries it gets it.
+"""
+
+# Open files of the locks of this process, the lock lives while the file is open
+_held_locks = {}
+
+def try_acquire_lock(path, wait=False):
+    """
+    Try to get the lock of the file, by default without waiting.
+
+    Args:
+        path (path): The file of the lock, it is created if doesn't exist.
+        wait (bool, optional): Wait until the other process releases the lock.
+
+    Returns:
+        bool: True if this process has the lock, False if other process has it.
+    """
+    path = os.path.abspath(path)
+    if path in _held_locks:
+        return True
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock_file = open(path, 'a+')
+    try:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if wait else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return False
+
+    # Save the pid of the owner to know which process has the lock
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    _held_locks[path] = lock_file
+    logger.info(f"Process {os.getpid()} acquired the lock {path}")
+    return True
+
+def release_lock(path):
+    """
+    Release the lock of the file if this process has it.
+
+    Args:
+        path (path): The file of the lock.
+    """
+    lock_file = _held_locks.pop(os.path.abspath(path), None)
+    if lock_file is None:
+        return
+    if fcntl:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    lock_file.close()
@@ -0,0 +1,100 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from databases.models import Rockets, Launches, Starlink
+
+"""
+Related data of the list endpoints, loaded with a constant number of queries (no query for each record).
+Ex:
+launches?expand=rocket&include=starlink_count
+Each launch with its rocket (JOIN in the same query) and the number of its Starlink satellites (subquery).
+rockets?expand=launches
+Each rocket with the list of its launches (one more query, SELECT ... WHERE rocket_id IN (...)).
+"""
+
+# Relationships that can be expanded in each model
+EXPANSIONS = {
+    Rockets: ('launches',),
+    Launches: ('rocket', 'starlinks'),
+    Starlink: ('launch',)
+}
+
+# Aggregated values that can be included in each model: name -> (counted column, foreign key to the model)
+INCLUDES = {
+    Rockets: {'launch_count': (Launches.id, Launches.rocket_id)},
+    Launches: {'starlink_count': (Starlink.id, Starlink.launch_id)},
+    Starlink: {}
+}
+
+def parse_fields(value, allowed, parameter):
+    """
+    Convert a parameter with names separated by commas (Ex: 'rocket,starlinks') to a tuple.
+
+    Args:
+        value (str | None): Value of the parameter.
+        allowed (tuple): Names accepted.
+        parameter (str): Name of the parameter (for the error).
+
+    Returns:
+        tuple: The names, empty if there is no value.
+    """
+    if not value:
+        return ()
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    invalid = [field for field in fields if field not in allowed]
+    if invalid:
+        raise ValueError(f"Invalid {parameter} '{', '.join(invalid)}', it must be one of: {', '.join(allowed) or 'none'}.")
+    return fields
+
+def apply_expand_include(query, model, expand=(), include=()):
+    """
+    Add the related records and the aggregated values to the query.
+    A single related record (Ex: the rocket of a launch) is loaded with a JOIN (joinedload), a list
+    (Ex: the launches of a rocket) with one more query for all the records (selectinload), and the counts
+    with a subquery of each row that uses the index of the foreign key.
+
+    Args:
+        query (Query): SQLAlchemy query object.
+        model (Base): Model of the query (Rockets, Launches or Starlink).
+        expand (tuple, optional): Relationships to load.
+        include (tuple, optional): Aggregated values to add.
+
+    Returns:
+        Query: The query, with include its rows are (record, value, ...).
+    """
+    for name in expand:
+        relationship = getattr(model, name)
+        loader = selectinload if relationship.property.uselist else joinedload
+        query = query.options(loader(relationship))
+    for name in include:
+        counted, foreign_key = INCLUDES[model][name]
+        count = select(func.count(counted)).where(foreign_key == model.id).correlate(model).scalar_subquery()
+        query = query.add_columns(count.label(name))
+    return query
+
+def to_records(results, expand=(), include=()):
+    """
+    Convert the results of the query to dictionaries with the related data.
+
+    Args:
+        results (list): Records, or rows (record, value, ...) if there are included values.
+        expand (tuple, optional): Expanded relationships.
+        include (tuple, optional): Included values.
+
+    Returns:
+        list: The dictionaries of the records.
+    """
+    records = []
+    for result in results:
+        record = result[0] if include else result
+        data = record.to_dict()
+        for name in expand:
+            related = getattr(record, name)
+            if isinstance(related, list):
+                data[name] = [item.to_dict() for item in related]
+            else:
+                data[name] = related.to_dict() if related is not None else None
+        for position, name in enumerate(include, start=1):
+            data[name] = result[position]
+        records.append(data)
+    return records
@@ -1,5 +1,7 @@
+import math
+
 from helpers import logger
-from sqlalchemy import func, desc, asc
+from sqlalchemy import func, desc, asc, Boolean
 
 """
 Class where numbers are created to apply sorting and filtering
@@ -9,6 +11,9 @@ We filter the data that the date_utc is in the 2022 year, and sort it from the f
 The request is literally: Filter launches by year 2022 and sort by flight number in format lowest/first to highest/the last.
 """
 
+# Values accepted to filter the boolean fields (Ex: launches?filter_field=success&filter_value=false)
+BOOLEAN_VALUES = {'true': True, 'false': False, 'null': None, 'none': None}
+
 def apply_sorting(query, model, sort_param, sort_order):
     """
     Apply sorting to the query based on the sort parameter and order.
@@ -68,6 +73,15 @@ def apply_filtering(query, model, filter_field, filter_value):
     if filter_field == 'id':
         query = query.filter(filter_column == filter_value)
 
+    # Boolean fields (Ex: success) only accept true, false or null (launches without result).
+    if isinstance(filter_column.type, Boolean):
+        value = filter_value.lower()
+        if value not in BOOLEAN_VALUES:
+            raise ValueError(f"Invalid value '{filter_value}' for {filter_field}, it must be true, false or null.")
+        if BOOLEAN_VALUES[value] is None:
+            return query.filter(filter_column.is_(None))
+        return query.filter(filter_column.is_(BOOLEAN_VALUES[value]))
+
     # Apply filter by year if filter value is a digit.
     if filter_value.isdigit():
         query = query.filter(func.extract('year', filter_column) == int(filter_value))
@@ -78,4 +92,53 @@ def apply_filtering(query, model, filter_field, filter_value):
     # if the value is neither a digit nor contains a hyphen (possibly a text string).
     else:
         query = query.filter(filter_column.ilike(f"%{filter_value}%"))
-    return query
\ No newline at end of file
+    return query
+
+def parse_altitude_range(alt_min, alt_max):
+    """
+    Convert the altitude range of the request (km) to numbers.
+
+    Args:
+        alt_min (str | None): Lowest altitude of the range.
+        alt_max (str | None): Highest altitude of the range.
+
+    Returns:
+        tuple: (alt_min, alt_max) as floats, None for the limits that are not given.
+    """
+    limits = []
+    for name, value in (('alt_min', alt_min), ('alt_max', alt_max)):
+        if value is None or value == '':
+            limits.append(None)
+            continue
+        try:
+            limit = float(value)
+        except ValueError:
+            limit = None
+        # nan and inf are parsed by float, but they compare differently in each database
+        if limit is None or not math.isfinite(limit):
+            raise ValueError(f"Invalid {name} '{value}', it must be a number (km).")
+        limits.append(limit)
+    if None not in limits and limits[0] > limits[1]:
+        raise ValueError("alt_min must be lower than or equal to alt_max.")
+    return tuple(limits)
+
+def apply_altitude_range(query, model, alt_min=None, alt_max=None):
+    """
+    Keep the satellites whose orbit crosses the altitude range: periapsis <= alt_max and apoapsis >= alt_min.
+    Ex: starlink?alt_min=540&alt_max=560 -> the satellites that pass between 540 and 560 km.
+    It uses the index of (periapsis, apoapsis).
+
+    Args:
+        query (Query): SQLAlchemy query object.
+        model (Base): Starlink or its history model.
+        alt_min (float, optional): Lowest altitude of the range.
+        alt_max (float, optional): Highest altitude of the range.
+
+    Returns:
+        Query: Modified query with the range applied.
+    """
+    if alt_max is not None:
+        query = query.filter(model.periapsis <= alt_max)
+    if alt_min is not None:
+        query = query.filter(model.apoapsis >= alt_min)
+    return query
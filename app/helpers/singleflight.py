@@ -0,0 +1,83 @@
+import functools
+import threading
+
+from helpers.logger import logger
+
+"""
+Coalescing of identical calls (singleflight): while a call is running, the threads that make the same call
+wait for it and get the same result (or the same exception) instead of running it again.
+Nothing is cached, the next call after the result is given runs again.
+Ex: 50 requests to /api/dashboard at the same time after the data changed -> the statistics are computed once.
+
+@singleflight
+def get_data(endpoint):
+    ...
+"""
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Group of coalesced calls, by key.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run the function, or wait for the call with the same key that is running.
+
+        Args:
+            key (hashable): Identifier of the call (Ex: ('dashboard', as_of)).
+            function (function): The function to run.
+
+        Returns:
+            The result of the function.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"{call.waiters} calls coalesced with {getattr(function, '__name__', function)}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+def singleflight(function):
+    """
+    Decorator to coalesce the calls of a function with the same arguments (they must be hashable).
+    """
+    flight = SingleFlight()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        return flight.do(key, function, *args, **kwargs)
+
+    wrapper.flight = flight
+    return wrapper
@@ -1,30 +1,51 @@
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine, func
-from databases.models import Rockets, Launches, Starlink
-from config import DATABASE_URI
+from sqlalchemy import func
+# The engine and the session factory are shared with the API (one pool of connections)
+from databases.models import Rockets, Launches, Starlink, Session, HISTORY_MODELS
+from backend.history import query_as_of
+from backend.read_model import read_model_statistics, launches_per_year
+from config import READ_ENGINE
 
 from helpers.logger import logger
-# Create the database engine and session factory
-engine = create_engine(DATABASE_URI)
-Session = sessionmaker(bind=engine)
 
-def get_rocket_statistics():
+def _aggregate(value, cast, total):
+    """
+    Value of an AVG or SUM of the database: 0 without rows, None if all the values are NULL.
+    """
+    if not total:
+        return 0
+    return cast(value) if value is not None else None
+
+def get_rocket_statistics(as_of=None):
     """
     Retrieve statistics related to rockets from the database.
 
+    Args:
+        as_of (datetime, optional): Time of the history, None for the current data.
+
     Returns:
         dict: A dictionary containing rocket statistics, including the total number of rockets,
               average success rate, total cost per launch, average height, and average diameter.
     """
+    # The current data from the read model in memory, without a query
+    if as_of is None and READ_ENGINE == 'memory':
+        return read_model_statistics(Rockets)
     session = Session()
     try:
-        rockets = session.query(Rockets).all()
+        # AVG and SUM skip the NULL values (a rocket without cost doesn't break the dashboard)
+        model = HISTORY_MODELS[Rockets] if as_of else Rockets
+        total, avg_success_rate, total_cost, avg_height, avg_diameter = query_as_of(session, Rockets, as_of).with_entities(
+            func.count(model.id),
+            func.avg(model.success_rate_pct),
+            func.sum(model.cost_per_launch),
+            func.avg(model.height_meters),
+            func.avg(model.diameter_meters)
+        ).one()
         rocket_stats = {
-            "total_rockets": len(rockets),
-            "avg_success_rate": sum([rocket.success_rate_pct for rocket in rockets]) / len(rockets) if rockets else 0,
-            "total_cost_per_launch": sum([rocket.cost_per_launch for rocket in rockets]),
-            "avg_height": sum([rocket.height_meters for rocket in rockets]) / len(rockets) if rockets else 0,
-            "avg_diameter": sum([rocket.diameter_meters for rocket in rockets]) / len(rockets) if rockets else 0
+            "total_rockets": total,
+            "avg_success_rate": _aggregate(avg_success_rate, float, total),
+            "total_cost_per_launch": _aggregate(total_cost, int, total),
+            "avg_height": _aggregate(avg_height, float, total),
+            "avg_diameter": _aggregate(avg_diameter, float, total)
         }
         return rocket_stats
         # Log the error
@@ -35,23 +56,40 @@ def get_rocket_statistics():
     finally:
         session.close()
 
-def get_launch_statistics():
+def get_launch_statistics(as_of=None):
     """
     Obtener estadísticas relacionadas con los lanzamientos de la base de datos.
 
+    Args:
+        as_of (datetime, optional): Momento del historial, None para los datos actuales.
+
     Returns:
         dict: Un diccionario que contiene estadísticas de los lanzamientos, incluyendo el número total de lanzamientos,
               el número de lanzamientos exitosos y fallidos, el promedio de lanzamientos por año y el modelo de cohete más utilizado.
     """
+    # The current data from the read model in memory, without a query
+    if as_of is None and READ_ENGINE == 'memory':
+        return read_model_statistics(Launches)
     session = Session()
     try:
-        launches = session.query(Launches).all()
+        # Counted in the database, the successful/failed launches use the index of 'success'
+        model = HISTORY_MODELS[Launches] if as_of else Launches
+        query = query_as_of(session, Launches, as_of)
+        total, successful, failed, first_date, last_date = query.with_entities(
+            func.count(model.id),
+            func.count(model.id).filter(model.success.is_(True)),
+            func.count(model.id).filter(model.success.is_(False)),
+            func.min(model.date_utc),
+            func.max(model.date_utc)
+        ).one()
+        most_used_rocket = query.with_entities(model.rocket_id).group_by(model.rocket_id) \
+            .order_by(func.count(model.id).desc()).limit(1).scalar()
         launch_stats = {
-            "total_launches": len(launches),
-            "successful_launches": len([launch for launch in launches if launch.success == 'true']),
-            "failed_launches": len([launch for launch in launches if launch.success == 'false']),
-            "avg_launches_per_year": len(launches) / ((max([launch.date_utc for launch in launches]) - min([launch.date_utc for launch in launches])).days / 365) if launches else 0,
-            "most_used_rocket": max(set([launch.rocket_id for launch in launches]), key=[launch.rocket_id for launch in launches].count) if launches else None
+            "total_launches": total,
+            "successful_launches": successful,
+            "failed_launches": failed,
+            "avg_launches_per_year": launches_per_year(total, first_date, last_date) if total else 0,
+            "most_used_rocket": most_used_rocket if total else None
         }
         return launch_stats
     except Exception as e:
@@ -62,21 +100,32 @@ def get_launch_statistics():
     finally:
         session.close()
     
-def get_starlink_statistics():
+def get_starlink_statistics(as_of=None):
     """
     Obtener estadísticas relacionadas con los satélites Starlink de la base de datos.
 
+    Args:
+        as_of (datetime, optional): Momento del historial, None para los datos actuales.
+
     Returns:
         dict: Un diccionario que contiene estadísticas de los satélites Starlink, incluyendo el número total de satélites,
               el número de satélites activos y el número de satélites que han decaído.
     """
+    # The current data from the read model in memory, without a query
+    if as_of is None and READ_ENGINE == 'memory':
+        return read_model_statistics(Starlink)
     session = Session()
     try:
-        starlinks = session.query(Starlink).all()
+        # Counted in the database (with as_of on the validity index of the history)
+        model = HISTORY_MODELS[Starlink] if as_of else Starlink
+        total, active = query_as_of(session, Starlink, as_of).with_entities(
+            func.count(model.id),
+            func.count(model.id).filter(model.decay_date.is_(None))
+        ).one()
         starlink_stats = {
-            "total_satellites": len(starlinks),
-            "active_satellites": len([satellite for satellite in starlinks if satellite.decay_date is None]),
-            "decayed_satellites": len([satellite for satellite in starlinks if satellite.decay_date is not None])
+            "total_satellites": total,
+            "active_satellites": active,
+            "decayed_satellites": total - active
         }
         return starlink_stats
     except Exception as e:
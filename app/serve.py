@@ -0,0 +1,62 @@
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    # gunicorn doesn't run on Windows (it needs fcntl), waitress is used there
+    BaseApplication = None
+
+from helpers.logger import logger
+from config import WEB_BIND, WEB_WORKERS, WEB_THREADS
+
+"""
+Production server of the API (app.py uses the development server of Flask).
+Run it from the app folder:
+python serve.py
+The address, the workers and the threads are given with WEB_BIND, WEB_WORKERS and WEB_THREADS.
+Each worker imports app.py, only the worker that gets the ingest lock (INGEST_LOCK_FILE)
+starts the scheduler. To run the ingest in its own process use INGEST_MODE=off.
+It is the same as: gunicorn --workers 9 --threads 4 --bind 0.0.0.0:5001 app:app
+On Windows (without gunicorn) it runs waitress: one process with WEB_THREADS threads, WEB_WORKERS is not used.
+"""
+
+if BaseApplication is not None:
+    class APIServer(BaseApplication):
+        """
+        Gunicorn application that loads the Flask app of app.py in each worker.
+        """
+        def __init__(self, options=None):
+            self.options = options or {}
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in the worker (not in the master) so each worker has its own
+            # connections and only one of them gets the lock of the ingest
+            from app import app
+            return app
+
+def serve_with_waitress():
+    """
+    Run the API with waitress (Windows), a single process so it also runs the ingest (INGEST_MODE=embedded).
+    """
+    from waitress import serve
+    from app import app
+    logger.info(f"Starting the API on {WEB_BIND} with waitress and {WEB_THREADS} threads (gunicorn is not available)")
+    serve(app, listen=WEB_BIND, threads=WEB_THREADS)
+
+if __name__ == '__main__':
+    if BaseApplication is None:
+        serve_with_waitress()
+    else:
+        options = {
+            'bind': WEB_BIND,
+            'workers': WEB_WORKERS,
+            'threads': WEB_THREADS,
+            'worker_class': 'gthread',
+            'preload_app': False
+        }
+        logger.info(f"Starting the API on {WEB_BIND} with {WEB_WORKERS} workers and {WEB_THREADS} threads")
+        APIServer(options).run()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+"""
+Configuration of the tests of the backend. The modules of the app read the environment when imported,
+so the tests use a SQLite database and folders in a temporary directory (never the .env of the app).
+Run them from the app folder:
+python -m pytest
+"""
+
+TEST_DIR = tempfile.mkdtemp(prefix='spacex-tests-')
+os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(TEST_DIR, 'test.db')
+os.environ['DATA_DIR'] = os.path.join(TEST_DIR, 'data')
+os.environ['BACKUP_DIR'] = os.path.join(TEST_DIR, 'backup')
+os.environ['DEAD_LETTER_DIR'] = os.path.join(TEST_DIR, 'dead_letter')
+os.environ['READ_ENGINE'] = 'sql'
+os.environ['FETCH_MODE'] = 'full'
+
+@pytest.fixture
+def db():
+    """
+    Empty tables for each test.
+
+    Yields:
+        Session: A session of the test database.
+    """
+    from databases.models import Base, Session, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def folders():
+    """
+    Empty data, backup and dead letter folders for each test.
+
+    Returns:
+        tuple: (data_dir, backup_dir) of the test.
+    """
+    for name in ('DATA_DIR', 'BACKUP_DIR', 'DEAD_LETTER_DIR'):
+        shutil.rmtree(os.environ[name], ignore_errors=True)
+    return os.environ['DATA_DIR'], os.environ['BACKUP_DIR']
+
+@pytest.fixture
+def payloads():
+    """
+    Small synthetic payloads of the SpaceX API (benchmarks/synthetic_data.py).
+
+    Returns:
+        dict: The items of rockets, launches and starlink.
+    """
+    from benchmarks.synthetic_data import generate_payloads
+    return generate_payloads(starlink=20, launches=10, rockets=3, seed=7)
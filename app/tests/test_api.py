@@ -0,0 +1,64 @@
+import json
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from backend.application import api as api_module
+from backend.snapshots import write_snapshot, current_snapshot
+
+"""
+Tests of the endpoints of the API (backend/application/api.py) with the test client of Flask.
+"""
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(api_module.api, url_prefix='/api')
+    return app.test_client()
+
+def test_raw_endpoint_reads_the_manifest_again_after_a_rotation(client, folders, payloads, monkeypatch):
+    data_dir, backup_dir = folders
+    write_snapshot('rockets', payloads['rockets'], '01-01-2026_00-00', data_dir, backup_dir)
+    entry = current_snapshot('rockets', data_dir)
+    # The first read of the manifest gives a snapshot that the ingest already moved to the backup
+    entries = iter([{**entry, 'path': entry['path'] + '.moved'}, entry])
+    monkeypatch.setattr(api_module, 'current_snapshot', lambda key: next(entries))
+
+    response = client.get('/api/rockets-raw')
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{entry["sha256"]}"'
+    assert json.loads(response.data) == payloads['rockets']
+
+def test_raw_endpoint_falls_back_to_the_api(client, folders, monkeypatch):
+    monkeypatch.setattr(api_module, 'current_snapshot', lambda key: {'path': '/missing/raw-rockets.json', 'sha256': 'x', 'created_at': ''})
+    monkeypatch.setattr(api_module, 'get_data', lambda key: ([{'id': 'r1'}], 200))
+
+    response = client.get('/api/rockets-raw')
+
+    assert response.status_code == 200
+    assert response.get_json() == [{'id': 'r1'}]
+
+def test_dashboard_group_reuses_the_running_query(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_statistics(as_of):
+        calls.append(as_of)
+        release.wait(5)
+        return {'total_rockets': len(calls)}
+
+    monkeypatch.setitem(api_module.DASHBOARD_GROUPS, 'rockets', slow_statistics)
+    first = api_module._submit_group('rockets', None)
+    second = api_module._submit_group('rockets', None)
+    release.set()
+
+    assert second is first
+    assert first.result(5) == {'total_rockets': 1}
+    # The finished query is forgotten, the next dashboard runs it again
+    deadline = time.monotonic() + 5
+    while ('rockets', None) in api_module._running_groups and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert api_module._submit_group('rockets', None).result(5) == {'total_rockets': 2}
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from backend import decoding
+from backend.decoding import decode_records, decode_batch, split_batches, TRANSFORMS
+
+"""
+Tests of the typed decoding of the snapshots (backend/decoding.py): the same rows as backend/transforms.py.
+"""
+
+pytestmark = pytest.mark.skipif(decoding.msgspec is None, reason="msgspec is not installed")
+
+@pytest.mark.parametrize('key', ['rockets', 'launches', 'starlink'])
+def test_rows_match_the_transforms(payloads, key):
+    rows, rejected = decode_records(key, json.dumps(payloads[key]).encode())
+
+    assert rejected == []
+    assert rows == [TRANSFORMS[key](item) for item in payloads[key]]
+
+@pytest.mark.parametrize('key, invalid', [
+    ('rockets', {'id': 'r-bad', 'name': 'No sizes'}),
+    ('launches', {'id': 'l-bad', 'name': 'Bad date', 'date_utc': 'tomorrow', 'success': None, 'rocket': None, 'flight_number': 1}),
+    ('starlink', {'id': 's-bad', 'launch': None, 'spaceTrack': {'OBJECT_NAME': 'STARLINK-X', 'INCLINATION': 'high'}})
+])
+def test_invalid_items_are_rejected_as_with_the_transforms(payloads, key, invalid):
+    items = payloads[key][:2] + [invalid] + payloads[key][2:]
+    content = json.dumps(items).encode()
+
+    rows, rejected = decode_records(key, content)
+    json_rows, json_rejected = decoding._decode_with_json(key, content)
+
+    assert [item for item, _ in rejected] == [invalid]
+    assert rows == [TRANSFORMS[key](item) for item in payloads[key]]
+    # The transforms reject the same item
+    assert [item for item, _ in json_rejected] == [invalid] and json_rows == rows
+
+def test_batches_keep_the_rows_and_the_order(payloads):
+    content = json.dumps(payloads['starlink']).encode()
+
+    batches = list(split_batches(content, 7))
+    decoded = [decode_batch('starlink', batch) for batch in batches]
+    rows = [dict(zip(fields, row)) for fields, batch_rows, _ in decoded for row in batch_rows]
+
+    assert [len(json.loads(batch)) for batch in batches] == [7, 7, 6]
+    assert rows == decode_records('starlink', content)[0]
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import storage
+from backend.history import record_history, query_as_of, parse_as_of
+from backend.snapshots import write_snapshot, load_manifest
+from databases.models import Rockets, RocketsHistory, Starlink, StarlinkHistory
+
+"""
+Tests of the history of the records (backend/history.py): versions, as_of queries and deleted records.
+"""
+
+T1 = datetime(2024, 1, 1)
+T2 = datetime(2024, 2, 1)
+T3 = datetime(2024, 3, 1)
+
+def _rocket(**fields):
+    row = {'id': 'r1', 'name': 'Falcon 9', 'success_rate_pct': 98.0, 'cost_per_launch': 50000000, 'height_meters': 70.0,
+           'diameter_meters': 3.7, 'mass_kg': 549054, 'thrust_sea_level_kN': 7607.0, 'thrust_vacuum_kN': 8227.0, 'first_flight': None}
+    return {**row, **fields}
+
+def _names_as_of(session, as_of):
+    return sorted(rocket.name for rocket in query_as_of(session, Rockets, as_of))
+
+def test_record_history_saves_only_the_changes(db):
+    assert record_history(db, Rockets, [_rocket(), _rocket(id='r2', name='Starship')], T1) == 2
+    # The same data doesn't add versions
+    assert record_history(db, Rockets, [_rocket(), _rocket(id='r2', name='Starship')], T2) == 0
+    assert record_history(db, Rockets, [_rocket(success_rate_pct=99.0)], T3) == 1
+    db.commit()
+
+    versions = db.query(RocketsHistory).filter(RocketsHistory.id == 'r1').order_by(RocketsHistory.valid_from).all()
+    assert [(version.success_rate_pct, version.valid_from) for version in versions] == [(98.0, T1), (99.0, T3)]
+    # The old version is closed when the new one starts
+    assert versions[0].valid_to == T3
+
+def test_query_as_of(db):
+    record_history(db, Rockets, [_rocket()], T1)
+    record_history(db, Rockets, [_rocket(name='Falcon 9 Block 5')], T3)
+    db.commit()
+
+    assert _names_as_of(db, T1 - timedelta(seconds=1)) == []
+    assert _names_as_of(db, T2) == ['Falcon 9']
+    assert _names_as_of(db, T3) == ['Falcon 9 Block 5']
+
+def test_parse_as_of():
+    assert parse_as_of('2022-01-01') == datetime(2022, 1, 1, 23, 59, 59, 999999)
+    assert parse_as_of('2022-01-01T12:00:00+02:00') == datetime(2022, 1, 1, 10, 0)
+    assert parse_as_of(None) is None
+    with pytest.raises(ValueError):
+        parse_as_of('yesterday')
+
+def test_records_deleted_upstream_are_closed(db, folders, payloads):
+    data_dir, backup_dir = folders
+    satellites = payloads['starlink']
+    deleted = satellites[5]['id']
+
+    write_snapshot('starlink', satellites, '01-01-2026_00-00', data_dir, backup_dir)
+    storage.save_resource(data_dir, 'starlink', load_manifest(data_dir), T1)
+    write_snapshot('starlink', satellites[:5] + satellites[6:], '02-01-2026_00-00', data_dir, backup_dir)
+    storage.save_resource(data_dir, 'starlink', load_manifest(data_dir), T2)
+
+    version = db.query(StarlinkHistory).filter(StarlinkHistory.id == deleted).one()
+    assert version.valid_to == T2
+    assert query_as_of(db, Starlink, T1).count() == 20
+    assert query_as_of(db, Starlink, T2).count() == 19
+
+    # A record that comes back is a new version
+    write_snapshot('starlink', satellites, '03-01-2026_00-00', data_dir, backup_dir)
+    storage.save_resource(data_dir, 'starlink', load_manifest(data_dir), T3)
+    assert query_as_of(db, Starlink, T3).count() == 20
+    assert db.query(StarlinkHistory).filter(StarlinkHistory.id == deleted).count() == 2
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import Boolean, inspect, text
+
+from databases import migrations
+from databases.models import Base, Rockets, Starlink, engine
+
+"""
+Tests of the migrations of the schema (databases/migrations.py) on SQLite.
+"""
+
+@pytest.fixture
+def empty_database(folders):
+    Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {migrations.VERSION_TABLE}"))
+    yield
+    Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {migrations.VERSION_TABLE}"))
+
+def _index_names(table):
+    return {index['name'] for index in inspect(engine).get_indexes(table)}
+
+def test_new_database_records_all_the_migrations(empty_database):
+    applied = migrations.upgrade()
+
+    assert applied == [number for number, _, _ in migrations.MIGRATIONS]
+    assert all(done for _, _, done in migrations.status())
+    # A second upgrade has nothing to do
+    assert migrations.upgrade() == []
+
+def test_success_text_is_migrated_to_boolean(empty_database):
+    # Tables of the first version: 'success' saved as text (str() of the value of the API)
+    Rockets.__table__.create(engine)
+    Starlink.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE launches (id VARCHAR PRIMARY KEY, name VARCHAR, date_utc DATE, success VARCHAR, "
+            "rocket_id VARCHAR REFERENCES rockets(id), flight_number INTEGER)"
+        ))
+        connection.execute(text(
+            "INSERT INTO launches (id, name, success, flight_number) VALUES "
+            "('l1', 'A', 'True', 1), ('l2', 'B', 'False', 2), ('l3', 'C', 'None', 3), ('l4', 'D', NULL, 4)"
+        ))
+
+    applied = migrations.upgrade()
+
+    assert applied == [number for number, _, _ in migrations.MIGRATIONS]
+    columns = {column['name']: column['type'] for column in inspect(engine).get_columns('launches')}
+    assert isinstance(columns['success'], Boolean)
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT id, success FROM launches ORDER BY id")).all()
+    assert [(id, None if success is None else bool(success)) for id, success in rows] == [
+        ('l1', True), ('l2', False), ('l3', None), ('l4', None)
+    ]
+    assert {'ix_launches_success', 'ix_starlink_periapsis_apoapsis'} <= _index_names('launches') | _index_names('starlink')
+    assert {'rockets_history', 'launches_history', 'starlink_history'} <= set(inspect(engine).get_table_names())
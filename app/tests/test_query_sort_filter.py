@@ -0,0 +1,30 @@
+import pytest
+
+from helpers.query_sort_filter import parse_altitude_range
+
+"""
+Tests of the parameters of the list endpoints (helpers/query_sort_filter.py).
+"""
+
+def test_parse_altitude_range():
+    assert parse_altitude_range('540', '560.5') == (540.0, 560.5)
+    assert parse_altitude_range(None, '560') == (None, 560.0)
+    assert parse_altitude_range('540', '') == (540.0, None)
+    assert parse_altitude_range('550', '550') == (550.0, 550.0)
+
+@pytest.mark.parametrize('alt_min, alt_max', [
+    ('nan', None),
+    (None, 'NaN'),
+    ('inf', None),
+    ('-inf', '560'),
+    ('540', 'Infinity'),
+    ('1e400', None),
+    ('low', None)
+])
+def test_parse_altitude_range_rejects_invalid_limits(alt_min, alt_max):
+    with pytest.raises(ValueError, match='it must be a number'):
+        parse_altitude_range(alt_min, alt_max)
+
+def test_parse_altitude_range_rejects_an_inverted_range():
+    with pytest.raises(ValueError, match='alt_min must be lower'):
+        parse_altitude_range('560', '540')
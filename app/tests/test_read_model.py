@@ -0,0 +1,154 @@
+from datetime import date
+
+import pytest
+
+from backend import read_model
+from backend.read_model import read_model_statistics, filter_sort_records
+from backend.storage import save_to_db
+from backend.snapshots import write_snapshot
+from backend.rocket_resources.rocket_filter_sort import get_filter_sort_rocket
+from backend.launches_resources.launches_filter_sort import get_filter_sort_launches
+from backend.starlink_resources.starlink_filter_sort import get_filter_sort_starlink
+from benchmarks.synthetic_data import generate_payloads
+from databases.models import Rockets, Launches, Starlink
+from helpers.statistics import get_rocket_statistics, get_launch_statistics, get_starlink_statistics
+
+"""
+Tests of the read model in memory (backend/read_model.py): the same results as the SQL queries.
+"""
+
+@pytest.fixture
+def memory(monkeypatch):
+    """
+    The read model is loaded again from the tables of the test.
+    """
+    monkeypatch.setattr(read_model, '_current', None)
+
+def _add_rockets(db):
+    db.add_all([
+        Rockets(id='r1', name='Falcon 1', success_rate_pct=40.0, cost_per_launch=6700000, height_meters=22.25, diameter_meters=1.68),
+        Rockets(id='r2', name='Falcon 9', success_rate_pct=None, cost_per_launch=None, height_meters=70.0, diameter_meters=3.7),
+        Rockets(id='r3', name='Starship', success_rate_pct=0.0, cost_per_launch=7000000, height_meters=None, diameter_meters=9.0)
+    ])
+    db.commit()
+
+def test_rocket_statistics_skip_null_values(db, memory):
+    _add_rockets(db)
+
+    statistics = read_model_statistics(Rockets)
+
+    assert statistics == get_rocket_statistics()
+    assert statistics['avg_success_rate'] == 20.0
+    assert statistics['total_cost_per_launch'] == 13700000
+    assert statistics['avg_height'] == pytest.approx(46.125)
+
+def test_rocket_statistics_all_null(db, memory):
+    db.add(Rockets(id='r1', name='Falcon 1'))
+    db.commit()
+
+    statistics = read_model_statistics(Rockets)
+
+    assert statistics == get_rocket_statistics()
+    assert statistics['avg_success_rate'] is None and statistics['total_cost_per_launch'] is None
+
+def test_launch_statistics(db, memory):
+    _add_rockets(db)
+    db.add_all([
+        Launches(id='l1', name='A', date_utc=date(2020, 1, 1), success=True, rocket_id='r2', flight_number=1),
+        Launches(id='l2', name='B', date_utc=date(2022, 1, 1), success=False, rocket_id='r2', flight_number=2),
+        Launches(id='l3', name='C', date_utc=None, success=None, rocket_id='r1', flight_number=3)
+    ])
+    db.commit()
+
+    statistics = read_model_statistics(Launches)
+
+    assert statistics == get_launch_statistics()
+    assert (statistics['successful_launches'], statistics['failed_launches']) == (1, 1)
+    assert statistics['most_used_rocket'] == 'r2'
+
+def test_launch_statistics_without_dates(db, memory):
+    db.add_all([
+        Launches(id='l1', name='A', date_utc=None, rocket_id='r1'),
+        Launches(id='l2', name='B', date_utc=None, rocket_id='r1')
+    ])
+    db.commit()
+
+    statistics = read_model_statistics(Launches)
+
+    assert statistics == get_launch_statistics()
+    assert statistics['avg_launches_per_year'] is None
+
+def test_starlink_statistics(db, memory):
+    db.add_all([
+        Starlink(id='s1', object_name='STARLINK-1', decay_date=None),
+        Starlink(id='s2', object_name='STARLINK-2', decay_date=date(2023, 5, 1))
+    ])
+    db.commit()
+
+    assert read_model_statistics(Starlink) == get_starlink_statistics() == {
+        'total_satellites': 2, 'active_satellites': 1, 'decayed_satellites': 1
+    }
+
+@pytest.fixture
+def loaded(db, folders, memory):
+    """
+    Tables loaded by the ingest from synthetic snapshots, with some NULL values.
+    """
+    data_dir, backup_dir = folders
+    payloads = generate_payloads(starlink=300, launches=40, rockets=4, seed=7)
+    for key, data in payloads.items():
+        write_snapshot(key, data, '01-01-2026_00-00', data_dir, backup_dir)
+    save_to_db(data_dir)
+    db.add_all([
+        Rockets(id='r-null', name='Unknown'),
+        Starlink(id='s-null', object_name='STARLINK-NULL')
+    ])
+    db.commit()
+    return db
+
+SQL_QUERIES = {
+    Rockets: get_filter_sort_rocket,
+    Launches: get_filter_sort_launches,
+    Starlink: get_filter_sort_starlink
+}
+
+def _assert_same_records(session, model, sort_param=None, sort_order='asc', filter_field=None, filter_value=None, **altitudes):
+    memory = filter_sort_records(model, sort_param, sort_order, filter_field, filter_value, **altitudes)
+    sql = [record.to_dict() for record in SQL_QUERIES[model](session, sort_param, sort_order, filter_field, filter_value, **altitudes)]
+
+    assert memory is not None
+    assert sorted(record['id'] for record in memory) == sorted(record['id'] for record in sql)
+    # The ties can be in any order, the values of the sorted field must be in the same order
+    if sort_param:
+        assert [record[sort_param] for record in memory] == [record[sort_param] for record in sql]
+
+@pytest.mark.parametrize('model, sort_param, sort_order, filter_field, filter_value', [
+    (Rockets, 'name', 'asc', None, None),
+    (Rockets, 'cost_per_launch', 'desc', None, None),
+    (Rockets, 'success_rate_pct', 'asc', 'name', 'falcon'),
+    (Rockets, 'first_flight', 'asc', 'first_flight', '2014'),
+    (Launches, 'date_utc', 'desc', None, None),
+    (Launches, 'success', 'asc', None, None),
+    (Launches, 'success', 'desc', None, None),
+    (Launches, 'flight_number', 'asc', 'success', 'true'),
+    (Launches, 'flight_number', 'desc', 'success', 'null'),
+    (Launches, 'name', 'asc', 'date_utc', '2021'),
+    (Launches, None, 'asc', 'name', 'Mission 1'),
+    (Starlink, 'decay_date', 'asc', None, None),
+    (Starlink, 'decay_date', 'desc', None, None),
+    (Starlink, 'launch_date', 'asc', 'launch_date', '2021'),
+    (Starlink, 'inclination', 'desc', 'object_name', 'starlink-1'),
+])
+def test_filters_and_sorts_match_sql(loaded, model, sort_param, sort_order, filter_field, filter_value):
+    _assert_same_records(loaded, model, sort_param, sort_order, filter_field, filter_value)
+
+@pytest.mark.parametrize('alt_min, alt_max, sort_param, sort_order, filter_field, filter_value', [
+    (540, 560, None, 'asc', None, None),
+    (540, None, 'periapsis', 'asc', None, None),
+    (None, 400, 'apoapsis', 'desc', None, None),
+    (300, 600, 'decay_date', 'desc', None, None),
+    (300, 600, 'launch_date', 'asc', 'launch_date', '2021'),
+    (550, 550, None, 'asc', None, None),
+])
+def test_altitude_ranges_match_sql(loaded, alt_min, alt_max, sort_param, sort_order, filter_field, filter_value):
+    _assert_same_records(loaded, Starlink, sort_param, sort_order, filter_field, filter_value, alt_min=alt_min, alt_max=alt_max)
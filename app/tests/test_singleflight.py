@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from helpers.singleflight import SingleFlight, singleflight
+
+"""
+Tests of the coalescing of identical calls (helpers/singleflight.py).
+"""
+
+THREADS = 8
+
+def _wait_for_waiters(flight, key, waiters):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters == waiters:
+                return
+        time.sleep(0.001)
+    raise AssertionError(f"{waiters} calls didn't wait for the running one")
+
+def _run_together(flight, key, function):
+    """
+    Start THREADS identical calls, the function is released when all of them wait for the first one.
+    """
+    release = threading.Event()
+
+    def blocked():
+        release.wait(5)
+        return function()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        futures = [pool.submit(flight.do, key, blocked) for _ in range(THREADS)]
+        _wait_for_waiters(flight, key, THREADS - 1)
+        release.set()
+        return [future.exception() or future.result() for future in futures]
+
+def test_identical_calls_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    results = _run_together(flight, 'key', lambda: calls.append(1) or len(calls))
+
+    assert calls == [1]
+    assert results == [1] * THREADS
+
+def test_the_error_is_given_to_all_the_calls():
+    flight = SingleFlight()
+    error = ValueError('upstream down')
+
+    def fail():
+        raise error
+
+    assert _run_together(flight, 'key', fail) == [error] * THREADS
+
+def test_results_are_not_cached():
+    flight = SingleFlight()
+    calls = []
+
+    flight.do('key', calls.append, 1)
+    flight.do('key', calls.append, 2)
+
+    assert calls == [1, 2]
+    assert flight._calls == {}
+
+def test_decorator_coalesces_by_arguments():
+    calls = []
+
+    @singleflight
+    def get(endpoint, page=1):
+        calls.append((endpoint, page))
+        return endpoint, page
+
+    assert get('rockets', page=2) == ('rockets', 2)
+    assert get('launches') == ('launches', 1)
+    assert calls == [('rockets', 2), ('launches', 1)]
+    with pytest.raises(TypeError):
+        get(['not', 'hashable'])
@@ -0,0 +1,97 @@
+import copy
+
+import pytest
+
+from backend.spaceX import spaceX_data, spaceX_query
+from backend.spaceX.spaceX_query import fetch_incremental, high_water_mark
+from benchmarks.spacex_stub import start_stub_server
+from benchmarks.synthetic_data import generate_payloads
+
+"""
+Tests of the incremental fetch of the SpaceX API (backend/spaceX/spaceX_query.py) against the local stub.
+"""
+
+@pytest.fixture
+def stub(monkeypatch):
+    """
+    The stub of the SpaceX API with small synthetic payloads, the clients use its URL.
+
+    Yields:
+        tuple: (server, payloads), the queries of the stub read the payloads in each request.
+    """
+    payloads = generate_payloads(starlink=50, launches=20, rockets=3, seed=7)
+    server, url = start_stub_server(payloads)
+    monkeypatch.setattr(spaceX_query, 'SPACEX_API_URL', url)
+    monkeypatch.setattr(spaceX_data, 'API_requests', url)
+    try:
+        yield server, payloads
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _by_id(items):
+    return {item['id']: item for item in items}
+
+def test_first_fetch_is_a_full_get(stub):
+    _, payloads = stub
+
+    items, status_code, fetched = fetch_incremental('starlink', [])
+
+    assert status_code == 200
+    assert items == payloads['starlink'] and fetched == 50
+
+def test_new_ids_are_fetched_complete(stub):
+    server, payloads = stub
+    snapshot = copy.deepcopy(payloads['starlink'][:-3])
+    for satellite in payloads['starlink'][-3:]:
+        satellite['spaceTrack']['EPOCH'] = '2030-01-01T00:00:00.000000'
+    server.reload_bodies()
+
+    items, status_code, fetched = fetch_incremental('starlink', snapshot)
+
+    assert status_code == 200
+    # The new satellites have all their fields, not only the selected ones
+    assert _by_id(items) == _by_id(payloads['starlink'])
+    assert fetched == 6
+
+def test_changed_records_are_merged(stub):
+    server, payloads = stub
+    snapshot = copy.deepcopy(payloads['starlink'])
+    changed = payloads['starlink'][10]
+    changed['spaceTrack'].update({'EPOCH': '2030-01-01T00:00:00.000000', 'DECAY_DATE': '2029-12-31', 'MEAN_MOTION': 16.0})
+    changed['version'] = 'v2.0'
+    server.reload_bodies()
+
+    items, status_code, fetched = fetch_incremental('starlink', snapshot)
+    merged = _by_id(items)[changed['id']]
+
+    assert status_code == 200 and fetched == 1
+    # The selected fields are updated, the others keep the value of the snapshot
+    assert merged['spaceTrack']['DECAY_DATE'] == '2029-12-31'
+    assert merged['spaceTrack']['MEAN_MOTION'] == snapshot[10]['spaceTrack']['MEAN_MOTION']
+    assert merged['version'] == snapshot[10]['version']
+    assert [item for item in items if item['id'] != changed['id']] == [item for item in snapshot if item['id'] != changed['id']]
+
+def test_launch_lookback(stub, monkeypatch):
+    server, payloads = stub
+    monkeypatch.setattr(spaceX_query, 'FETCH_LOOKBACK_DAYS', 30)
+    launches = payloads['launches']
+    for launch in launches:
+        launch['date_utc'] = '2020-01-01T00:00:00.000Z'
+    newest, recent, old = launches[:3]
+    newest.update({'date_utc': '2024-06-01T00:00:00.000Z', 'success': True})
+    recent.update({'date_utc': '2024-05-20T00:00:00.000Z', 'success': True})
+    old.update({'date_utc': '2023-01-01T00:00:00.000Z', 'success': True})
+    snapshot = copy.deepcopy(launches)
+
+    assert high_water_mark('launches', snapshot) == '2024-05-02T00:00:00.000Z'
+
+    # Late changes upstream: only the launches inside the lookback are fetched again
+    recent['success'] = False
+    old['success'] = False
+    server.reload_bodies()
+    items, status_code, fetched = fetch_incremental('launches', snapshot)
+
+    assert status_code == 200 and fetched == 2
+    assert _by_id(items)[recent['id']]['success'] is False
+    assert _by_id(items)[old['id']]['success'] is True
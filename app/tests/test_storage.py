@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from backend import storage
+from backend.dead_letter import read_dead_letters
+from backend.decoding import decode_records
+from backend.history import utc_now
+from backend.snapshots import write_snapshot, load_manifest, load_watermark
+from databases.models import Starlink
+
+"""
+Tests of the load of the snapshots in the database (backend/storage.py): batches, watermark and dead letters.
+"""
+
+def _write_snapshots(payloads, data_dir, backup_dir):
+    for key, data in payloads.items():
+        write_snapshot(key, data, '01-01-2026_00-00', data_dir, backup_dir)
+    return load_manifest(data_dir)
+
+def test_invalid_items_go_to_the_dead_letters(db, folders, payloads):
+    data_dir, backup_dir = folders
+    # An item without spaceTrack can't be decoded
+    payloads['starlink'].append({'id': 'bad-satellite', 'launch': None})
+    manifest = _write_snapshots(payloads, data_dir, backup_dir)
+
+    result = storage.save_resource(data_dir, 'starlink', manifest, utc_now())
+
+    assert result == {'rows': 20, 'dead_letters': 1, 'skipped': False}
+    assert db.query(Starlink).count() == 20
+    assert [line['record_id'] for line in read_dead_letters('starlink')] == ['bad-satellite']
+    watermark = load_watermark('starlink', data_dir)
+    assert watermark['complete'] and watermark['dead_letters'] == 1
+
+def test_same_snapshot_is_not_loaded_again(db, folders, payloads):
+    data_dir, backup_dir = folders
+    manifest = _write_snapshots(payloads, data_dir, backup_dir)
+
+    storage.save_resource(data_dir, 'starlink', manifest, utc_now())
+    result = storage.save_resource(data_dir, 'starlink', manifest, utc_now())
+
+    assert result == {'rows': 0, 'dead_letters': 0, 'skipped': True}
+
+def test_rows_with_data_errors_go_to_the_dead_letters(db, folders, payloads):
+    rows, _ = decode_records('starlink', json.dumps(payloads['starlink'][:3]).encode())
+    # The history doesn't accept a row without id (IntegrityError), the batch is saved row by row
+    rows[1]['id'] = None
+
+    saved = storage.save_batch('starlink', Starlink, rows, utc_now(), 'raw-starlink.json')
+
+    assert saved == 2
+    assert db.query(Starlink).count() == 2
+    assert len(read_dead_letters('starlink')) == 1
+
+def test_database_error_stops_the_load_and_resumes(db, folders, payloads, monkeypatch):
+    data_dir, backup_dir = folders
+    manifest = _write_snapshots(payloads, data_dir, backup_dir)
+    monkeypatch.setattr(storage, 'INGEST_BATCH_SIZE', 5)
+
+    upsert_rows = storage.upsert_rows
+    calls = []
+
+    def database_down(connection, model, rows, *args):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise OperationalError('INSERT', {}, Exception('database is locked'))
+        return upsert_rows(connection, model, rows, *args)
+
+    monkeypatch.setattr(storage, 'upsert_rows', database_down)
+    with pytest.raises(OperationalError):
+        storage.save_resource(data_dir, 'starlink', manifest, utc_now())
+
+    # The rows are not dead lettered and the load stays at the batch that failed
+    assert read_dead_letters('starlink') == []
+    watermark = load_watermark('starlink', data_dir)
+    assert watermark['next_batch'] == 2 and not watermark['complete']
+    assert db.query(Starlink).count() == 10
+
+    monkeypatch.setattr(storage, 'upsert_rows', upsert_rows)
+    result = storage.save_resource(data_dir, 'starlink', manifest, utc_now())
+
+    assert result == {'rows': 10, 'dead_letters': 0, 'skipped': False}
+    assert db.query(Starlink).count() == 20
+    assert load_watermark('starlink', data_dir)['complete']